@@ -3,6 +3,7 @@
 import grovepi
 import grove_rgb_lcd as lcd
 import dextergps
+import grove_gps_track
 import time
 import picamera
 import atexit,sys
@@ -17,7 +18,7 @@ def cleanup():
 		grovepi.digitalWrite(led,0)
 		lcd.setRGB(0,0,0)
 		lcd.setText("")
-		fobj.close()
+		track.close()
 	except:
 		pass
 ###############################################
@@ -31,7 +32,9 @@ def cleanup():
 # Variables - adapt as needed
 ###############################################
 photo_location = "/media/KINGSTON/"
-logfile=photo_location+"trip.csv"
+# fixes with the temperature and humidity, in a compact binary track
+# export it with: python grove_gps_track.py trip.gtrk --csv trip.csv --gpx trip.gpx
+trackfile=photo_location+"trip.gtrk"
 led = 7
 dht_sensor_port = 3
 dht_sensor_type = 0
@@ -95,11 +98,9 @@ def handledhtdata():
 
 def logtofile():
 	try:
-		fobj = open( logfile,"a")
-		fobj.write("#{:3d},{:.4f}, {:.4f}, {}, {:.2f}, {:.2f}%\n".format(
-			count,g.latitude,g.longitude, g.timestamp, temp,hum))
-		fobj.flush()
-		fobj.close()
+		track.add_fix(g.reader.cache.fix(), temperature=temp, humidity=hum)
+		# on the USB drive right away, in case the power goes off
+		track.flush()
 	except KeyboardInterrupt:
 		sys.exit()
 	except:
@@ -159,12 +160,20 @@ except:
 
 # check camera
 try:
-	g = grovegps.GROVEGPS()
+	g = dextergps.GROVEGPS()
 	cam = picamera.PiCamera(sensor_mode=3)
 	display("Camera working",in_lcd=True)
 except:
 	display("Camera NOT working!!",in_lcd=True)
 
+# open the track, records are added to the one of the previous rides
+try:
+	track = grove_gps_track.TrackWriter(trackfile, extra=["temperature", "humidity"], append=True)
+except KeyboardInterrupt:
+	sys.exit()
+except:
+	display("Error opening the track",in_lcd=True)
+
 # get a font
 fnt = ImageFont.truetype('/usr/share/fonts/truetype/roboto/Roboto-Thin.ttf', 20)
 count = 0
@@ -0,0 +1,107 @@
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/DexterInd/GrovePi/blob/master/LICENSE
+
+# Throughput of the display drivers against a stand-in I2C bus
+# Every driver is measured in I2C bytes per second on top of calls per second
+
+import common
+
+# returns the number of bytes func sends over the bus
+def bytes_per_call(bus, func):
+	before = bus.bytes_written
+	func()
+	return bus.bytes_written - before
+
+def measure_on_bus(name, bus, func, iterations):
+	return common.measure(name, func, iterations, unit_count = bytes_per_call(bus, func), unit = "bytes")
+
+def bench_rgb_lcd(options):
+	import grove_rgb_lcd
+	bus = common.stand_in_i2c_bus()
+	iterations = max(1, options.iterations // 50)
+	text = "Temp: 21.5C     Hum: 45.0%"
+	lcd = grove_rgb_lcd.LCD()
+	lcd.setText(text)
+	lcd.setRGB(0, 128, 64)
+	return [
+		measure_on_bus("grove_rgb_lcd.setText", bus, lambda: grove_rgb_lcd.setText(text), iterations),
+		measure_on_bus("grove_rgb_lcd.setText_norefresh", bus, lambda: grove_rgb_lcd.setText_norefresh(text), iterations),
+		measure_on_bus("grove_rgb_lcd.setRGB", bus, lambda: grove_rgb_lcd.setRGB(0, 128, 64), options.iterations),
+		measure_on_bus("grove_rgb_lcd.LCD.setText[1 digit]", bus, lambda: lcd_status(lcd), options.iterations),
+		measure_on_bus("grove_rgb_lcd.LCD.setRGB[unchanged]", bus, lambda: lcd.setRGB(0, 128, 64), options.iterations),
+		measure_on_bus("grove_rgb_lcd.bar_graph[animated]", bus, lambda: lcd_bar(grove_rgb_lcd, lcd), options.iterations),
+	]
+
+# a bar that grows one pixel per frame, its partial blocks are uploaded to CGRAM the first time only
+def lcd_bar(grove_rgb_lcd, lcd):
+	lcd_counter[0] += 1
+	lcd.setText("Load\n" + grove_rgb_lcd.bar_graph(lcd.characters, lcd_counter[0] % 81, 80))
+
+lcd_counter = [0]
+
+# a status screen where a single digit changes
+def lcd_status(lcd):
+	lcd_counter[0] += 1
+	lcd.setText("Temp: 21.{}C\nHum: 45.0%".format(lcd_counter[0] % 10))
+
+def bench_oled_96(options):
+	import grove_oled
+	bus = common.stand_in_i2c_bus()
+	iterations = max(1, options.iterations // 10)
+	return [
+		measure_on_bus("grove_oled.oled_putString[12]", bus, lambda: grove_oled.oled_putString("Hello World!"), iterations),
+		measure_on_bus("grove_oled.oled_putLine[12]", bus, lambda: grove_oled.oled_putLine(0, "Hello World!"), iterations),
+		measure_on_bus("grove_oled.oled_clearDisplay", bus, grove_oled.oled_clearDisplay, max(1, iterations // 10)),
+		# a frame is the 12 lines of the screen, so its ops/s are frames per second
+		measure_on_bus("grove_oled.frame[12x12]", bus, lambda: oled_96_frame(grove_oled), max(1, iterations // 10)),
+	]
+
+def oled_96_frame(grove_oled):
+	for row in range(12):
+		grove_oled.oled_putLine(row, "Line {:2d} 21.5".format(row))
+
+def bench_oled_128(options):
+	import grove_128_64_oled
+	bus = common.stand_in_i2c_bus()
+	iterations = max(1, options.iterations // 10)
+	frame = grove_128_64_oled.Framebuffer()
+	for row in range(8):
+		frame.text(0, row * 8, "Line {} 21.5C".format(row))
+	return [
+		measure_on_bus("grove_128_64_oled.putString[16]", bus, lambda: grove_128_64_oled.putString("Hello World! 123"), iterations),
+		measure_on_bus("grove_128_64_oled.clearDisplay", bus, grove_128_64_oled.clearDisplay, max(1, iterations // 10)),
+		measure_on_bus("grove_128_64_oled.Framebuffer.flush[full]", bus, lambda: full_flush(frame), max(1, iterations // 10)),
+		measure_on_bus("grove_128_64_oled.Framebuffer.flush[1 line]", bus, lambda: line_flush(frame), iterations),
+	]
+
+frame_counter = [0]
+
+# a dashboard refresh where only a value changes
+def line_flush(frame):
+	frame_counter[0] += 1
+	frame.text(0, 0, "Temp: {:5.1f}C".format(frame_counter[0] % 1000 / 10.0))
+	frame.flush()
+
+def full_flush(frame):
+	frame.invalidate()
+	frame.flush()
+
+# cost of going through the shared bus and its lock
+def bench_shared_bus(options):
+	import grove_i2c_bus
+	bus = common.stand_in_i2c_bus()
+	shared = grove_i2c_bus.get_bus()
+	data = list(range(64))
+	return [
+		measure_on_bus("grove_i2c_bus.write_byte_data", bus, lambda: shared.write_byte_data(0x3c, 0x80, 0xaf), options.iterations),
+		measure_on_bus("grove_i2c_bus.write_stream[64]", bus, lambda: shared.write_stream(0x3c, 0x40, data), options.iterations),
+	]
+
+def run(options):
+	results = []
+	for bench in [bench_shared_bus, bench_rgb_lcd, bench_oled_96, bench_oled_128]:
+		try:
+			results += bench(options)
+		except ImportError as error:
+			print("[skipping {}][{}]".format(bench.__name__, error))
+	return results
@@ -0,0 +1,45 @@
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/DexterInd/GrovePi/blob/master/LICENSE
+
+# Cost per sample of the outlier filters, which shouldn't depend on the window size,
+# and of the Kalman filter
+
+import random
+
+import common
+import grovepi
+import grovepi_filters
+import KalmanFilter
+
+def run(options):
+	generator = random.Random(0)
+	values = [generator.gauss(500.0, 10.0) for _ in range(10000)]
+	state = {"index" : 0}
+
+	def streaming(window):
+		outlier_filter = grovepi_filters.OutlierFilter(2, window)
+		def add():
+			state["index"] = (state["index"] + 1) % len(values)
+			outlier_filter.add(values[state["index"]])
+		return add
+
+	import numpy
+	array = numpy.array(values)
+	short = values[:1000]
+
+	kalman = KalmanFilter.KalmanFilter()
+	def kalman_filter():
+		state["index"] = (state["index"] + 1) % len(values)
+		kalman.Filter(values[state["index"]])
+
+	return [
+		common.measure("grovepi_filters.OutlierFilter.add[window 10]", streaming(10), options.iterations * 10),
+		common.measure("grovepi_filters.OutlierFilter.add[window 1000]", streaming(1000), options.iterations * 10),
+		common.measure("grovepi_filters.filter_batch[10000, window 1000]", lambda: grovepi_filters.filter_batch(array, 2, 1000),
+			max(1, options.iterations // 10), unit_count = len(array), unit = "samples"),
+		common.measure("grovepi.statisticalNoiseReduction[1000]", lambda: grovepi.statisticalNoiseReduction(short),
+			max(1, options.iterations // 10), unit_count = len(short), unit = "samples"),
+		common.measure("KalmanFilter.Filter", kalman_filter, options.iterations * 10),
+		common.measure("KalmanFilter.filter_batch[10000]", lambda: KalmanFilter.KalmanFilter().filter_batch(array),
+			max(1, options.iterations // 10), unit_count = len(array), unit = "samples"),
+	]
@@ -0,0 +1,47 @@
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/DexterInd/GrovePi/blob/master/LICENSE
+
+# Throughput and latency of the grovepi commands against a virtual GrovePi
+
+import common
+import grovepi
+import grovepi_emulator
+
+def run(options):
+	board = grovepi_emulator.VirtualGrovePi(latency_scale = options.latency_scale, seed = 0)
+	board.set_analog(0, 512)
+	board.set_digital(3, 1)
+	board.set_dht(4, 21.5, 45.0)
+	session = grovepi.GrovePi(bus = board)
+
+	session.ledBar_init(5, 0)
+	session.fourDigit_init(6)
+	session.chainableRgbLed_init(7, 10)
+	session.storeColor(255, 0, 0)
+
+	iterations = options.iterations
+	state = {"bits" : 0}
+
+	# dht answers from the session's cache for a second or two, empty it to time the bus transaction
+	def dht():
+		session.clear_cache()
+		session.dht(4, 0)
+
+	def led_bar():
+		state["bits"] = (state["bits"] + 1) & 0x3ff
+		session.ledBar_setBits(5, state["bits"])
+
+	results = [
+		common.measure("grovepi.analogRead", lambda: session.analogRead(0), iterations),
+		common.measure("grovepi.digitalRead", lambda: session.digitalRead(3), iterations),
+		common.measure("grovepi.digitalWrite", lambda: session.digitalWrite(2, 1), iterations),
+		# a DHT conversion takes over 250 ms on a real board
+		common.measure("grovepi.dht", dht, max(1, iterations // 100)),
+		common.measure("grovepi.dht[cached]", lambda: session.dht(4, 0), iterations),
+		common.measure("grovepi.ledBar_setBits", led_bar, iterations),
+		common.measure("grovepi.fourDigit_number", lambda: session.fourDigit_number(6, 1234, 0), iterations),
+		common.measure("grovepi.chainableRgbLed_pattern", lambda: session.chainableRgbLed_pattern(7, 0, 3), iterations),
+		common.measure("grovepi.analogReadMany[3x10]", lambda: session.analogReadMany([0, 1, 2], samples = 10),
+			max(1, iterations // 10), unit_count = 30, unit = "reads"),
+	]
+	return results
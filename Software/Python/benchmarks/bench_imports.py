@@ -0,0 +1,56 @@
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/DexterInd/GrovePi/blob/master/LICENSE
+
+# Import time of every module shipped in package_modules.txt
+# Each import runs in a fresh interpreter, so nothing is cached from a previous one
+
+import os
+import sys
+import subprocess
+
+import common
+
+timer = "import time; clock = getattr(time, 'perf_counter', time.time); start = clock(); import {}; print(clock() - start)"
+
+# returns [(module, directory)] for the modules of package_modules.txt, found the way setup.py finds them
+def find_modules():
+	with open(os.path.join(common.python_dir, "package_modules.txt")) as modules_file:
+		names = [line.strip() for line in modules_file if line.strip()]
+
+	found = {}
+	for root, dirs, files in os.walk(common.python_dir):
+		dirs[:] = sorted(directory for directory in dirs if directory != "benchmarks")
+		for name in names:
+			if name not in found and name + ".py" in files:
+				found[name] = root
+	return [(name, found[name]) for name in names if name in found]
+
+def import_time(module, path):
+	environment = dict(os.environ)
+	environment["PYTHONPATH"] = os.pathsep.join(path)
+	output = subprocess.check_output([sys.executable, "-c", timer.format(module)],
+		env = environment, stderr = subprocess.STDOUT)
+	return float(output.decode().strip().splitlines()[-1])
+
+def run(options):
+	modules = find_modules()
+	# the drivers import each other (grovepi, grove_i2c_bus...) so they all go on the path
+	path = sorted(set(directory for _, directory in modules))
+	runs = max(3, options.iterations // 100)
+
+	results = []
+	for module, _ in modules:
+		try:
+			times = sorted(import_time(module, path) for _ in range(runs))
+		except subprocess.CalledProcessError as error:
+			# a dependency that isn't installed here, like RPi.GPIO or serial
+			print("[skipping import {}][{}]".format(module, error.output.decode().strip().splitlines()[-1]))
+			continue
+		results.append({
+			"name" : "import " + module,
+			"iterations" : runs,
+			"ops_per_sec" : len(times) / sum(times) if sum(times) > 0 else 0.0,
+			"p50" : common.percentile(times, 0.50),
+			"p99" : common.percentile(times, 0.99),
+		})
+	return results
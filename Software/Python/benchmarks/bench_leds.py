@@ -0,0 +1,72 @@
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/DexterInd/GrovePi/blob/master/LICENSE
+
+# Frames per second of the LED drivers and of the 4 digit display
+# The chainable RGB LEDs driven by the firmware run on a virtual GrovePi.
+# The ones driven directly are bit-banged on a FakeGPIO, for several chain lengths, so what's
+# measured is the encoding and the Python side of the bit-banging, not the time the pins take to toggle
+
+import common
+import grovepi
+import grovepi_devices
+import grovepi_emulator
+import chainable_rgb_direct
+
+chain_lengths = [1, 10, 50]
+
+# a dot moving along a chain of 10 LEDs driven by the firmware, the rest of the chain staying blue
+def bench_firmware_chain(options):
+	board = grovepi_emulator.VirtualGrovePi(latency_scale = options.latency_scale, seed = 0)
+	session = grovepi.GrovePi(bus = board)
+	chain = grovepi_devices.ChainableRgbLed(7, 10, session)
+	chain.init()
+	frames = [[(255, 0, 0) if led == dot else (0, 0, 255) for led in range(10)] for dot in range(10)]
+	state = {"frame" : 0}
+
+	def show():
+		state["frame"] = (state["frame"] + 1) % len(frames)
+		chain.show(frames[state["frame"]])
+
+	return [common.measure("grovepi_devices.ChainableRgbLed.show[moving dot]", show, max(1, options.iterations // 10),
+		unit_count = 10, unit = "LEDs")]
+
+# a meter redrawn at a fixed rate, whose level changes every 3 frames
+def bench_led_bar(options):
+	board = grovepi_emulator.VirtualGrovePi(latency_scale = options.latency_scale, seed = 0)
+	session = grovepi.GrovePi(bus = board)
+	bar = grovepi_devices.LedBar(5, session = session)
+	bar.init()
+	state = {"frame" : 0}
+
+	def meter():
+		state["frame"] += 1
+		bar.setLevel(state["frame"] // 3 % 11)
+
+	return [common.measure("grovepi_devices.LedBar.setLevel[meter]", meter, options.iterations)]
+
+# a counter going up by 0.1, most updates only change the last digit
+def bench_four_digit(options):
+	board = grovepi_emulator.VirtualGrovePi(latency_scale = options.latency_scale, seed = 0)
+	session = grovepi.GrovePi(bus = board)
+	display = grovepi_devices.FourDigitDisplay(6, session = session)
+	display.init()
+	state = {"value" : 0}
+
+	def counter():
+		state["value"] = (state["value"] + 1) % 1000
+		display.setNumber(state["value"] / 10.0)
+
+	return [common.measure("grovepi_devices.FourDigitDisplay.setNumber[counter]", counter, max(1, options.iterations // 10))]
+
+def run(options):
+	results = bench_firmware_chain(options) + bench_led_bar(options) + bench_four_digit(options)
+	for length in chain_lengths:
+		colors = [((17 * i) & 0xFF, (101 * i) & 0xFF, (211 * i) & 0xFF) for i in range(length)]
+		led = chainable_rgb_direct.rgb_led(length, chainable_rgb_direct.GPIOBackend(gpio = chainable_rgb_direct.FakeGPIO()))
+		iterations = max(1, options.iterations // length)
+		# ops/s are frames per second
+		results.append(common.measure("chainable_rgb_direct.encode_frame[{} LEDs]".format(length),
+			lambda: chainable_rgb_direct.encode_frame(colors), iterations * 10, unit_count = length, unit = "LEDs"))
+		results.append(common.measure("chainable_rgb_direct.show[{} LEDs]".format(length),
+			lambda: led.show(colors), iterations, unit_count = length, unit = "LEDs"))
+	return results
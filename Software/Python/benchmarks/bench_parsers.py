@@ -0,0 +1,147 @@
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/DexterInd/GrovePi/blob/master/LICENSE
+
+# Throughput of the GPS and RF link parsers against a stand-in serial port, and of the GPS track files
+
+import common
+
+gga_sentences = [
+	"$GPGGA,123519.00,4807.038,N,01131.000,E,1,08,0.9,545.4,M,46.9,M,,*69",
+	"$GPGGA,092750.00,5321.6802,N,00630.3372,W,1,8,1.03,61.7,M,55.2,M,,*46",
+	"$GPGGA,134658.00,5106.9792,N,11402.3003,W,2,09,1.0,1048.47,M,-16.27,M,08,AAAA*60",
+]
+
+# what the GPS sends every second
+gps_second = gga_sentences[:1] + [
+	"$GPGSA,A,3,04,05,,09,12,,,24,,,,,2.5,1.3,2.1*39",
+	"$GPRMC,123519.00,A,4807.038,N,01131.000,E,022.4,084.4,230394,003.1,W*44",
+	"$GPVTG,084.4,T,077.8,M,022.4,N,041.5,K*4A",
+	"$GPGSV,2,1,08,01,40,083,46,02,17,308,41,12,07,344,39,14,22,228,45*75",
+]
+
+def bench_gps(options):
+	import serial
+	import dextergps
+
+	original = serial.Serial
+	serial.Serial = common.StandInSerial
+	try:
+		gps = dextergps.GROVEGPS()
+	finally:
+		serial.Serial = original
+
+	state = {"index" : 0}
+	def validate():
+		state["index"] = (state["index"] + 1) % len(gga_sentences)
+		gps.validate(gga_sentences[state["index"]])
+
+	# the reader thread has already stored the latest sentence, read() only answers from it
+	gps.reader.parser.feed(gga_sentences[0] + "\r\n")
+	def read():
+		gps.read()
+
+	try:
+		return [
+			common.measure("dextergps.validate", validate, options.iterations * 10, unit_count = 1, unit = "sentences"),
+			common.measure("dextergps.read", read, options.iterations * 10),
+		]
+	finally:
+		gps.close()
+
+def bench_nmea(options):
+	import grove_nmea
+
+	# a second of output of the GPS, received in chunks of the size the UART hands over
+	second = "".join(sentence + "\r\n" for sentence in gps_second).encode("ascii")
+	chunks = [second[start:start + 16] for start in range(0, len(second), 16)]
+	parser = grove_nmea.Parser(grove_nmea.FixCache().update)
+
+	def feed():
+		for chunk in chunks:
+			parser.feed(chunk)
+
+	return [
+		common.measure("grove_nmea.Parser.feed", feed, options.iterations, unit_count = len(gps_second), unit = "sentences"),
+	]
+
+def bench_track(options):
+	import os
+	import shutil
+	import tempfile
+	import grove_gps_track
+
+	# an hour of riding, a fix per second, with the temperature and humidity of the dashcam
+	directory = tempfile.mkdtemp()
+	path = os.path.join(directory, "ride.gtrk")
+	records = []
+	for second in range(3600):
+		records.append(dict(time = 1600000000.0 + second, latitude = 48.1173 + second * 4e-5, longitude = 11.5166 + (second % 300) * 3e-5,
+			altitude = 520.0 + (second % 60) * 0.1, speed_kmh = 18.0 + (second % 20) * 0.5, course = 84.4, satellites = 8, hdop = 0.9,
+			temperature = 21.5, humidity = 45.0))
+
+	def write():
+		writer = grove_gps_track.TrackWriter(path, extra = ["temperature", "humidity"])
+		for record in records:
+			writer.add(**record)
+		writer.close()
+
+	try:
+		write()
+		track = grove_gps_track.TrackReader(path)
+		state = {"second" : 0}
+
+		def read():
+			grove_gps_track.TrackReader(path)
+			for record in track:
+				pass
+
+		def seek():
+			state["second"] = (state["second"] + 97) % len(records)
+			next(track.seek(records[state["second"]]["time"]))
+
+		return [
+			common.measure("grove_gps_track.write[1 h]", write, max(1, options.iterations // 100), unit_count = len(records), unit = "records"),
+			common.measure("grove_gps_track.read[1 h]", read, max(1, options.iterations // 100), unit_count = len(records), unit = "records"),
+			common.measure("grove_gps_track.seek", seek, options.iterations),
+		]
+	finally:
+		shutil.rmtree(directory)
+
+def bench_rflink(options):
+	import serial
+	import grove_rflink433mhz
+
+	original = serial.Serial
+	serial.Serial = common.StandInSerial
+	try:
+		link = grove_rflink433mhz.RFLinker()
+	finally:
+		serial.Serial = original
+
+	message = "temperature=21.5;humidity=45.0;light=512;" * 3
+
+	def write():
+		link.serial = common.StandInSerial()
+		link.writeMessage(message)
+
+	# encode the message once and decode it over and over
+	write()
+	encoded = link.serial
+
+	def read():
+		encoded.rewind()
+		link.readMessage()
+
+	return [
+		common.measure("grove_rflink433mhz.writeMessage", write, options.iterations, unit_count = len(message), unit = "chars"),
+		common.measure("grove_rflink433mhz.readMessage", read, options.iterations, unit_count = len(message), unit = "chars"),
+	]
+
+def run(options):
+	results = []
+	for bench in [bench_gps, bench_nmea, bench_track, bench_rflink]:
+		try:
+			results += bench(options)
+		except ImportError as error:
+			print("[skipping {}][{}]".format(bench.__name__, error))
+	return results
@@ -0,0 +1,135 @@
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/DexterInd/GrovePi/blob/master/LICENSE
+
+# Helpers shared by the benchmarks: timing, stand-in buses and import paths
+
+import os
+import sys
+import time
+
+_clock = getattr(time, "perf_counter", time.time)
+
+# the library modules are spread over the sensor directories and only get flattened
+# into a single directory by setup.py, so make them importable from a checkout
+python_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+library_dirs = [
+	python_dir,
+	os.path.join(python_dir, "grove_oled"),
+	os.path.join(python_dir, "grove_i2c_oled_128_64"),
+	os.path.join(python_dir, "grove_rgb_lcd"),
+	os.path.join(python_dir, "grove_gps"),
+	os.path.join(python_dir, "grove_rflink433mhz_oneway_kit"),
+	os.path.join(python_dir, "grove_dht_pro_filter"),
+	os.path.join(python_dir, "grove_chainable_rgb_led", "direct_serial_lib"),
+	os.path.join(python_dir, "grove_barometer_sensors", "high_accuracy_hp206c_barometer"),
+]
+for directory in library_dirs:
+	if directory not in sys.path:
+		sys.path.insert(0, directory)
+
+def percentile(sorted_values, fraction):
+	if len(sorted_values) == 0:
+		return 0.0
+	index = int(round(fraction * (len(sorted_values) - 1)))
+	return sorted_values[index]
+
+# runs func iterations times after warmup runs and returns its statistics
+# unit_count: how many units (bytes, frames, lines...) a single call processes, reported as units_per_sec
+def measure(name, func, iterations, warmup = 1, unit_count = None, unit = None):
+	for _ in range(warmup):
+		func()
+
+	latencies = []
+	start = _clock()
+	for _ in range(iterations):
+		begin = _clock()
+		func()
+		latencies.append(_clock() - begin)
+	total = _clock() - start
+
+	latencies.sort()
+	result = {
+		"name" : name,
+		"iterations" : iterations,
+		"ops_per_sec" : iterations / total if total > 0 else 0.0,
+		"p50" : percentile(latencies, 0.50),
+		"p99" : percentile(latencies, 0.99),
+	}
+	if unit_count is not None:
+		result["unit"] = unit
+		result["units_per_sec"] = unit_count * result["ops_per_sec"]
+	return result
+
+# Stand-in for smbus.SMBus, it accepts every transfer and counts the bytes
+class StandInSMBus(object):
+	def __init__(self, bus = 1):
+		self.transactions = 0
+		self.bytes_written = 0
+
+	def write_byte(self, address, value):
+		self.transactions += 1
+		self.bytes_written += 1
+
+	def write_byte_data(self, address, register, value):
+		self.transactions += 1
+		self.bytes_written += 2
+
+	def write_i2c_block_data(self, address, register, data):
+		self.transactions += 1
+		self.bytes_written += 1 + len(data)
+
+	def read_byte(self, address):
+		self.transactions += 1
+		return 0
+
+	def read_byte_data(self, address, register):
+		self.transactions += 1
+		return 0
+
+	def read_i2c_block_data(self, address, register, length = 32):
+		self.transactions += 1
+		return [0] * length
+
+# makes the drivers' shared I2C bus (grove_i2c_bus) run on a new StandInSMBus and returns it
+def stand_in_i2c_bus():
+	import grove_i2c_bus
+	grove_i2c_bus.set_default_bus(1)
+	bus = StandInSMBus()
+	grove_i2c_bus.get_bus(1).attach(bus)
+	return bus
+
+# Stand-in for serial.Serial
+# what is written can be read back, and incoming data can be queued with feed()
+class StandInSerial(object):
+	def __init__(self, *args, **kwargs):
+		self.incoming = bytearray()
+		self.position = 0
+
+	def feed(self, data):
+		self.incoming += bytearray(data)
+
+	def write(self, data):
+		self.feed(data)
+		return len(data)
+
+	def read(self, size = 1):
+		data = bytes(self.incoming[self.position:self.position + size])
+		self.position += len(data)
+		return data
+
+	def readline(self):
+		end = self.incoming.find(b"\n", self.position)
+		end = len(self.incoming) if end == -1 else end + 1
+		return self.read(end - self.position)
+
+	def rewind(self):
+		self.position = 0
+
+	def flush(self):
+		pass
+
+	def flushInput(self):
+		pass
+
+	def close(self):
+		pass
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+#
+# GrovePi Python library benchmarks
+#
+# Runs every benchmark against stand-in buses (a virtual GrovePi, a stand-in SMBus and a stand-in
+# serial port), writes the results to a JSON file and compares them against a stored baseline:
+#
+#	python run_benchmarks.py --save-baseline     # on a known good version
+#	python run_benchmarks.py                     # exits with 1 if anything got slower
+#
+# A result is a regression when its ops/s dropped or its p99 latency grew by more than --tolerance.
+#
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/DexterInd/GrovePi/blob/master/LICENSE
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+
+import common
+import bench_grovepi
+import bench_displays
+import bench_parsers
+import bench_imports
+import bench_filters
+import bench_leds
+
+suites = {
+	"grovepi" : bench_grovepi,
+	"displays" : bench_displays,
+	"parsers" : bench_parsers,
+	"imports" : bench_imports,
+	"filters" : bench_filters,
+	"leds" : bench_leds,
+}
+
+default_baseline = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+def compare(results, baseline, tolerance):
+	regressions = []
+	for name, result in sorted(results.items()):
+		reference = baseline.get(name)
+		if reference is None:
+			continue
+		if result["ops_per_sec"] < reference["ops_per_sec"] * (1.0 - tolerance):
+			regressions.append("{}: {:.1f} ops/s, baseline {:.1f} ops/s".format(name, result["ops_per_sec"], reference["ops_per_sec"]))
+		if result["p99"] > reference["p99"] * (1.0 + tolerance):
+			regressions.append("{}: p99 {:.6f} s, baseline {:.6f} s".format(name, result["p99"], reference["p99"]))
+	return regressions
+
+def main():
+	parser = argparse.ArgumentParser(description = "GrovePi Python library benchmarks")
+	parser.add_argument("--suite", action = "append", choices = sorted(suites), help = "suite to run, all of them by default")
+	parser.add_argument("--iterations", type = int, default = 1000, help = "iterations of the fast benchmarks")
+	parser.add_argument("--latency-scale", type = float, default = 1.0, help = "factor applied to the virtual GrovePi's processing times")
+	parser.add_argument("--output", default = "benchmark_results.json", help = "where to write the results")
+	parser.add_argument("--baseline", default = default_baseline, help = "baseline to compare against")
+	parser.add_argument("--save-baseline", action = "store_true", help = "store the results as the new baseline")
+	parser.add_argument("--tolerance", type = float, default = 0.2, help = "allowed relative slowdown")
+	options = parser.parse_args()
+
+	results = {}
+	for name in options.suite or sorted(suites):
+		for result in suites[name].run(options):
+			results[result["name"]] = result
+			extra = ""
+			if "units_per_sec" in result:
+				extra = " {:12.1f} {}/s".format(result["units_per_sec"], result["unit"])
+			print("{:45s} {:10.1f} ops/s  p50 {:.6f} s  p99 {:.6f} s{}".format(
+				result["name"], result["ops_per_sec"], result["p50"], result["p99"], extra))
+
+	report = {
+		"meta" : {
+			"time" : time.strftime("%Y-%m-%d %H:%M:%S"),
+			"python" : platform.python_version(),
+			"machine" : platform.machine(),
+			"latency_scale" : options.latency_scale,
+			"iterations" : options.iterations
+		},
+		"benchmarks" : results
+	}
+	with open(options.output, "w") as output:
+		json.dump(report, output, indent = 2, sort_keys = True)
+
+	if options.save_baseline:
+		with open(options.baseline, "w") as output:
+			json.dump(report, output, indent = 2, sort_keys = True)
+		print("baseline saved to " + options.baseline)
+		return 0
+
+	if not os.path.exists(options.baseline):
+		print("no baseline at {}, run with --save-baseline to create one".format(options.baseline))
+		return 0
+
+	with open(options.baseline) as baseline_file:
+		baseline = json.load(baseline_file)
+	regressions = compare(results, baseline["benchmarks"], options.tolerance)
+	for regression in regressions:
+		print("REGRESSION " + regression)
+	if len(regressions) == 0:
+		print("no regression against " + options.baseline)
+	return 1 if regressions else 0
+
+if __name__ == "__main__":
+	sys.exit(main())
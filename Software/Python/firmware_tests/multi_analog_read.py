@@ -43,9 +43,9 @@ sensor2 = 2
 
 while True:
     try:
-        sensor_value0 = grovepi.analogRead(sensor0)
-        sensor_value1 = grovepi.analogRead(sensor1)
-        sensor_value2 = grovepi.analogRead(sensor2)
+        # read the 3 sensors in one scan instead of 3 separate round-trips
+        values, timestamps = grovepi.analogReadMany([sensor0, sensor1, sensor2])
+        sensor_value0, sensor_value1, sensor_value2 = values[0]
         print ("%d,%d,%d" %(sensor_value0,sensor_value1,sensor_value2))
     except IOError:
         print ("Error")
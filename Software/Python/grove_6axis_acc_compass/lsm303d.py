@@ -13,16 +13,11 @@
 # For more information see https://github.com/DexterInd/GrovePi/blob/master/LICENSE
 
 import time,sys
-import RPi.GPIO as GPIO
-import smbus
+import grove_i2c_bus
 import math
 
 # use the bus that matches your raspi version
-rev = GPIO.RPI_REVISION
-if rev == 2 or rev == 3:
-    bus = smbus.SMBus(1)
-else:
-    bus = smbus.SMBus(0)
+bus = grove_i2c_bus.get_bus()
 
 class lsm303d:
 	# LSM303 Address definitions
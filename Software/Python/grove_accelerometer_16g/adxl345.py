@@ -7,13 +7,11 @@
 # the Adafruit Triple Axis ADXL345 breakout board:
 # http://shop.pimoroni.com/products/adafruit-triple-axis-accelerometer
 
-import smbus
+import grove_i2c_bus
 from time import sleep
 
 # select the correct i2c bus for this revision of Raspberry Pi
-with open('/proc/cpuinfo', 'r') as file:
-    revision = ([l[12:-1] for l in file.readlines() if l[:8]=="Revision"]+['0000'])[0]
-bus = smbus.SMBus(1 if int(revision, 16) >= 4 else 0)
+bus = grove_i2c_bus.get_bus()
 
 # ADXL345 constants
 EARTH_GRAVITY_MS2   = 9.80665
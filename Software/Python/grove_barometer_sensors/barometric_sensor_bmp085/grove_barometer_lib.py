@@ -18,16 +18,12 @@
 # For more information see https://github.com/DexterInd/GrovePi/blob/master/LICENSE
 
 
-import smbus
+import grove_i2c_bus
 import time
-import RPi.GPIO as GPIO
 
 
-rev = GPIO.RPI_REVISION
-if rev == 2 or rev == 3:
-    bus = smbus.SMBus(1)
-else:
-    bus = smbus.SMBus(0)
+# use the bus that matches your raspi version
+bus = grove_i2c_bus.get_bus()
 
 HP20X_I2C_DEV_ID = 0x76     # Barometer device address
 
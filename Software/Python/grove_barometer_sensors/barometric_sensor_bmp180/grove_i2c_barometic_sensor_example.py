@@ -1,7 +1,5 @@
 #!/usr/bin/python
 
-import smbus
-import RPi.GPIO as GPIO
 #import grovepi
 from grove_i2c_barometic_sensor_BMP180 import BMP085
 
@@ -19,12 +17,6 @@ bmp = BMP085(0x77, 1)
 # bmp = BMP085(0x77, 2)  # HIRES Mode
 # bmp = BMP085(0x77, 3)  # ULTRAHIRES Mode
 
-rev = GPIO.RPI_REVISION
-if rev == 2 or rev == 3:
-    bus = smbus.SMBus(1)
-else:
-    bus = smbus.SMBus(0)
-
 temp = bmp.readTemperature()
 
 # Read the current barometric pressure level
@@ -7,67 +7,174 @@
 # Have a question about this library?  Ask on the forums here:  http://forum.dexterindustries.com/c/grovepi
 #
 # This library is derived from the Arduino library written by Oliver Wang for SeeedStudio (https://github.com/Seeed-Studio/Grove_Barometer_HP20x/tree/master/HP20x_dev)
+#
+# The noises are fixed, so the gain of the filter converges to a constant which is computed once
+# (the steady-state gain) and the output only depends on the measurements.
+# Nothing in here is specific to the barometer, any sensor reading can be smoothed with it:
+#
+#	import KalmanFilter
+#
+#	pressure_filter = KalmanFilter.KalmanFilter(process_noise = 0.01, measurement_noise = 1.0)
+#	smoothed = pressure_filter.Filter(h.ReadPressure())
+#	history = pressure_filter.filter_batch(numpy_array_of_pressures)
+#
+#	position_filter = KalmanFilter.MultivariateKalmanFilter(
+#		transition = [[1, dt], [0, 1]], observation = [[1, 0]],
+#		process_noise = [[0.01, 0], [0, 0.01]], measurement_noise = [[1.0]])
+#	[position, speed] = position_filter.filter([measured_position])
+
+import math
+
+# Noise variance used when none is given
+# it's what the random noise draws of the original library averaged to
+default_noise = 1.1709
 
-from random import randint
-Rand_Table=[
-0.5377,1.8339,-2.2588,0.8622,0.3188,-1.3077,-0.4336,0.342,3.5784,
-2.7694,-1.3499,3.0349,0.7254,-0.0631,0.7147,-0.2050,-0.1241,1.4897,
-1.4090,1.4172,0.6715,-1.2075,0.7172,1.6302,0.4889,1.0347,0.7269,
--0.3034,0.2939,-0.7873,0.8884,-1.1471,-1.0689,-0.8095,-2.9443,1.4384,
-0.3252,-0.7549,1.3703,-1.7115,-0.1022,-0.2414,0.3192,0.3129,-0.8649,
--0.0301,-0.1649,0.6277,1.0933,1.1093,-0.8637,0.0774,-1.2141,-1.1135,
--0.0068,1.5326,-0.7697,0.3714,-0.2256,1.1174,-1.0891,0.0326,0.5525,
-1.1006,1.5442,0.0859,-1.4916,-0.7423,-1.0616,2.3505,-0.6156,0.7481,
--0.1924,0.8886,-0.7648,-1.4023,-1.4224,0.4882,-0.1774,-0.1961,1.4193,
-0.2916,0.1978,1.5877,-0.8045,0.6966,0.8351,-0.2437,0.2157,-1.1658,
--1.1480,0.1049,0.7223,2.5855,-0.6669,0.1873,-0.0825,-1.9330,-0.439,
--1.7947]
+# returns the steady-state gain of a scalar random walk measured with noise
+# process_noise: variance added to the value between two measurements
+# measurement_noise: variance of a measurement
+def steady_state_gain(process_noise, measurement_noise):
+	if process_noise < 0 or measurement_noise < 0:
+		raise ValueError("the noise variances can't be negative")
+	# variance of the prediction, the positive root of p^2 - Q.p - Q.R = 0
+	prediction = (process_noise + math.sqrt(process_noise * process_noise + 4 * process_noise * measurement_noise)) / 2
+	if prediction + measurement_noise == 0:
+		return 1.0
+	return prediction / (prediction + measurement_noise)
+
+# Scalar Kalman filter
+# initial: the starting estimate, the first measurement is used when it's None
 class KalmanFilter:
-	X_pre=0
-	X_post=0
-	P_pre=0
-	P_post=0
-	K_cur=0
-
-	def __init__(self):
-		self.X_pre=0
-
-	def Gaussian_Noise_Cov(self):
-		index = 0
-		tmp=[0.0]*10
-		average = 0.0
-		sum = 0.0
-
-		#Get random number */
-		for i in range(10):
-
-			index = randint(0,90)
-			tmp[i] = Rand_Table[index]
-			sum += tmp[i];
-
-		# Calculate average
-		average = sum/10
-
-		#Calculate Variance
-		Variance = 0.0
-		for j in range(10):
-			Variance += (tmp[j]-average)*(tmp[j]-average)
-		Variance/=10.0
-		return Variance
-
-	def Filter(self,origin):
-		modelNoise = 0.0
-		observeNoise = 0.0
-
-		# Get model and observe Noise
-		modelNoise = self.Gaussian_Noise_Cov()
-		observeNoise = self.Gaussian_Noise_Cov()
-
-		# Algorithm
-		self.X_pre = self.X_post
-		self.P_pre = self.P_post + modelNoise;
-		self.K_cur = self.P_pre/(self.P_pre + observeNoise);
-		self.P_post = (1 - self.K_cur)*self.P_pre;
-		self.X_post = self.X_pre + self.K_cur*(origin - self.X_pre);
+	def __init__(self, process_noise = default_noise, measurement_noise = default_noise, initial = None):
+		self.process_noise = process_noise
+		self.measurement_noise = measurement_noise
+		self.K_cur = steady_state_gain(process_noise, measurement_noise)
+		# variances of the prediction and of the estimate, both constant
+		self.P_pre = self.K_cur * measurement_noise / (1 - self.K_cur) if self.K_cur < 1 else process_noise
+		self.P_post = (1 - self.K_cur) * self.P_pre
+		self.reset(initial)
+
+	def reset(self, initial = None):
+		self.X_pre = initial
+		self.X_post = initial
 
+	# returns the new estimate after the measurement origin
+	def Filter(self, origin):
+		if self.X_post is None:
+			self.X_pre = self.X_post = origin
+			return origin
+
+		self.X_pre = self.X_post
+		self.X_post = self.X_pre + self.K_cur * (origin - self.X_pre)
 		return self.X_post
+
+	# filters a series of measurements, as if Filter was called on each of them
+	# returns the numpy array of the estimates
+	def filter_batch(self, values):
+		import numpy
+		values = numpy.asarray(values, dtype = numpy.float64).ravel()
+		estimates = numpy.empty_like(values)
+		if values.size == 0:
+			return estimates
+
+		start = 0
+		if self.X_post is None:
+			estimates[0] = values[0]
+			start = 1
+		else:
+			estimates[0] = self.X_post
+		state = estimates[0]
+
+		decay = 1.0 - self.K_cur
+		if decay <= 0:
+			estimates[start:] = values[start:]
+		elif decay >= 1:
+			estimates[start:] = state
+		else:
+			# estimate[i] = decay^(i+1) * state + K * decay^i * sum(decay^-j * value[j] for j <= i)
+			# computed over chunks short enough for decay^-j to stay far from overflowing
+			chunk = int(max(1, min(4096, 250 / -math.log10(decay))))
+			powers = decay ** numpy.arange(chunk)
+			for begin in range(start, values.size, chunk):
+				block = values[begin:begin + chunk]
+				weights = powers[:block.size]
+				sums = numpy.cumsum(block / weights)
+				estimates[begin:begin + block.size] = decay * weights * state + self.K_cur * weights * sums
+				state = estimates[begin + block.size - 1]
+
+		self.X_pre = self.X_post = float(estimates[-1])
+		return estimates
+
+# Kalman filter of a state vector x measured through z = observation . x
+# transition: matrix F moving the state from one measurement to the next
+# observation: matrix H giving the measurements from the state
+# process_noise, measurement_noise: covariance matrices Q and R
+# initial: the starting state, the least-squares solution of the first measurement is used when it's None
+class MultivariateKalmanFilter(object):
+	def __init__(self, transition, observation, process_noise, measurement_noise, initial = None, iterations = 10000):
+		import numpy
+		self.transition = numpy.atleast_2d(numpy.asarray(transition, dtype = numpy.float64))
+		self.observation = numpy.atleast_2d(numpy.asarray(observation, dtype = numpy.float64))
+		self.process_noise = numpy.atleast_2d(numpy.asarray(process_noise, dtype = numpy.float64))
+		self.measurement_noise = numpy.atleast_2d(numpy.asarray(measurement_noise, dtype = numpy.float64))
+
+		# iterate the Riccati equation until the covariance settles
+		F, H, Q, R = self.transition, self.observation, self.process_noise, self.measurement_noise
+		identity = numpy.eye(F.shape[0])
+		covariance = Q.copy()
+		for _ in range(iterations):
+			prediction = F.dot(covariance).dot(F.T) + Q
+			gain = prediction.dot(H.T).dot(numpy.linalg.inv(H.dot(prediction).dot(H.T) + R))
+			updated = (identity - gain.dot(H)).dot(prediction)
+			converged = numpy.allclose(updated, covariance, rtol = 1e-12, atol = 1e-15)
+			covariance = updated
+			if converged:
+				break
+
+		self.gain = gain
+		self.prediction_covariance = prediction
+		self.covariance = covariance
+		# x' = F.x + K.(z - H.F.x) = update.x + K.z
+		self.update = (identity - gain.dot(H)).dot(F)
+		self.reset(initial)
+
+	def reset(self, initial = None):
+		import numpy
+		self.state = None if initial is None else numpy.asarray(initial, dtype = numpy.float64).ravel()
+
+	def _start(self, measurement):
+		import numpy
+		self.state = numpy.linalg.lstsq(self.observation, measurement, rcond = None)[0]
+		return self.state.copy()
+
+	# returns the new state estimate after a measurement vector
+	def filter(self, measurement):
+		import numpy
+		measurement = numpy.asarray(measurement, dtype = numpy.float64).ravel()
+		if self.state is None:
+			return self._start(measurement)
+		self.state = self.update.dot(self.state) + self.gain.dot(measurement)
+		return self.state.copy()
+
+	# filters a series of measurement vectors, one per row, as if filter was called on each of them
+	# returns the numpy array of the state estimates, one per row
+	def filter_batch(self, measurements):
+		import numpy
+		measurements = numpy.asarray(measurements, dtype = numpy.float64)
+		measurements = measurements.reshape(len(measurements), -1)
+		states = numpy.empty((len(measurements), self.update.shape[0]))
+		if len(measurements) == 0:
+			return states
+
+		start = 0
+		if self.state is None:
+			states[0] = self._start(measurements[0])
+			start = 1
+		# the measurement terms of every step in one go, only the state recursion is left to the loop
+		inputs = measurements.dot(self.gain.T)
+		state = self.state
+		update = self.update
+		for index in range(start, len(measurements)):
+			state = update.dot(state) + inputs[index]
+			states[index] = state
+		self.state = state.copy()
+		return states
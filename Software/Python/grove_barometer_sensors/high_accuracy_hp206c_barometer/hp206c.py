@@ -12,15 +12,10 @@
 # For more information see https://github.com/DexterInd/GrovePi/blob/master/LICENSE
 
 import time,sys
-import RPi.GPIO as GPIO
-import smbus
+import grove_i2c_bus
 
 # use the bus that matches your raspi version
-rev = GPIO.RPI_REVISION
-if rev == 2 or rev == 3:
-    bus = smbus.SMBus(1)
-else:
-    bus = smbus.SMBus(0)
+bus = grove_i2c_bus.get_bus()
 
 class hp206c:
 	address = None
@@ -29,91 +29,221 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 THE SOFTWARE.
 '''
 # Note: Connect the chainable LED to port RPISER on the GrovePi
+#
+# A frame of the whole chain is encoded into its byte stream at once, through lookup tables,
+# and pushed out by a backend:
+#
+#	l = chainable_rgb_direct.rgb_led(3)					# bit-banged with RPi.GPIO
+#	l = chainable_rgb_direct.rgb_led(3, chainable_rgb_direct.SpiBackend())	# the chain on the SPI pins instead
+#	l.show([(255,0,0), (0,255,0), (0,0,255)])
+#
+# The backends only need a write(data) method taking a bytearray, FakeGPIO stands for RPi.GPIO in tests.
 import time,sys
-import RPi.GPIO as GPIO
-import smbus
+
+# The P9813 reads a colour as a flag byte followed by blue, green and red.
+# The flag byte is 0b11 followed by the inverted 2 high bits of blue, green and red, it works as a checksum.
+# Each table gives a colour's share of the flag byte.
+_blue_flags = bytearray(((~v >> 6) & 0x03) << 4 for v in range(256))
+_green_flags = bytearray(((~v >> 6) & 0x03) << 2 for v in range(256))
+_red_flags = bytearray((~v >> 6) & 0x03 for v in range(256))
+
+# a frame starts and ends with 32 bits of 0
+frame_boundary = bytearray(4)
+
+# returns the 4 bytes the P9813 receives for a colour
+def encode_color(r, g, b):
+	return bytearray((0xC0 | _blue_flags[b] | _green_flags[g] | _red_flags[r], b, g, r))
+
+# returns the byte stream of a frame, colors being a (r, g, b) for each LED of the chain
+def encode_frame(colors):
+	stream = bytearray(frame_boundary)
+	for r, g, b in colors:
+		stream += encode_color(r, g, b)
+	stream += frame_boundary
+	return stream
+
+# returns the (r, g, b) of each LED of a frame's byte stream
+# raises ValueError when a flag byte doesn't match its colour
+def decode_frame(stream):
+	stream = bytearray(stream)
+	colors = []
+	for start in range(len(frame_boundary), len(stream) - len(frame_boundary), 4):
+		flags, b, g, r = stream[start:start + 4]
+		if flags != encode_color(r, g, b)[0]:
+			raise ValueError("bad flag byte {:#04x} for LED {}".format(flags, len(colors)))
+		colors.append((r, g, b))
+	return colors
+
+# Bit-bangs the stream on 2 GPIOs, the data being latched on the rising edges of the clock
+# gpio: the RPi.GPIO module, or a stand-in like FakeGPIO
+# delay: seconds to wait on each edge, Python is already slower than the P9813 needs without it
+class GPIOBackend(object):
+	# the 8 bits of each byte, most significant first
+	bits = [tuple((value >> shift) & 1 for shift in range(7, -1, -1)) for value in range(256)]
+
+	def __init__(self, clk_pin = 15, data_pin = 14, gpio = None, delay = 0):
+		if gpio is None:
+			import RPi.GPIO as gpio
+		self.gpio = gpio
+		self.clk_pin = clk_pin		# RX pin BCM
+		self.data_pin = data_pin	# TX pin BCM
+		self.delay = delay
+		gpio.setwarnings(False)
+		gpio.setmode(gpio.BCM)
+		gpio.setup(clk_pin, gpio.OUT)
+		gpio.setup(data_pin, gpio.OUT)
+		self.data_level = None
+
+	def write(self, data):
+		output = self.gpio.output
+		clk_pin = self.clk_pin
+		data_pin = self.data_pin
+		level = self.data_level
+		for value in data:
+			for bit in self.bits[value]:
+				output(clk_pin, 0)
+				if self.delay:
+					time.sleep(self.delay)
+				# the data only changes after the falling edge of the clock, and only when it has to
+				if bit != level:
+					output(data_pin, bit)
+					level = bit
+				output(clk_pin, 1)
+				if self.delay:
+					time.sleep(self.delay)
+		self.data_level = level
+
+# Sends the stream with the SPI hardware, the chain being wired to SCLK (clock) and MOSI (data)
+# The P9813 latches on the rising edge of the clock, which is SPI mode 0
+class SpiBackend(object):
+	def __init__(self, bus = 0, device = 0, speed_hz = 500000):
+		import spidev
+		self.spi = spidev.SpiDev()
+		self.spi.open(bus, device)
+		self.spi.mode = 0
+		self.spi.max_speed_hz = speed_hz
+
+	def write(self, data):
+		# spidev takes at most 4096 bytes per transfer
+		for start in range(0, len(data), 4096):
+			self.spi.writebytes(list(data[start:start + 4096]))
+
+	def close(self):
+		self.spi.close()
+
+# Sends the stream as pigpio waves, timed by the pigpio daemon's DMA instead of Python
+# bit_us: microseconds of each half clock period
+class PigpioBackend(object):
+	# bytes per wave, pigpio limits the number of pulses of a wave
+	wave_bytes = 256
+
+	def __init__(self, clk_pin = 15, data_pin = 14, bit_us = 1, pi = None):
+		import pigpio
+		self.pigpio = pigpio
+		self.pi = pigpio.pi() if pi is None else pi
+		self.clk_pin = clk_pin
+		self.data_pin = data_pin
+		self.pi.set_mode(clk_pin, pigpio.OUTPUT)
+		self.pi.set_mode(data_pin, pigpio.OUTPUT)
+		clk = 1 << clk_pin
+		data = 1 << data_pin
+		# the 16 pulses of each byte: clock low with the data bit, then clock high
+		self.pulses = []
+		for bits in GPIOBackend.bits:
+			pulses = []
+			for bit in bits:
+				pulses.append(pigpio.pulse(data if bit else 0, clk | (0 if bit else data), bit_us))
+				pulses.append(pigpio.pulse(clk, 0, bit_us))
+			self.pulses.append(pulses)
+
+	def write(self, data):
+		for start in range(0, len(data), self.wave_bytes):
+			pulses = []
+			for value in data[start:start + self.wave_bytes]:
+				pulses += self.pulses[value]
+			self.pi.wave_add_generic(pulses)
+			wave = self.pi.wave_create()
+			self.pi.wave_send_once(wave)
+			while self.pi.wave_tx_busy():
+				time.sleep(0.0001)
+			self.pi.wave_delete(wave)
+
+	def close(self):
+		self.pi.stop()
+
+# Stands for RPi.GPIO, for GPIOBackend(gpio = FakeGPIO())
+# It keeps the bits latched on the rising edges of the clock, received() returns them as bytes
+class FakeGPIO(object):
+	BCM = 11
+	OUT = 0
+
+	def __init__(self, clk_pin = 15, data_pin = 14):
+		self.clk_pin = clk_pin
+		self.data_pin = data_pin
+		self.levels = {}
+		self.latched = []
+		self.outputs = 0
+
+	def setwarnings(self, flag):
+		pass
+
+	def setmode(self, mode):
+		pass
+
+	def setup(self, pin, mode):
+		self.levels[pin] = 0
+
+	def output(self, pin, value):
+		self.outputs += 1
+		if pin == self.clk_pin and value and not self.levels[pin]:
+			self.latched.append(self.levels[self.data_pin])
+		self.levels[pin] = value
+
+	def received(self):
+		data = bytearray()
+		for start in range(0, len(self.latched) - 7, 8):
+			value = 0
+			for bit in self.latched[start:start + 8]:
+				value = (value << 1) | bit
+			data.append(value)
+		return data
+
+	def clear(self):
+		del self.latched[:]
 
 class rgb_led:
 	r_all=[]
 	g_all=[]
 	b_all=[]
 	
-	def __init__(self,led=1):
-		GPIO.setwarnings(False)
+	# backend: what sends the byte stream, a GPIOBackend on the RPISER port by default
+	def __init__(self,led=1,backend=None):
 		self.num_led=led
 		self.r_all=[0] * self.num_led
 		self.g_all=[0] * self.num_led
 		self.b_all=[0] * self.num_led
-		             
-		GPIO.setmode(GPIO.BCM)  
-		self.clk_pin= 15 #RX pin BCM
-		self.data_pin= 14 # TX pin BCM 
-		self.tv_nsec= 100
-		GPIO.setup(self.clk_pin, GPIO.OUT)
-		GPIO.setup(self.data_pin, GPIO.OUT)
+		self.backend = GPIOBackend() if backend is None else backend
+
+	# shows a frame, colors being a (r, g, b) for each LED of the chain
+	def show(self,colors):
+		colors = list(colors)
+		for i, (r, g, b) in enumerate(colors[:self.num_led]):
+			self.r_all[i]=r
+			self.g_all[i]=g
+			self.b_all[i]=b
+		self.backend.write(encode_frame(colors))
 
 	def sendByte(self,b):
-		# print b
-		for loop in range(8):
-			# digitalWrite(CLKPIN, LOW);
-			GPIO.output(self.clk_pin,0)
-			time.sleep(self.tv_nsec/1000000.0)
-			# nanosleep(&TIMCLOCKINTERVAL, NULL);
-			
-			# The  ic will latch a bit of data when the rising edge of the clock coming, And the data should changed after the falling edge of the clock; 
-			# Copyed from P9813 datasheet
-			
-			if (b & 0x80) != 0:
-				# digitalWrite(DATPIN, HIGH)
-				GPIO.output(self.data_pin,1)
-			else:
-				# digitalWrite(DATPIN, LOW):
-				GPIO.output(self.data_pin,0)
-			
-			# digitalWrite(CLKPIN, HIGH);
-			GPIO.output(self.clk_pin,1)
-			# nanosleep(&TIMCLOCKINTERVAL, NULL);
-			time.sleep(self.tv_nsec/1000000.0)
-			# //usleep(CLOCKINTERVAL);
-			
-			b <<= 1
+		self.backend.write(bytearray([b & 0xFF]))
 			
 	def sendColor(self,r, g, b):
-		prefix = 0b11000000;
-		if (b & 0x80) == 0:
-			prefix |= 0b00100000
-		if (b & 0x40) == 0:	
-			prefix |= 0b00010000
-		if (g & 0x80) == 0:	
-			prefix |= 0b00001000
-		if (g & 0x40) == 0:	
-			prefix |= 0b00000100
-		if (r & 0x80) == 0:	
-			prefix |= 0b00000010
-		if (r & 0x40) == 0:	
-			prefix |= 0b00000001
-	
-		self.sendByte(prefix)
-		self.sendByte(b)
-		self.sendByte(g)
-		self.sendByte(r)
+		self.backend.write(encode_color(r, g, b))
 		
 	def setColorRGB(self,r,g,b):
-		for i in range(4):
-			self.sendByte(0)
-		
-		self.sendColor(r, g, b);
-		
-		for i in range(4):
-			self.sendByte(0)
+		self.backend.write(encode_frame([(r, g, b)]))
 		
 	def setColorRGBs(self,r,g,b,count):
-		for i in range(4):
-				self.sendByte(0)
-		for i in range(count):
-			self.sendColor(r[i], g[i], b[i])
-		for i in range(4):
-				self.sendByte(0)
+		self.show(zip(r[:count], g[:count], b[:count]))
 	
 	def setOneLED(self,r,g,b,led_num):
 		self.r_all[led_num]=r
@@ -132,4 +262,4 @@ if __name__ == "__main__":
 	r=[0,0,255]
 	g=[0,255,0]
 	b=[255,0,0]
-	l.setColorRGBs(r,g,b,num_led)
\ No newline at end of file
+	l.setColorRGBs(r,g,b,num_led)
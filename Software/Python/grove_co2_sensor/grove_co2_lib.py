@@ -25,7 +25,14 @@
 import serial, time
 import struct
 
-ser = serial.Serial('/dev/ttyAMA0',  9600)	#Open the serial port at 9600 baud
+ser = None
+
+# the serial port is opened by the first CO2 object instead of at import
+def open_serial():
+	global ser
+	if ser is None:
+		ser = serial.Serial('/dev/ttyAMA0',  9600)	#Open the serial port at 9600 baud
+	return ser
 
 class CO2:
 #inspired from c code of http://www.seeedstudio.com/wiki/Grove_-_CO2_Sensor
@@ -40,7 +47,7 @@ class CO2:
 		#ser = serial.Serial('/dev/ttyAMA0',  9600, timeout = 1)	#Open the serial port at 9600 baud
 
 		#init serial
-		ser.flush()
+		open_serial().flush()
 		
 	def read(self):
 		try:
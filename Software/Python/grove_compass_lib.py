@@ -40,17 +40,13 @@ THE SOFTWARE.
 # NOTE:		                                                              
 # Refer to the datasheet to add additional functionality https://www.seeedstudio.com/wiki/images/4/42/HMC5883.pdf
 
-import smbus
+import grove_i2c_bus
 import time
 import math
-import RPi.GPIO as GPIO
 import struct
 
-rev = GPIO.RPI_REVISION
-if rev == 2 or rev == 3:
-    bus = smbus.SMBus(1)
-else:
-    bus = smbus.SMBus(0)
+# use the bus that matches your raspi version
+bus = grove_i2c_bus.get_bus()
 	
 HMC5883L_ADDRESS            =0x1E
 
@@ -2,13 +2,15 @@
 # For more information see https://github.com/DexterInd/GrovePi/blob/master/LICENSE
 
 import threading # we need threads for processing data seperately from the main thread
-import numpy # for statistical computations
 import datetime
+import collections # for the ring buffer
 import math # for NaNs
 from grovepi import dht # we built on top of the base function found in the grovepi library
-from grovepi import statisticalNoiseReduction # importing function which is meant for removing outliers from a given set
+from grovepi_filters import OutlierFilter # removes the outliers as the values are read
 import time
 
+_clock = getattr(time, "monotonic", time.time)
+
 
 '''
 # after a list of numerical values is provided
@@ -34,14 +36,31 @@ def statisticalNoiseReduction(values, std_factor_threshold = 2):
 	return filtered_values
 '''
 
+# what happens when the buffer is full and a new value is ready
+# the oldest value is dropped to make room for it
+DROP_OLDEST = "drop-oldest"
+# the thread waits for the consumer to make room, and stops reading the sensor meanwhile
+BLOCK = "block"
+
 # class for the Grove DHT sensor
 # it was designed so that on a separate thread the values from the DHT sensor are read
 # on the same separate thread, the filtering process takes place
+# the filtered values go to a ring buffer of capacity (temperature, humidity) tuples
+# which can be consumed with get(), feedMe() or by iterating over the object:
+#
+#	for temperature, humidity in dht_sensor:
+#		print(temperature, humidity)
 class Dht(threading.Thread):
 	# refresh_period specifies for how long data is captured before it's filtered
-	def __init__(self, pin = 4, refresh_period = 10.0, debugging = False):
+	# capacity is the size of the buffer and policy what happens when it's full (DROP_OLDEST or BLOCK)
+	def __init__(self, pin = 4, refresh_period = 10.0, debugging = False, capacity = 100, policy = DROP_OLDEST):
 		super(Dht, self).__init__(name = "DHT filtering")
 
+		if capacity < 1:
+			raise ValueError("capacity must be positive")
+		if policy not in [DROP_OLDEST, BLOCK]:
+			raise ValueError("policy must be DROP_OLDEST or BLOCK")
+
 		self.pin = pin
 		self.refresh_period = refresh_period
 		self.debugging = debugging
@@ -54,13 +73,30 @@ class Dht(threading.Thread):
 		self.sensor_type = self.blue_sensor
 
 		self.lock = threading.Lock()
+		# notified whenever a value is added or removed, and when the thread stops
+		self.condition = threading.Condition(self.lock)
 
-		self.filtered_temperature = []
-		self.filtered_humidity = []
+		self.capacity = capacity
+		self.policy = policy
+		self.buffer = collections.deque()
+		# values dropped because the buffer was full, and times the buffer was found full
+		self.dropped = 0
+		self.overruns = 0
 
 		self.last_temperature = None
 		self.last_humidity = None
 
+	# the buffered values, oldest first
+	@property
+	def filtered_temperature(self):
+		with self.lock:
+			return [entry[0] for entry in self.buffer]
+
+	@property
+	def filtered_humidity(self):
+		with self.lock:
+			return [entry[1] for entry in self.buffer]
+
 	# refresh_period specifies for how long data is captured before it's filtered
 	def setRefreshPeriod(self, time):
 		self.refresh_period = time
@@ -79,10 +115,9 @@ class Dht(threading.Thread):
 
 	# removes the processed data from the buffer
 	def clearBuffer(self):
-		self.lock.acquire()
-		self.filtered_humidity = []
-		self.filtered_temperature = []
-		self.lock.release()
+		with self.condition:
+			self.buffer.clear()
+			self.condition.notify_all()
 
 	# the bigger the parameter, the less strict is the filtering process
 	# it's also vice-versa
@@ -97,20 +132,76 @@ class Dht(threading.Thread):
 		self.args = args
 
 	# stops the current thread from running
+	# consumers waiting in get() are woken up
 	def stop(self):
 		self.event_stopper.set()
+		with self.condition:
+			self.condition.notify_all()
 		self.join()
 
+	# returns a (temperature, humidity) tuple, the oldest one in the buffer
+	# waits for one for up to timeout seconds, or until the thread stops when timeout is None
+	# returns (None, None) if there's still nothing in the buffer
+	def get(self, timeout = None):
+		with self.condition:
+			if timeout is None:
+				while len(self.buffer) == 0 and not self.event_stopper.is_set():
+					self.condition.wait()
+			else:
+				deadline = _clock() + timeout
+				while len(self.buffer) == 0 and not self.event_stopper.is_set():
+					remaining = deadline - _clock()
+					if remaining <= 0:
+						break
+					self.condition.wait(remaining)
+
+			if len(self.buffer) == 0:
+				return (None, None)
+			entry = self.buffer.popleft()
+			self.condition.notify_all()
+			return entry
+
+	# goes through the values as they come, until the thread is stopped and the buffer is empty
+	def __iter__(self):
+		while True:
+			entry = self.get()
+			if entry[0] is None:
+				return
+			yield entry
+
+	# returns {dropped, overruns, buffered}
+	def stats(self):
+		with self.lock:
+			return {
+				"dropped" : self.dropped,
+				"overruns" : self.overruns,
+				"buffered" : len(self.buffer)
+			}
+
+	# adds a filtered value to the buffer, applying the policy when it's full
+	def put(self, temperature, humidity):
+		with self.condition:
+			if len(self.buffer) >= self.capacity:
+				self.overruns += 1
+				if self.policy == BLOCK:
+					while len(self.buffer) >= self.capacity and not self.event_stopper.is_set():
+						self.condition.wait()
+				# still full when we're stopped, or dropping is the policy
+				while len(self.buffer) >= self.capacity:
+					self.buffer.popleft()
+					self.dropped += 1
+			self.buffer.append((temperature, humidity))
+			self.condition.notify_all()
+
 	# replaces the need to custom-create code for outputting logs/data
 	# print(dhtObject) can be used instead
 	def __str__(self):
 		string = ""
-		self.lock.acquire()
-		# check if we have values in the buffer
-		if len(self.filtered_humidity) > 0:
-			self.last_temperature = self.filtered_temperature.pop()
-			self.last_humidity = self.filtered_humidity.pop()
-		self.lock.release()
+		with self.condition:
+			# check if we have values in the buffer
+			if len(self.buffer) > 0:
+				self.last_temperature, self.last_humidity = self.buffer.pop()
+				self.condition.notify_all()
 
 		# retrieve the last read value
 		if not self.last_humidity is None:
@@ -125,35 +216,39 @@ class Dht(threading.Thread):
 
 		return string
 
-	# returns a tuple with the (temperature, humidity) format
+	# returns a tuple with the (temperature, humidity) format, the newest one in the buffer
 	# if there's nothing in the buffer, then it returns (None, None)
+	# use get() to wait for values instead of polling this one
 	def feedMe(self):
-
-		if self.length() > 0:
-			self.lock.acquire()
-			temp = self.filtered_temperature.pop()
-			hum = self.filtered_humidity.pop()
-			self.lock.release()
-			return (temp, hum)
-		else:
-			return (None, None)
+		with self.condition:
+			if len(self.buffer) == 0:
+				return (None, None)
+			entry = self.buffer.pop()
+			self.condition.notify_all()
+			return entry
 
 	# returns the length of the buffer
 	# the buffer is filled with filtered data
 	def length(self):
-		self.lock.acquire()
-		length = len(self.filtered_humidity)
-		self.lock.release()
-		return length
+		with self.lock:
+			return len(self.buffer)
 
 	# you musn't call this function from the user-program
 	# this one is called by threading.Thread's start function
 	def run(self):
-		values = []
+		# the outliers are judged against the values of the last period
+		window = max(2, int(self.refresh_period))
+		temp_filter = OutlierFilter(self.filtering_aggresiveness, window)
+		humidity_filter = OutlierFilter(self.filtering_aggresiveness, window)
 
 		# while we haven't called stop function
 		while not self.event_stopper.is_set():
 			counter = 0
+			# sums and counts of the values kept during this period
+			temp_sum = humidity_sum = 0.0
+			temp_count = humidity_count = 0
+			temp_filter.std_factor_threshold = self.filtering_aggresiveness
+			humidity_filter.std_factor_threshold = self.filtering_aggresiveness
 
 			# while we haven't done a cycle (period)
 			while counter < self.refresh_period and not self.event_stopper.is_set():
@@ -166,8 +261,13 @@ class Dht(threading.Thread):
 
 					# check for NaN errors
 					if math.isnan(temp) is False and math.isnan(humidity) is False:
-						new_entry = {"temp" : temp, "hum" : humidity}
-						values.append(new_entry)
+						# remove outliers
+						if temp_filter.add(temp):
+							temp_sum += temp
+							temp_count += 1
+						if humidity_filter.add(humidity):
+							humidity_sum += humidity
+							humidity_count += 1
 
 					else:
 						raise RuntimeWarning("[dht sensor][we've caught a NaN]")
@@ -186,25 +286,19 @@ class Dht(threading.Thread):
 
 				finally:
 					# the DHT can be read once a second
-					time.sleep(1)
+					# returns right away when we're stopped
+					self.event_stopper.wait(1)
 
-			if len(values) > 0:
-				# remove outliers
-				temp = numpy.mean(statisticalNoiseReduction([x["temp"] for x in values], self.filtering_aggresiveness))
-				humidity = numpy.mean(statisticalNoiseReduction([x["hum"] for x in values], self.filtering_aggresiveness))
+			if temp_count > 0 and humidity_count > 0:
+				temp = temp_sum / temp_count
+				humidity = humidity_sum / humidity_count
 
 				# insert into the filtered buffer
-				self.lock.acquire()
-				self.filtered_temperature.append(temp)
-				self.filtered_humidity.append(humidity)
-				self.lock.release()
+				self.put(temp, humidity)
 
 				# if we have set a callback then call that function w/ its parameters
 				if not self.callbackfunc is None:
 					self.callbackfunc(*self.args)
 
-			# reset the values for the next iteration/period
-			values = []
-
 		if self.debugging is True:
 			print("[dht sensor][called for joining thread]")
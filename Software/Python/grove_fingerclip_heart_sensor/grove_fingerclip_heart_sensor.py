@@ -37,15 +37,10 @@ THE SOFTWARE.
 # The software for this sensor is still in development and might make your GrovePi unuable as long as this sensor is connected with the GrovePi
 #################################################################################################################################################
 import time,sys
-import RPi.GPIO as GPIO
-import smbus
+import grove_i2c_bus
 
 # use the bus that matches your raspi version
-rev = GPIO.RPI_REVISION
-if rev == 2 or rev == 3:
-    bus = smbus.SMBus(1)
-else:
-    bus = smbus.SMBus(0)
+bus = grove_i2c_bus.get_bus()
 
 class grove_fingerclip_heart_sensor:
 	address = 0x50
@@ -3,7 +3,7 @@
 
 import grovepi
 import serial, time, sys
-import re
+import grove_nmea
 
 en_debug = False
 
@@ -11,31 +11,21 @@ def debug(in_str):
     if en_debug:
         print(in_str)
 
-patterns=["$GPGGA",
-    "/[0-9]{6}\.[0-9]{2}/", # timestamp hhmmss.ss
-    "/[0-9]{4}.[0-9]{2,/}", # latitude of position
-    "/[NS]",  # North or South
-    "/[0-9]{4}.[0-9]{2}", # longitude of position
-    "/[EW]",  # East or West
-    "/[012]", # GPS Quality Indicator
-    "/[0-9]+", # Number of satellites
-    "/./", # horizontal dilution of precision x.x
-    "/[0-9]+\.[0-9]*/" # altitude x.x
-    ]
-
 class GROVEGPS():
+    '''
+    The serial port is read by a grove_nmea.Reader in a background thread,
+    so read() answers right away with the latest fix instead of waiting for the GPS.
+    '''
     def __init__(self, port='/dev/ttyAMA0', baud=9600, timeout=0):
         self.ser = serial.Serial(port, baud, timeout=timeout)
         self.ser.flush()
         self.raw_line = ""
         self.gga = []
-        self.validation =[] # contains compiled regex
-
-        # compile regex once to use later
-        for i in range(len(patterns)-1):
-            self.validation.append(re.compile(patterns[i]))
+        self.parser = grove_nmea.Parser()
 
         self.clean_data()
+        self.reader = grove_nmea.Reader(self.ser)
+        self.reader.start()
         # self.get_date()  # attempt to gete date from GPS.
 
     def clean_data(self):
@@ -44,7 +34,7 @@ class GROVEGPS():
         ensures that all relevant GPS data is set to either empty string
         or -1.0, or -1, depending on appropriate type
         This occurs right after initialisation or
-        after 50 attemps to reach GPS
+        when read() finds no valid fix
         '''
         self.timestamp = ""
         self.lat = -1.0    # degrees minutes and decimals of minute
@@ -73,89 +63,61 @@ class GROVEGPS():
     #             print (self.raw_line)
 
 
-    def read(self):
+    def read(self, timeout=0):
         '''
-        Attempts 50 times at most to get valid data from GPS
-        Returns as soon as valid data is found
-        If valid data is not found, then clean up data in GPS instance
+        Returns the fields of the latest GGA sentence with a valid fix,
+        waiting up to timeout seconds for one when there's none yet
+        If there's no valid data, then clean up data in GPS instance
         '''
-        valid = False
-        for _ in range(50):
-            time.sleep(0.5)
-            self.raw_line = self.ser.readline()
-            try:
-                self.line = self.raw_line.decode('utf-8')
-                self.line = self.line.strip()
-            except:
-                self.line = ""
-            debug(self.line)
-            if self.validate(self.line):
-                valid = True
+        cache = self.reader.cache
+        deadline = grove_nmea._clock() + timeout
+        while True:
+            line = cache.lines.get("GGA")
+            # the same sentence as last time is already in self.gga
+            if line is not None and (line == self.raw_line or self.validate(line)):
+                self.raw_line = line
+                return self.gga
+            remaining = deadline - grove_nmea._clock()
+            if remaining <= 0 or not cache.wait(remaining):
                 break
 
-        if valid:
-            return self.gga
-        else:
-            self.clean_data()
-            return []
+        self.clean_data()
+        return []
+
+    def close(self):
+        self.reader.stop()
+        self.ser.close()
 
     def validate(self, in_line):
         '''
-        Runs regex validation on a GPGAA sentence.
-        Returns False if the sentence is mangled
+        Checks a GPGGA sentence with grove_nmea (checksum and fields).
+        Returns False if the sentence is mangled or has no fix
         Return True if everything is all right and sets internal
         class members.
         '''
-        if in_line == "":
+        sentence = self.parser.parse_line(in_line)
+        if not isinstance(sentence, grove_nmea.GGA):
+            debug("Failed: not a valid GGA sentence")
             return False
-        if in_line[:6] != "$GPGGA":
+        if not sentence.quality or sentence.latitude is None or sentence.longitude is None:
+            debug("Failed: no fix")
             return False
 
-        self.gga = in_line.split(",")
+        self.line = in_line.strip()
+        self.gga = self.line[self.line.rfind("$"):].split(",")
         debug (self.gga)
 
-        #Sometimes multiple GPS data packets come into the stream. Take the data only after the last '$GPGGA' is seen
-        try:
-            ind=self.gga.index('$GPGGA', 5, len(self.gga))
-            self.gga=self.gga[ind:]
-        except ValueError:
-            pass
-
-        if len(self.gga) != 15:
-            debug ("Failed: wrong number of parameters ")
-            debug (self.gga)
-            return False
-
-        for i in range(len(self.validation)-1):
-            if len(self.gga[i]) == 0:
-                debug ("Failed: empty string %d"%i)
-                return False
-            test = self.validation[i].match(self.gga[i])
-            if test == False:
-                debug ("Failed: wrong format on parameter %d"%i)
-                return False
-            else:
-                debug("Passed %d"%i)
-
-        try:
-            self.timestamp = self.gga[1]
-            self.lat = float(self.gga[2])
-            self.NS = self.gga[3]
-            self.lon = float(self.gga[4])
-            self.EW = self.gga[5]
-            self.quality = int(self.gga[6])
-            self.satellites = int(self.gga[7])
-            self.altitude = float(self.gga[9])
-
-            self.latitude = self.lat // 100 + self.lat % 100 / 60
-            if self.NS == "S":
-                self.latitude = - self.latitude
-            self.longitude = self.lon // 100 + self.lon % 100 / 60
-            if self.EW == "W":
-                self.longitude = -self.longitude
-        except ValueError:
-            debug( "FAILED: invalid value")
-
+        self.timestamp = sentence.time
+        self.lat = float(self.gga[2])
+        self.NS = self.gga[3]
+        self.lon = float(self.gga[4])
+        self.EW = self.gga[5]
+        self.quality = sentence.quality
+        self.satellites = sentence.satellites if sentence.satellites is not None else -1
+        self.altitude = sentence.altitude if sentence.altitude is not None else -1.0
+
+        self.latitude = sentence.latitude
+        self.longitude = sentence.longitude
         return True
 
 
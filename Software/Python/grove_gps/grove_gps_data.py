@@ -54,17 +54,11 @@ import RPi.GPIO as GPIO
 import struct
 import sys
 import ir_receiver_check
+import grove_nmea
 
 enable_debug=1
 enable_save_to_file=0
 
-if ir_receiver_check.check_ir():
-	print("Disable IR receiver before continuing")
-	exit()
-	
-ser = serial.Serial('/dev/ttyAMA0',  9600, timeout = 0)	#Open the serial port at 9600 baud
-ser.flush()
-
 def cleanstr(in_str):
 	out_str = "".join([c for c in in_str if c in "0123456789.-" ])
 	if len(out_str)==0:
@@ -84,19 +78,19 @@ class GPS:
 	# Refer to SIM28 NMEA spec file http://www.seeedstudio.com/wiki/images/a/a0/SIM28_DATA_File.zip
 	GGA=[]
 
+	def __init__(self, port='/dev/ttyAMA0'):
+		self.ser = serial.Serial(port,  9600, timeout = 0.1)	#Open the serial port at 9600 baud
+		self.ser.flush()
+		# reads the port in the background and keeps the latest sentences
+		self.reader = grove_nmea.Reader(self.ser)
+		self.reader.start()
 
 	#Read data from the GPS
 	def read(self):	
-		while True:
-			GPS.inp=ser.readline()
-			if GPS.inp[:6] =='$GPGGA': # GGA data , packet 1, has all the data we need
-				break
-			time.sleep(0.1)     #without the cmd program will crash
-		try:
-			ind=GPS.inp.index('$GPGGA',5,len(GPS.inp))	#Sometimes multiple GPS data packets come into the stream. Take the data only after the last '$GPGGA' is seen
-			GPS.inp=GPS.inp[ind:]
-		except ValueError:
-			print ("")
+		# GGA data , packet 1, has all the data we need
+		while self.reader.cache.latest("GGA") is None:
+			self.reader.cache.wait()
+		GPS.inp=self.reader.cache.lines["GGA"]
 		GPS.GGA=GPS.inp.split(",")	#Split the stream into individual parts
 		return [GPS.GGA]
 		
@@ -149,6 +143,10 @@ class GPS:
 
 
 if __name__ == "__main__":
+	if ir_receiver_check.check_ir():
+		print("Disable IR receiver before continuing")
+		exit()
+	
 	g=GPS()
 	if enable_save_to_file:
 		f=open("gps_data.csv",'w')	#Open file to log the data
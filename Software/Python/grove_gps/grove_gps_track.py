@@ -0,0 +1,634 @@
+#!/usr/bin/env python
+#
+# Compact GPS track files for the Grove GPS (http://www.seeedstudio.com/depot/Grove-GPS-p-959.html)
+#
+# A track stores one record per fix: the time, the position, the altitude, the speed, the course,
+# the satellites and the hdop, plus any other value logged with it (a temperature, a humidity...).
+# Each value is a fixed-point integer (the latitude and longitude are kept to 1e-7 degree, about 1 cm),
+# stored as the difference with the previous record in a varint, so a record at one fix per second
+# takes around 15 bytes instead of the 60 or more of a line of text.
+# Every block_size records, one is stored whole (a keyframe) and indexed with its time,
+# which is how a reader seeks to a time without decoding the records before it:
+#
+#	import dextergps, grove_gps_track
+#
+#	gps = dextergps.GROVEGPS()
+#	track = grove_gps_track.TrackWriter("ride.gtrk", extra = ["temperature", "humidity"], append = True)
+#	recorder = grove_gps_track.Recorder(gps.reader.cache, track)	# writes every new fix
+#	recorder.start()
+#	...
+#	recorder.stop()
+#	track.close()
+#
+#	track = grove_gps_track.TrackReader("ride.gtrk")
+#	for record in track.seek(track.start_time + 600):		# from the 10th minute
+#		print(record.time, record.latitude, record.longitude, record.temperature)
+#	for record in track.replay(speed = 20):				# as it was recorded, 20 times faster
+#		...
+#	track.to_gpx("ride.gpx")
+#	track.to_csv("ride.csv")
+#
+# or from the command line:
+#
+#	python grove_gps_track.py ride.gtrk --gpx ride.gpx --csv ride.csv
+#
+# The records are written as they come and the index is appended when the writer is closed.
+# A track that wasn't closed (the power went off) is still read, its index is rebuilt from the records.
+#
+# The GrovePi connects the Raspberry Pi and Grove sensors.  You can learn more about GrovePi here:  http://www.dexterindustries.com/GrovePi
+#
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/DexterInd/GrovePi/blob/master/LICENSE
+
+import os
+import sys
+import time
+import struct
+import bisect
+import threading
+import collections
+
+_clock = getattr(time, "monotonic", time.time)
+
+magic = b"GTRK"
+version = 1
+index_magic = b"GIDX"
+end_magic = b"GEND"
+# index offset and end_magic
+trailer_size = 8 + len(end_magic)
+
+# (name, decimals) of the values every record has, the time is in seconds since the epoch (UTC)
+base_columns = [
+	("time", 3),
+	("latitude", 7),
+	("longitude", 7),
+	("altitude", 2),
+	("speed_kmh", 2),
+	("course", 2),
+	("satellites", 0),
+	("hdop", 2),
+]
+
+# decimals kept of the extra values, when they're only given by name
+default_decimals = 2
+
+# records between two keyframes
+default_block_size = 64
+
+def _zigzag(value):
+	return value << 1 if value >= 0 else ((-value) << 1) - 1
+
+def _unzigzag(value):
+	return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+# appends the varint of a positive integer to a bytearray
+def _put_varint(output, value):
+	while value >= 0x80:
+		output.append((value & 0x7F) | 0x80)
+		value >>= 7
+	output.append(value)
+
+# returns the varint at position of a bytearray, and the position after it
+def _get_varint(data, position):
+	value = 0
+	shift = 0
+	while True:
+		byte = data[position]
+		position += 1
+		value |= (byte & 0x7F) << shift
+		if byte < 0x80:
+			return value, position
+		shift += 7
+
+# returns the time of a grove_nmea.Fix, in seconds since the epoch, None if the fix has no time
+# without a date (no RMC sentence yet), the fix is taken to be from the current UTC day
+def fix_time(fix):
+	if not fix.time or len(fix.time) < 6:
+		return None
+	try:
+		seconds = int(fix.time[0:2]) * 3600 + int(fix.time[2:4]) * 60 + float(fix.time[4:])
+		if fix.date and len(fix.date) == 6:
+			# imported here, it loads the locale module
+			import calendar
+			year = int(fix.date[4:6])
+			year += 1900 if year >= 80 else 2000
+			day = calendar.timegm((year, int(fix.date[2:4]), int(fix.date[0:2]), 0, 0, 0))
+		else:
+			now = time.time()
+			day = now - now % 86400
+			# just after midnight, a fix from the end of the previous day
+			if seconds - (now - day) > 43200:
+				day -= 86400
+	except ValueError:
+		return None
+	return day + seconds
+
+# returns the ISO 8601 UTC time of seconds since the epoch, to the millisecond
+def iso_time(seconds):
+	milliseconds = int(round(seconds * 1000))
+	return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(milliseconds // 1000)) + ".{:03d}Z".format(milliseconds % 1000)
+
+def _normalize_columns(extra):
+	columns = list(base_columns)
+	for column in extra or []:
+		if isinstance(column, tuple):
+			columns.append((column[0], int(column[1])))
+		else:
+			columns.append((column, default_decimals))
+	names = [name for name, decimals in columns]
+	if len(set(names)) != len(names):
+		raise ValueError("the column names must be unique")
+	return columns
+
+def _encode_header(columns, block_size):
+	header = bytearray(magic)
+	header.append(version)
+	_put_varint(header, block_size)
+	_put_varint(header, len(columns))
+	for name, decimals in columns:
+		encoded = name.encode("ascii")
+		_put_varint(header, len(encoded))
+		header += encoded
+		_put_varint(header, decimals)
+	return header
+
+# returns the columns, the block size and the position after the header of a track file's content
+def _decode_header(data):
+	if data[:len(magic)] != magic or len(data) < len(magic) + 1:
+		raise ValueError("not a GPS track file")
+	if data[len(magic)] != version:
+		raise ValueError("unsupported GPS track version {}".format(data[len(magic)]))
+	try:
+		block_size, position = _get_varint(data, len(magic) + 1)
+		count, position = _get_varint(data, position)
+		columns = []
+		for _ in range(count):
+			length, position = _get_varint(data, position)
+			name = bytes(data[position:position + length]).decode("ascii")
+			decimals, position = _get_varint(data, position + length)
+			columns.append((name, decimals))
+	except IndexError:
+		raise ValueError("truncated GPS track header")
+	if block_size < 1 or [column[0] for column in columns[:len(base_columns)]] != [column[0] for column in base_columns]:
+		raise ValueError("invalid GPS track header")
+	return columns, block_size, position
+
+# Decodes the records of the data of a track, the positions and fixed-point values go through
+# the same state as when they were written: the values of the previous record
+class _Decoder(object):
+	def __init__(self, data, columns, block_size):
+		self.data = data
+		self.block_size = block_size
+		self.width = len(columns)
+		self.scales = [10 ** decimals for name, decimals in columns]
+		self.integers = [decimals == 0 for name, decimals in columns]
+
+	# decodes count records (all of them when None) from the keyframe at position, up to end
+	# returns the (record number, start, end, values) of each record, values being fixed-point integers or None
+	# stops at the first record that's cut
+	def raw(self, position, number, count = None, end = None):
+		data = self.data
+		end = len(data) if end is None else end
+		width = self.width
+		block_size = self.block_size
+		previous = [0] * width
+		decoded = 0
+		while position < end and (count is None or decoded < count):
+			if number % block_size == 0:
+				previous = [0] * width
+			start = position
+			try:
+				mask, position = _get_varint(data, position)
+				values = list(previous)
+				for column in range(width):
+					if mask >> column & 1:
+						values[column] = None
+						continue
+					# inlined _get_varint, it's where the decoding time goes
+					value = 0
+					shift = 0
+					while True:
+						byte = data[position]
+						position += 1
+						value |= (byte & 0x7F) << shift
+						if byte < 0x80:
+							break
+						shift += 7
+					previous[column] += value >> 1 if not value & 1 else -((value + 1) >> 1)
+					values[column] = previous[column]
+			except IndexError:
+				return
+			if position > end:
+				return
+			yield number, start, position, values
+			number += 1
+			decoded += 1
+
+	# returns the values of fixed-point integers, in their units
+	def values(self, raw):
+		scales = self.scales
+		integers = self.integers
+		return [None if value is None else (value if integers[column] else value / float(scales[column]))
+			for column, value in enumerate(raw)]
+
+# Writes a track file
+# path: where to write, the file is replaced unless append is True
+# extra: names of the values logged with the fixes, or (name, decimals) tuples
+# block_size: records between two keyframes, the smaller it is the faster the seeks and the bigger the file
+# append: adds the records at the end of an existing track, which must have the same columns
+class TrackWriter(object):
+	def __init__(self, path, extra = None, block_size = default_block_size, append = False):
+		self.path = path
+		self.columns = _normalize_columns(extra)
+		self.names = [name for name, decimals in self.columns]
+		self.scales = [10 ** decimals for name, decimals in self.columns]
+		self.lock = threading.Lock()
+
+		# (time, position) of each keyframe
+		self.index = []
+		self.count = 0
+		self.previous = [0] * len(self.columns)
+		self.last_time = None
+
+		if append and os.path.exists(path) and os.path.getsize(path) > 0:
+			self._reopen(block_size)
+		else:
+			self.block_size = block_size
+			if block_size < 1:
+				raise ValueError("block_size must be positive")
+			self.file = open(path, "wb")
+			self.file.write(_encode_header(self.columns, block_size))
+		self.position = self.file.tell()
+		self.buffer = bytearray()
+
+	# picks up an existing track where its last complete record ends
+	def _reopen(self, block_size):
+		reader = TrackReader(self.path)
+		if reader.columns != self.columns:
+			raise ValueError("{} has the columns {}".format(self.path, [name for name, decimals in reader.columns]))
+		self.block_size = reader.block_size
+		self.index = list(zip(reader.index_times, reader.index_positions))
+		self.count = len(reader)
+		if self.index:
+			# the state of the last block, to carry on the deltas
+			for number, start, end, values in reader.decoder.raw(self.index[-1][1], (len(self.index) - 1) * self.block_size, None, reader.data_end):
+				for column, value in enumerate(values):
+					if value is not None:
+						self.previous[column] = value
+			self.last_time = self.previous[0]
+		self.file = open(self.path, "r+b")
+		self.file.seek(reader.data_end)
+		self.file.truncate()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	def __len__(self):
+		return self.count
+
+	# adds a record, values are given by column name, time and latitude/longitude are needed
+	# the others are stored as missing when they're None or not given
+	def add(self, **values):
+		unknown = set(values) - set(self.names)
+		if unknown:
+			raise ValueError("unknown columns {}".format(sorted(unknown)))
+		record_time = values.get("time")
+		if record_time is None or values.get("latitude") is None or values.get("longitude") is None:
+			raise ValueError("a record needs a time, a latitude and a longitude")
+
+		fixed = [None if values.get(name) is None else int(round(values[name] * scale))
+			for name, scale in zip(self.names, self.scales)]
+		with self.lock:
+			if self.file is None:
+				raise ValueError("the track is closed")
+			if self.last_time is not None and fixed[0] < self.last_time:
+				raise ValueError("the records must be added in time order")
+			if self.count % self.block_size == 0:
+				self.previous = [0] * len(self.columns)
+				self.index.append((fixed[0], self.position + len(self.buffer)))
+
+			mask = 0
+			for column, value in enumerate(fixed):
+				if value is None:
+					mask |= 1 << column
+			output = self.buffer
+			_put_varint(output, mask)
+			previous = self.previous
+			for column, value in enumerate(fixed):
+				if value is not None:
+					_put_varint(output, _zigzag(value - previous[column]))
+					previous[column] = value
+			self.count += 1
+			self.last_time = fixed[0]
+			if len(output) >= 4096:
+				self._write()
+
+	# adds the record of a grove_nmea.Fix, with extra values given by name
+	# returns False, without adding anything, when the fix isn't valid or has no time
+	def add_fix(self, fix, **extra):
+		record_time = fix_time(fix)
+		if not fix.valid or record_time is None or fix.latitude is None or fix.longitude is None:
+			return False
+		self.add(time = record_time, latitude = fix.latitude, longitude = fix.longitude, altitude = fix.altitude,
+			speed_kmh = fix.speed_kmh, course = fix.course, satellites = fix.satellites, hdop = fix.hdop, **extra)
+		return True
+
+	def _write(self):
+		self.file.write(self.buffer)
+		self.position += len(self.buffer)
+		self.buffer = bytearray()
+
+	# writes the records added so far to the disk, they're then safe from a power cut
+	def flush(self):
+		with self.lock:
+			if self.file is None:
+				return
+			self._write()
+			self.file.flush()
+			os.fsync(self.file.fileno())
+
+	# writes the remaining records and the index
+	def close(self):
+		with self.lock:
+			if self.file is None:
+				return
+			self._write()
+			footer = bytearray(index_magic)
+			_put_varint(footer, len(self.index))
+			previous_time = 0
+			previous_position = 0
+			for entry_time, position in self.index:
+				_put_varint(footer, _zigzag(entry_time - previous_time))
+				_put_varint(footer, position - previous_position)
+				previous_time, previous_position = entry_time, position
+			footer += struct.pack("<Q", self.position) + end_magic
+			self.file.write(footer)
+			self.file.close()
+			self.file = None
+
+# Reads a track file
+# The whole file is loaded, a day of riding at one fix per second is around a megabyte
+class TrackReader(object):
+	def __init__(self, path):
+		self.path = path
+		with open(path, "rb") as track_file:
+			self.data = bytearray(track_file.read())
+		self.columns, self.block_size, self.data_start = _decode_header(self.data)
+		self.names = [name for name, decimals in self.columns]
+		self.Record = collections.namedtuple("Record", self.names)
+		self.decoder = _Decoder(self.data, self.columns, self.block_size)
+		self.time_scale = float(self.decoder.scales[0])
+		if not self._read_index():
+			self._rebuild_index()
+
+	# loads the index written when the track was closed, returns False when there's none
+	def _read_index(self):
+		data = self.data
+		if len(data) < self.data_start + trailer_size or data[-len(end_magic):] != end_magic:
+			return False
+		(start,) = struct.unpack("<Q", bytes(data[-trailer_size:-len(end_magic)]))
+		if start < self.data_start or data[start:start + len(index_magic)] != index_magic:
+			return False
+		try:
+			count, position = _get_varint(data, start + len(index_magic))
+			times = []
+			positions = []
+			entry_time = 0
+			entry_position = 0
+			for _ in range(count):
+				delta, position = _get_varint(data, position)
+				entry_time += _unzigzag(delta)
+				delta, position = _get_varint(data, position)
+				entry_position += delta
+				times.append(entry_time)
+				positions.append(entry_position)
+		except IndexError:
+			return False
+		self.index_times = times
+		self.index_positions = positions
+		self.data_end = start
+		self._count_last_block()
+		return True
+
+	# decodes every record to find the keyframes, and where the last complete record ends
+	def _rebuild_index(self):
+		self.index_times = []
+		self.index_positions = []
+		self.data_end = self.data_start
+		for number, start, end, values in self.decoder.raw(self.data_start, 0):
+			if number % self.block_size == 0:
+				self.index_times.append(values[0])
+				self.index_positions.append(start)
+			self.data_end = end
+		self._count_last_block()
+
+	# only the last block has to be decoded to count the records and find the time of the last one
+	def _count_last_block(self):
+		self.count = 0
+		self.last_time = None
+		blocks = len(self.index_positions)
+		if blocks == 0:
+			return
+		for number, start, end, values in self.decoder.raw(self.index_positions[-1], (blocks - 1) * self.block_size, self.block_size, self.data_end):
+			self.count = number + 1
+			self.last_time = values[0]
+
+	def __len__(self):
+		return self.count
+
+	def __iter__(self):
+		return self.records()
+
+	@property
+	def start_time(self):
+		return self.index_times[0] / self.time_scale if self.index_times else None
+
+	@property
+	def end_time(self):
+		return self.last_time / self.time_scale if self.last_time is not None else None
+
+	# returns the records from the time start (seconds since the epoch) to the time end, all of them by default
+	def records(self, start = None, end = None):
+		if not self.count:
+			return
+		first = None if start is None else int(round(start * self.time_scale))
+		last = None if end is None else int(round(end * self.time_scale))
+		block = 0
+		if first is not None:
+			# the last keyframe before start, the records in between are decoded but not returned
+			block = max(0, bisect.bisect_left(self.index_times, first) - 1)
+		decoder = self.decoder
+		Record = self.Record
+		for number, position, end_position, raw in decoder.raw(self.index_positions[block], block * self.block_size, None, self.data_end):
+			if first is not None and raw[0] < first:
+				continue
+			if last is not None and raw[0] > last:
+				return
+			yield Record(*decoder.values(raw))
+
+	# returns the records from seconds (since the epoch) on
+	def seek(self, seconds):
+		return self.records(start = seconds)
+
+	# returns the record at seconds (since the epoch), or the last one before it, None if the track starts after it
+	def at(self, seconds):
+		target = int(round(seconds * self.time_scale))
+		block = bisect.bisect_right(self.index_times, target) - 1
+		if block < 0:
+			return None
+		found = None
+		for number, start, end, raw in self.decoder.raw(self.index_positions[block], block * self.block_size, self.block_size, self.data_end):
+			if raw[0] > target:
+				break
+			found = raw
+		return self.Record(*self.decoder.values(found))
+
+	# returns the records with the timing they were recorded with, speed times faster
+	# start and end are the times to replay from and to
+	def replay(self, speed = 1.0, start = None, end = None):
+		if speed <= 0:
+			raise ValueError("speed must be positive")
+		origin = None
+		for record in self.records(start, end):
+			if origin is None:
+				origin = (record.time, _clock())
+			else:
+				delay = origin[1] + (record.time - origin[0]) / speed - _clock()
+				if delay > 0:
+					time.sleep(delay)
+			yield record
+
+	# writes the records to a CSV file, destination is a path or a file opened for writing text
+	# the time is in ISO 8601 UTC and missing values are empty
+	def to_csv(self, destination, start = None, end = None):
+		output, opened = _open_output(destination)
+		try:
+			formats = ["{:." + str(decimals) + "f}" for name, decimals in self.columns]
+			output.write(",".join(self.names) + "\n")
+			for record in self.records(start, end):
+				fields = [iso_time(record[0])]
+				for column in range(1, len(formats)):
+					value = record[column]
+					fields.append("" if value is None else formats[column].format(value))
+				output.write(",".join(fields) + "\n")
+		finally:
+			if opened:
+				output.close()
+
+	# writes the records to a GPX 1.1 file, destination is a path or a file opened for writing text
+	def to_gpx(self, destination, name = None, start = None, end = None):
+		output, opened = _open_output(destination)
+		try:
+			output.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+			output.write('<gpx version="1.1" creator="GrovePi grove_gps_track" xmlns="http://www.topografix.com/GPX/1/1">\n')
+			output.write('<trk>\n')
+			if name is not None:
+				output.write('<name>{}</name>\n'.format(_escape(name)))
+			output.write('<trkseg>\n')
+			for record in self.records(start, end):
+				point = ['<trkpt lat="{:.7f}" lon="{:.7f}">'.format(record.latitude, record.longitude)]
+				if record.altitude is not None:
+					point.append('<ele>{:.2f}</ele>'.format(record.altitude))
+				point.append('<time>{}</time>'.format(iso_time(record.time)))
+				if record.satellites is not None:
+					point.append('<sat>{}</sat>'.format(record.satellites))
+				if record.hdop is not None:
+					point.append('<hdop>{:.2f}</hdop>'.format(record.hdop))
+				point.append('</trkpt>\n')
+				output.write("".join(point))
+			output.write('</trkseg>\n</trk>\n</gpx>\n')
+		finally:
+			if opened:
+				output.close()
+
+def _open_output(destination):
+	if hasattr(destination, "write"):
+		return destination, False
+	return open(destination, "w"), True
+
+def _escape(text):
+	return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+# Writes every new valid fix of a grove_nmea.FixCache (gps.reader.cache of a dextergps.GROVEGPS)
+# to a TrackWriter, from a background thread
+# extra: function returning the extra values to record with each fix, as a dict, or None
+# interval: seconds between two records at least, every fix the GPS sends (once a second) when 0
+class Recorder(object):
+	def __init__(self, cache, writer, extra = None, interval = 0):
+		self.cache = cache
+		self.writer = writer
+		self.extra = extra
+		self.interval = interval
+		self.recorded = 0
+		self._last = None
+		self._stopper = threading.Event()
+		self._thread = None
+
+	def start(self):
+		if self._thread is not None:
+			return
+		self._stopper.clear()
+		self._thread = threading.Thread(target = self.run)
+		self._thread.daemon = True
+		self._thread.start()
+
+	def stop(self):
+		self._stopper.set()
+		if self._thread is not None and self._thread is not threading.current_thread():
+			self._thread.join()
+		self._thread = None
+		self.writer.flush()
+
+	# records the current fix if it's new, returns True when it was recorded
+	def record(self):
+		fix = self.cache.fix()
+		record_time = fix_time(fix)
+		if record_time is None:
+			return False
+		if self._last is not None and record_time < self._last + max(self.interval, 0.001):
+			return False
+		extra = self.extra() if self.extra is not None else {}
+		if not self.writer.add_fix(fix, **extra):
+			return False
+		self._last = record_time
+		self.recorded += 1
+		return True
+
+	def run(self):
+		while not self._stopper.is_set():
+			if self.cache.wait(timeout = 0.5):
+				self.record()
+
+if __name__ == "__main__":
+	import argparse
+
+	parser = argparse.ArgumentParser(description = "Shows, converts or replays a GPS track file")
+	parser.add_argument("track", help = "track file")
+	parser.add_argument("--csv", help = "writes the records to this CSV file")
+	parser.add_argument("--gpx", help = "writes the records to this GPX file")
+	parser.add_argument("--start", type = float, help = "seconds from the start of the track to begin at")
+	parser.add_argument("--end", type = float, help = "seconds from the start of the track to stop at")
+	parser.add_argument("--replay", type = float, metavar = "SPEED", help = "prints the records, SPEED times faster than they were recorded")
+	options = parser.parse_args()
+
+	track = TrackReader(options.track)
+	start = None if options.start is None or track.start_time is None else track.start_time + options.start
+	end = None if options.end is None or track.start_time is None else track.start_time + options.end
+	print("{}: {} records, {} bytes".format(options.track, len(track), len(track.data)))
+	if len(track):
+		print("from {} to {}".format(iso_time(track.start_time), iso_time(track.end_time)))
+	if options.csv:
+		track.to_csv(options.csv, start, end)
+	if options.gpx:
+		track.to_gpx(options.gpx, os.path.basename(options.track), start, end)
+	if options.replay:
+		try:
+			for record in track.replay(options.replay, start, end):
+				print("{} {:.7f} {:.7f} {}".format(iso_time(record.time), record.latitude, record.longitude,
+					"" if record.speed_kmh is None else "{:.1f} km/h".format(record.speed_kmh)))
+				sys.stdout.flush()
+		except KeyboardInterrupt:
+			pass
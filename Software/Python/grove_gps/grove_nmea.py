@@ -0,0 +1,318 @@
+#!/usr/bin/env python
+#
+# NMEA parser for the Grove GPS (http://www.seeedstudio.com/depot/Grove-GPS-p-959.html)
+#
+# The GPS sends a few NMEA sentences every second. Bytes are fed to a Parser as they arrive,
+# in chunks of any size, and it returns the sentences that are complete and whose checksum is right.
+# GGA, RMC, VTG and GSA sentences are decoded, from any talker ($GP, $GN, $GL...), the others are skipped.
+#
+# A Reader reads the serial port from a background thread and keeps the latest fix,
+# so asking for the position never waits for the GPS:
+#
+#	import serial, grove_nmea
+#
+#	reader = grove_nmea.Reader(serial.Serial('/dev/ttyAMA0', 9600, timeout = 0.1))
+#	reader.start()
+#	fix = reader.cache.fix()		# right away, fix.valid is False until the GPS has one
+#	print(fix.latitude, fix.longitude, fix.altitude, fix.speed_kmh)
+#	reader.cache.wait(timeout = 2)		# waits for the next sentence
+#
+# The same cache can be fed by asyncio, with pyserial-asyncio:
+#
+#	cache = grove_nmea.FixCache()
+#	serial_asyncio.create_serial_connection(loop, lambda: grove_nmea.Protocol(cache), '/dev/ttyAMA0', baudrate = 9600)
+#
+# The GrovePi connects the Raspberry Pi and Grove sensors.  You can learn more about GrovePi here:  http://www.dexterindustries.com/GrovePi
+#
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/DexterInd/GrovePi/blob/master/LICENSE
+
+import time
+import threading
+import collections
+
+_clock = getattr(time, "monotonic", time.time)
+
+# Position, quality of the fix and altitude
+GGA = collections.namedtuple("GGA", ["talker", "time", "latitude", "longitude", "quality", "satellites", "hdop", "altitude", "geoid_separation"])
+# Position, speed, course and date
+RMC = collections.namedtuple("RMC", ["talker", "time", "valid", "latitude", "longitude", "speed_knots", "course", "date"])
+# Course and speed over ground
+VTG = collections.namedtuple("VTG", ["talker", "course", "course_magnetic", "speed_knots", "speed_kmh"])
+# Satellites used and dilution of precision
+GSA = collections.namedtuple("GSA", ["talker", "mode", "fix_type", "satellites", "pdop", "hdop", "vdop"])
+
+# a sentence is 82 characters at most, anything longer without a line end is garbage
+max_line_length = 128
+
+knots_to_kmh = 1.852
+
+# returns the checksum of the characters between $ and *, as 2 hex digits
+def checksum(body):
+	value = 0
+	for character in bytearray(body.encode("ascii") if not isinstance(body, (bytes, bytearray)) else body):
+		value ^= character
+	return "{:02X}".format(value)
+
+def _float(field):
+	return float(field) if field else None
+
+def _int(field):
+	return int(field) if field else None
+
+# returns the decimal degrees of a ddmm.mmmm (or dddmm.mmmm) field, negative in the south and west
+def _coordinate(field, hemisphere):
+	if not field:
+		return None
+	value = float(field)
+	degrees = int(value // 100)
+	degrees += (value - degrees * 100) / 60.0
+	return -degrees if hemisphere in ("S", "W") else degrees
+
+def _parse_gga(talker, fields):
+	return GGA(talker, fields[1], _coordinate(fields[2], fields[3]), _coordinate(fields[4], fields[5]),
+		_int(fields[6]), _int(fields[7]), _float(fields[8]), _float(fields[9]), _float(fields[11]))
+
+def _parse_rmc(talker, fields):
+	return RMC(talker, fields[1], fields[2] == "A", _coordinate(fields[3], fields[4]), _coordinate(fields[5], fields[6]),
+		_float(fields[7]), _float(fields[8]), fields[9])
+
+def _parse_vtg(talker, fields):
+	return VTG(talker, _float(fields[1]), _float(fields[3]), _float(fields[5]), _float(fields[7]))
+
+def _parse_gsa(talker, fields):
+	return GSA(talker, fields[1], _int(fields[2]), [int(field) for field in fields[3:15] if field],
+		_float(fields[15]), _float(fields[16]), _float(fields[17]))
+
+# sentence type -> (number of fields at least, decoder)
+decoders = {
+	"GGA" : (15, _parse_gga),
+	"RMC" : (12, _parse_rmc),
+	"VTG" : (9, _parse_vtg),
+	"GSA" : (18, _parse_gsa),
+}
+
+# Incremental NMEA parser
+# callback: called with (sentence, line) for each sentence decoded
+# require_checksum: drop the sentences without a checksum, the Grove GPS always sends one
+class Parser(object):
+	def __init__(self, callback = None, require_checksum = True):
+		self.callback = callback
+		self.require_checksum = require_checksum
+		self.buffer = bytearray()
+
+		# lines decoded, with a wrong checksum, that couldn't be decoded and that were skipped
+		self.sentences = 0
+		self.checksum_errors = 0
+		self.malformed = 0
+		self.ignored = 0
+
+	# adds received bytes, returns the sentences they completed
+	def feed(self, data):
+		if not isinstance(data, (bytes, bytearray)):
+			data = data.encode("ascii", "replace")
+		self.buffer += data
+		sentences = []
+		start = 0
+		while True:
+			end = self.buffer.find(b"\n", start)
+			if end == -1:
+				break
+			sentence = self.parse_line(self.buffer[start:end])
+			if sentence is not None:
+				sentences.append(sentence)
+			start = end + 1
+		del self.buffer[:start]
+		if len(self.buffer) > max_line_length:
+			# no line end in sight, keep what may be the start of the next sentence
+			dollar = self.buffer.rfind(b"$")
+			del self.buffer[:dollar if dollar > 0 else len(self.buffer)]
+		return sentences
+
+	# returns the sentence of a single line, None when it's invalid or of another type
+	def parse_line(self, line):
+		if isinstance(line, (bytes, bytearray)):
+			try:
+				line = line.decode("ascii")
+			except UnicodeDecodeError:
+				self.malformed += 1
+				return None
+		line = line.strip()
+		# a line starting in the middle of a sentence, or with several sentences in it, keeps the last one
+		dollar = line.rfind("$")
+		if dollar == -1:
+			if line:
+				self.malformed += 1
+			return None
+		line = line[dollar:]
+
+		star = line.find("*")
+		if star == -1:
+			if self.require_checksum:
+				self.checksum_errors += 1
+				return None
+			body = line[1:]
+		else:
+			body = line[1:star]
+			if line[star + 1:star + 3].upper() != checksum(body):
+				self.checksum_errors += 1
+				return None
+
+		fields = body.split(",")
+		decoder = decoders.get(fields[0][2:]) if len(fields[0]) == 5 else None
+		if decoder is None:
+			self.ignored += 1
+			return None
+		count, decode = decoder
+		if len(fields) < count:
+			self.malformed += 1
+			return None
+		try:
+			sentence = decode(fields[0][:2], fields)
+		except ValueError:
+			self.malformed += 1
+			return None
+		self.sentences += 1
+		if self.callback is not None:
+			self.callback(sentence, line)
+		return sentence
+
+# What is known of the position, from the latest sentences of each type
+Fix = collections.namedtuple("Fix", ["valid", "time", "date", "latitude", "longitude", "altitude",
+	"speed_kmh", "course", "quality", "satellites", "fix_type", "pdop", "hdop", "vdop", "updated"])
+
+# The latest fix, updated by a Reader or a Protocol and read from any thread
+class FixCache(object):
+	def __init__(self):
+		self.condition = threading.Condition()
+		self.values = dict((field, None) for field in Fix._fields)
+		self.values["valid"] = False
+		# latest sentence and line of each type
+		self.sentences = {}
+		self.lines = {}
+		self.count = 0
+
+	# records a sentence, it's a Parser callback
+	def update(self, sentence, line = None):
+		values = self.values
+		with self.condition:
+			kind = type(sentence).__name__
+			self.sentences[kind] = sentence
+			if line is not None:
+				self.lines[kind] = line
+			if kind == "GGA":
+				values["valid"] = bool(sentence.quality)
+				values["time"] = sentence.time or values["time"]
+				if sentence.quality:
+					values["latitude"] = sentence.latitude
+					values["longitude"] = sentence.longitude
+					values["altitude"] = sentence.altitude
+				values["quality"] = sentence.quality
+				values["satellites"] = sentence.satellites
+				values["hdop"] = sentence.hdop
+			elif kind == "RMC":
+				values["valid"] = sentence.valid
+				values["time"] = sentence.time or values["time"]
+				values["date"] = sentence.date or values["date"]
+				if sentence.valid:
+					values["latitude"] = sentence.latitude
+					values["longitude"] = sentence.longitude
+					if sentence.speed_knots is not None:
+						values["speed_kmh"] = sentence.speed_knots * knots_to_kmh
+					values["course"] = sentence.course
+			elif kind == "VTG":
+				if sentence.speed_kmh is not None:
+					values["speed_kmh"] = sentence.speed_kmh
+				elif sentence.speed_knots is not None:
+					values["speed_kmh"] = sentence.speed_knots * knots_to_kmh
+				if sentence.course is not None:
+					values["course"] = sentence.course
+			elif kind == "GSA":
+				values["fix_type"] = sentence.fix_type
+				values["pdop"] = sentence.pdop
+				values["hdop"] = sentence.hdop
+				values["vdop"] = sentence.vdop
+			values["updated"] = _clock()
+			self.count += 1
+			self.condition.notify_all()
+
+	# returns the latest Fix
+	def fix(self):
+		with self.condition:
+			return Fix(**self.values)
+
+	# returns the latest sentence of a type ("GGA", "RMC", "VTG" or "GSA"), None if there hasn't been any
+	def latest(self, kind):
+		with self.condition:
+			return self.sentences.get(kind)
+
+	# waits for the next sentence, returns False on timeout
+	def wait(self, timeout = None):
+		with self.condition:
+			count = self.count
+			deadline = None if timeout is None else _clock() + timeout
+			while self.count == count:
+				remaining = None if deadline is None else deadline - _clock()
+				if remaining is not None and remaining <= 0:
+					return False
+				self.condition.wait(remaining)
+			return True
+
+# Reads a serial port (or anything with a read(size) method) from a background thread
+# idle: seconds to wait when nothing was received, for ports opened with timeout = 0
+class Reader(object):
+	def __init__(self, port, cache = None, idle = 0.05):
+		self.port = port
+		self.cache = FixCache() if cache is None else cache
+		self.parser = Parser(self.cache.update)
+		self.idle = idle
+		self._stopper = threading.Event()
+		self._thread = None
+
+	def start(self):
+		if self._thread is not None:
+			return
+		self._stopper.clear()
+		self._thread = threading.Thread(target = self.run)
+		self._thread.daemon = True
+		self._thread.start()
+
+	def stop(self):
+		self._stopper.set()
+		if self._thread is not None and self._thread is not threading.current_thread():
+			self._thread.join()
+		self._thread = None
+
+	def run(self):
+		while not self._stopper.is_set():
+			# whatever is waiting, or a single byte which blocks for the port's timeout
+			data = self.port.read(getattr(self.port, "in_waiting", 0) or 1)
+			if data:
+				self.parser.feed(data)
+			else:
+				self._stopper.wait(self.idle)
+
+# asyncio protocol feeding a FixCache, for loop.create_connection or pyserial-asyncio
+class Protocol(object):
+	def __init__(self, cache = None):
+		self.cache = FixCache() if cache is None else cache
+		self.parser = Parser(self.cache.update)
+		self.transport = None
+
+	def connection_made(self, transport):
+		self.transport = transport
+
+	def data_received(self, data):
+		self.parser.feed(data)
+
+	def eof_received(self):
+		return False
+
+	def connection_lost(self, exc):
+		self.transport = None
+
+	def pause_writing(self):
+		pass
+
+	def resume_writing(self):
+		pass
@@ -4,8 +4,6 @@
 import grovepi
 import math
 import json
-import numpy as np
-from scipy.interpolate import interp1d
 
 # Library written for Python 3!
 
@@ -29,6 +27,10 @@ class HighTemperatureSensor:
             self.__amp_av = table["amp_factor"]
             self.__vol_offset = table["amp_offset"]
 
+        # scipy is missing
+        except ImportError:
+            raise
+
         except:
             self.sensor_table = None
             self.__amp_av = 1
@@ -108,6 +110,8 @@ class HighTemperatureSensor:
 
     # function for interpolating values from [table] array
     def __interpolateTable(self, table):
+        # scipy takes seconds to import on a Raspberry Pi, so it's only loaded when a table is used
+        from scipy.interpolate import interp1d
 
         degrees_keys_list = list(table["degrees_table"].keys())
         degrees_list = [int(x) for x in degrees_keys_list]
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+#
+# Shared I2C buses for the Grove drivers
+#
+# Every driver gets its bus from here instead of opening its own smbus.SMBus, so a process
+# using several I2C devices holds a single handle per bus, and transfers coming from
+# different drivers or threads never overlap on the wire:
+#
+#	bus = grove_i2c_bus.get_bus()			# the bus on the Raspberry Pi's header
+#	bus.write_byte_data(address, register, value)	# the bus gets opened by the first transfer
+#	data = bus.read_block(address, register, 64)	# split in 32 byte transfers, but never interleaved
+#
+#	with bus.lock:					# several transfers in a row
+#		bus.write_byte(address, register)
+#		value = bus.read_byte(address)
+#
+# A bus isn't opened until it's used, so importing a driver doesn't need smbus, RPi.GPIO or the I2C device.
+#
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/DexterInd/GrovePi/blob/master/LICENSE
+
+import sys
+import threading
+
+# largest transfer an SMBus block command can carry
+max_block_size = 32
+
+# the smbus.SMBus methods a SharedBus forwards, each one under the bus lock
+smbus_methods = [
+	"write_quick",
+	"read_byte",
+	"write_byte",
+	"read_byte_data",
+	"write_byte_data",
+	"read_word_data",
+	"write_word_data",
+	"process_call",
+	"read_block_data",
+	"write_block_data",
+	"block_process_call",
+	"read_i2c_block_data",
+	"write_i2c_block_data",
+]
+
+# forced number of the default bus, see set_default_bus
+_default_bus_number = None
+
+# returns the number of the I2C bus on the header of this Raspberry Pi
+# only the very first boards (revision 1) have it on bus 0
+def default_bus_number():
+	if _default_bus_number is not None:
+		return _default_bus_number
+	if sys.platform == 'uwp':
+		return 1
+	import RPi.GPIO as GPIO
+	revision = GPIO.RPI_REVISION
+	if revision == 2 or revision == 3:
+		return 1
+	return 0
+
+# makes get_bus() return the given bus instead of the one found from the board revision
+# for boards other than a Raspberry Pi, or to run the drivers against another bus
+def set_default_bus(bus_number):
+	global _default_bus_number
+	_default_bus_number = bus_number
+	_default_bus.reset()
+
+# opens a new SMBus, on the header's bus when bus_number is None
+# the drivers use get_bus instead, which shares the handle
+def open_smbus(bus_number = None):
+	if sys.platform == 'uwp':
+		import winrt_smbus as smbus
+	else:
+		import smbus
+	if bus_number is None:
+		bus_number = default_bus_number()
+	return smbus.SMBus(bus_number)
+
+def _locked(name):
+	def method(self, *args):
+		with self.lock:
+			return getattr(self.handle or self.open(), name)(*args)
+	method.__name__ = name
+	return method
+
+# A single I2C bus shared by all the drivers
+# It has the methods of smbus.SMBus, each holding the bus lock for the duration of the transfer
+class SharedBus(object):
+	def __init__(self, bus_number):
+		self.bus_number = bus_number
+		# held for each transfer, hold it yourself to chain several transfers
+		self.lock = threading.RLock()
+		self.handle = None
+
+	def is_open(self):
+		return self.handle is not None
+
+	# returns the underlying SMBus, opening it if needed
+	def open(self):
+		if self.handle is None:
+			with self.lock:
+				if self.handle is None:
+					self.handle = open_smbus(self.bus_number)
+		return self.handle
+
+	# makes the bus use an already opened handle, or any object with the SMBus methods
+	def attach(self, handle):
+		with self.lock:
+			self.handle = handle
+
+	def close(self):
+		with self.lock:
+			if self.handle is not None and hasattr(self.handle, "close"):
+				self.handle.close()
+			self.handle = None
+
+	# writes data to consecutive registers starting at register
+	# split in max_block_size transfers when it's longer
+	def write_block(self, address, register, data):
+		with self.lock:
+			handle = self.open()
+			for start in range(0, len(data), max_block_size):
+				handle.write_i2c_block_data(address, register + start, list(data[start:start + max_block_size]))
+
+	# writes data to the same register, like the data register of a display
+	# split in max_block_size transfers when it's longer
+	def write_stream(self, address, register, data):
+		with self.lock:
+			handle = self.open()
+			for start in range(0, len(data), max_block_size):
+				handle.write_i2c_block_data(address, register, list(data[start:start + max_block_size]))
+
+	# reads length bytes from consecutive registers starting at register
+	def read_block(self, address, register, length):
+		data = []
+		with self.lock:
+			handle = self.open()
+			for start in range(0, length, max_block_size):
+				size = min(max_block_size, length - start)
+				data += handle.read_i2c_block_data(address, register + start, size)
+		return data
+
+for _name in smbus_methods:
+	setattr(SharedBus, _name, _locked(_name))
+
+# Stands for the bus on the header, which is only looked up on first use
+# so that it's the same SharedBus as get_bus(1) (or 0 on the first boards)
+class _DefaultBus(object):
+	def __init__(self):
+		self._target = None
+
+	def reset(self):
+		self.__dict__.clear()
+		self._target = None
+
+	def target(self):
+		if self._target is None:
+			self._target = get_bus(default_bus_number())
+		return self._target
+
+	def __getattr__(self, name):
+		# only called for what _DefaultBus doesn't have itself
+		if name.startswith("_"):
+			raise AttributeError(name)
+		value = getattr(self.target(), name)
+		if callable(value):
+			# keep the bound method so the next calls don't come through here
+			self.__dict__[name] = value
+		return value
+
+_pool = {}
+_pool_lock = threading.Lock()
+_default_bus = _DefaultBus()
+
+# returns the SharedBus of the given bus number, the header's bus when bus_number is None
+# Every caller asking for the same bus gets the same SharedBus, so the drivers share a single handle
+# and their transfers never overlap. Nothing is opened here: the bus is opened by its first transfer,
+# which is why drivers can call it when they're imported
+def get_bus(bus_number = None):
+	if bus_number is None:
+		return _default_bus
+	with _pool_lock:
+		bus = _pool.get(bus_number)
+		if bus is None:
+			bus = SharedBus(bus_number)
+			_pool[bus_number] = bus
+		return bus
+
+# closes every bus that has been opened, they get reopened by their next transfer
+def close_all():
+	with _pool_lock:
+		buses = list(_pool.values())
+	for bus in buses:
+		bus.close()
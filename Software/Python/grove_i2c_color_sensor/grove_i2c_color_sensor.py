@@ -1,7 +1,6 @@
-import smbus
 import time
 import math
-import RPi.GPIO
+import grove_i2c_bus
 
 # Released under the MIT license (http://choosealicense.com/licenses/mit/).
 # For more information see https://github.com/DexterInd/GrovePi/blob/master/LICENSE
@@ -131,14 +130,8 @@ class GroveI2CColorSensor:
         line tool to identify the right bus. If set to None, will use the Raspberry Pi revision number to guess which
         bus to use.
         """
-        if bus_number is None:
-            # Use Rasbperry Pi revision to choose bus number
-            board_revision = RPi.GPIO.RPI_REVISION
-            if board_revision == 2 or board_revision == 3:
-                bus_number = 1
-            else:
-                bus_number = 0
-        self.bus = smbus.SMBus(bus_number)
+        # Uses the Raspberry Pi revision to choose the bus number when it's None
+        self.bus = grove_i2c_bus.get_bus(bus_number)
         self.use_continuous_integration()
         self.set_gain_and_prescaler(1, 1)
 
@@ -1,6 +1,6 @@
 #!/usr/bin/python
 import re
-import smbus
+import grove_i2c_bus
 
 # ===========================================================================
 # Adafruit_I2C Class
@@ -40,7 +40,7 @@ class Adafruit_I2C(object):
     # Alternatively, you can hard-code the bus version below:
     # self.bus = smbus.SMBus(0); # Force I2C0 (early 256MB Pi's)
     # self.bus = smbus.SMBus(1); # Force I2C1 (512MB Pi's)
-    self.bus = smbus.SMBus(busnum if busnum >= 0 else Adafruit_I2C.getPiI2CBusNumber())
+    self.bus = grove_i2c_bus.get_bus(busnum if busnum >= 0 else Adafruit_I2C.getPiI2CBusNumber())
     self.debug = debug
 
   def reverseByteOrder(self, data):
@@ -7,10 +7,8 @@
 # Read http://www.dexterindustries.com/topic/greehouse-project/ for the forum discussion about the sensor
 
 from time import sleep
-import smbus
 from Adafruit_I2C import Adafruit_I2C
-import RPi.GPIO as GPIO
-from smbus import SMBus
+import grove_i2c_bus
 
 TSL2561_Control = 0x80
 TSL2561_Timing = 0x81
@@ -81,11 +79,7 @@ B8C = 0x0000 # 0.000 * 2^LUX_SCALE
 M8C = 0x0000 # 0.000 * 2^LUX_SCALE
 
 # bus parameters
-rev = GPIO.RPI_REVISION
-if rev == 2 or rev == 3:
-	bus = smbus.SMBus(1)
-else:
-	bus = smbus.SMBus(0)
+bus = grove_i2c_bus.get_bus()
 i2c = Adafruit_I2C(TSL2561_Address)
 
 debug = False
@@ -18,15 +18,10 @@
 # http://www.seeedstudio.com/wiki/Grove_-_Multichannel_Gas_Sensor
 # https://github.com/Seeed-Studio/Mutichannel_Gas_Sensor
 import time,sys
-import RPi.GPIO as GPIO
-import smbus
+import grove_i2c_bus
 
 # use the bus that matches your raspi version
-rev = GPIO.RPI_REVISION
-if rev == 2 or rev == 3:
-    bus = smbus.SMBus(1)
-else:
-    bus = smbus.SMBus(0)
+bus = grove_i2c_bus.get_bus()
 
 class MutichannelGasSensor:
     address = None
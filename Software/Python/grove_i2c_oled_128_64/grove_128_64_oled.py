@@ -18,17 +18,14 @@
 # Seeed Technology Inc.
 # written by: Visweswara R
 
-import smbus
+import grove_i2c_bus
 import time
 import math
-import RPi.GPIO as GPIO
 import struct
+import threading
 
-rev = GPIO.RPI_REVISION
-if rev == 2 or rev == 3:
-    bus = smbus.SMBus(1)
-else:
-    bus = smbus.SMBus(0)
+# use the bus that matches your raspi version
+bus = grove_i2c_bus.get_bus()
 
 address=0x3c
 addressingMode= None
@@ -318,3 +315,217 @@ def setNormalDisplay():
 
 def setInverseDisplay():
     sendCommand(SeeedOLED_Inverse_Display_Cmd)
+
+# Sends data bytes in as few transfers as possible, up to 32 bytes each
+def sendDataBlock(data):
+	try:
+		return bus.write_stream(address,SeeedOLED_Data_Mode,data)
+	except IOError:
+		print("IOError")
+		return -1
+
+# Returns the 8 columns of a character, bit 0 being the top row
+def glyph(C):
+	C_add=ord(C)
+	if C_add<32 or C_add>127:     # Ignore non-printable ASCII characters
+		C_add=ord(' ')
+	return BasicFont[C_add-32]
+
+# Off-screen image of the display, drawn in memory and sent with flush()
+# Only what changed since the previous flush goes over the bus:
+#
+#	frame = grove_128_64_oled.Framebuffer()
+#	frame.text(0, 0, "Temp: 21.5C")
+#	frame.rect(0, 10, 128, 6)
+#	frame.flush()                   # the whole screen, the first time
+#	frame.text(0, 0, "Temp: 21.6C")
+#	frame.flush()                   # a single column of page 0
+#
+# The pixels are stored the way the display stores them: 8 pages of 128 bytes,
+# each byte being a column of 8 pixels with bit 0 at the top.
+# flush() switches the display to horizontal addressing mode, call setPageMode() before going back to putString.
+class Framebuffer(object):
+	width=SeeedOLED_Max_X+1
+	height=SeeedOLED_Max_Y+1
+	pages=height//8
+
+	# extra bytes worth sending to save the 6 commands that set a window, when merging pages
+	window_cost=12
+
+	def __init__(self):
+		self.buffer=bytearray(self.width*self.pages)
+		# what the display shows, None until the first flush
+		self.shown=None
+		# hold it while drawing a frame so that a background flush never sends half of it
+		self.lock=threading.RLock()
+		self.flushes=0
+		self.bytes_sent=0
+		self._thread=None
+		self._stopper=threading.Event()
+
+	def clear(self,color=0):
+		self.buffer[:]=bytearray([0xFF if color else 0x00])*len(self.buffer)
+
+	def pixel(self,x,y,color=1):
+		if 0<=x<self.width and 0<=y<self.height:
+			index=(y>>3)*self.width+x
+			if color:
+				self.buffer[index]|=1<<(y&7)
+			else:
+				self.buffer[index]&=~(1<<(y&7))&0xFF
+
+	def get_pixel(self,x,y):
+		return (self.buffer[(y>>3)*self.width+x]>>(y&7))&1
+
+	def hline(self,x,y,w,color=1):
+		for i in range(max(x,0),min(x+w,self.width)):
+			self.pixel(i,y,color)
+
+	def vline(self,x,y,h,color=1):
+		for j in range(max(y,0),min(y+h,self.height)):
+			self.pixel(x,j,color)
+
+	# Bresenham's line from (x0,y0) to (x1,y1), both ends included
+	def line(self,x0,y0,x1,y1,color=1):
+		dx=abs(x1-x0)
+		dy=-abs(y1-y0)
+		sx=1 if x0<x1 else -1
+		sy=1 if y0<y1 else -1
+		error=dx+dy
+		while True:
+			self.pixel(x0,y0,color)
+			if x0==x1 and y0==y1:
+				break
+			e2=2*error
+			if e2>=dy:
+				error+=dy
+				x0+=sx
+			if e2<=dx:
+				error+=dx
+				y0+=sy
+
+	def rect(self,x,y,w,h,color=1,fill=False):
+		if fill:
+			for i in range(max(x,0),min(x+w,self.width)):
+				self.vline(i,y,h,color)
+			return
+		self.hline(x,y,w,color)
+		self.hline(x,y+h-1,w,color)
+		self.vline(x,y,h,color)
+		self.vline(x+w-1,y,h,color)
+
+	# writes 8 pixels of a column, bit 0 at (x,y), over what was there
+	def _column(self,x,y,bits):
+		if x<0 or x>=self.width:
+			return
+		page,shift=divmod(y,8)
+		if 0<=page<self.pages:
+			index=page*self.width+x
+			mask=(0xFF<<shift)&0xFF
+			self.buffer[index]=(self.buffer[index]&~mask&0xFF)|((bits<<shift)&0xFF)
+		if shift and 0<=page+1<self.pages:
+			index=(page+1)*self.width+x
+			mask=0xFF>>(8-shift)
+			self.buffer[index]=(self.buffer[index]&~mask&0xFF)|(bits>>(8-shift))
+
+	# draws a string with its top left corner at (x,y), 8x8 pixels per character, background included
+	def text(self,x,y,s,color=1):
+		for C in s:
+			for column in glyph(C):
+				self._column(x,y,column if color else column^0xFF)
+				x+=1
+
+	# draws a PIL image, or the image file at that path, with its top left corner at (x,y)
+	# the image is converted to black and white, the white pixels are lit
+	def image(self,img,x=0,y=0):
+		if not hasattr(img,"convert"):
+			from PIL import Image
+			img=Image.open(img)
+		img=img.convert("1")
+		w,h=img.size
+		pixels=img.load()
+		for j in range(max(0,-y),min(h,self.height-y)):
+			for i in range(max(0,-x),min(w,self.width-x)):
+				self.pixel(x+i,y+j,pixels[i,j])
+
+	# returns the windows that differ from the display, as (first page, last page, first column, last column)
+	# consecutive pages are sent as a single window when it costs less than setting a window for each
+	def dirty_windows(self,frame=None):
+		frame=self.buffer if frame is None else frame
+		width=self.width
+		windows=[]
+		for page in range(self.pages):
+			start=page*width
+			if self.shown is None:
+				first,last=0,width-1
+			else:
+				if frame[start:start+width]==self.shown[start:start+width]:
+					continue
+				first=0
+				while frame[start+first]==self.shown[start+first]:
+					first+=1
+				last=width-1
+				while frame[start+last]==self.shown[start+last]:
+					last-=1
+			if windows and windows[-1][1]==page-1:
+				top,bottom,left,right=windows[-1]
+				merged=(page-top+1)*(max(right,last)-min(left,first)+1)
+				separate=(bottom-top+1)*(right-left+1)+(last-first+1)+self.window_cost
+				if merged<=separate:
+					windows[-1]=(top,page,min(left,first),max(right,last))
+					continue
+			windows.append((page,page,first,last))
+		return windows
+
+	# sends what changed since the previous flush, returns the number of data bytes sent
+	# when a transfer fails, what the display shows isn't known anymore and the next flush sends the whole screen
+	def flush(self):
+		with self.lock:
+			frame=bytearray(self.buffer)
+		windows=self.dirty_windows(frame)
+		if not windows:
+			return 0
+		sent=0
+		failed=False
+		for top,bottom,left,right in windows:
+			data=bytearray()
+			for page in range(top,bottom+1):
+				data+=frame[page*self.width+left:page*self.width+right+1]
+			# the window and its data in a row, so that no other transfer moves the display's cursor in between
+			with bus.lock:
+				if addressingMode!=HORIZONTAL_MODE:
+					setHorizontalMode()
+				results=[sendCommand(c) for c in [0x21,left,right,0x22,top,bottom]]    # set the column and page window
+				failed=-1 in results or sendDataBlock(data)==-1
+			if failed:
+				break
+			sent+=len(data)
+		self.shown=None if failed else frame
+		self.flushes+=1
+		self.bytes_sent+=sent
+		return sent
+
+	# makes the next flush send the whole screen, for when something else drew on it
+	def invalidate(self):
+		self.shown=None
+
+	# flushes rate_hz times per second from a background thread, until stop()
+	def start(self,rate_hz=10):
+		if self._thread is not None:
+			return
+		self._stopper.clear()
+		self._thread=threading.Thread(target=self._run,args=(1.0/rate_hz,))
+		self._thread.daemon=True
+		self._thread.start()
+
+	def stop(self):
+		if self._thread is None:
+			return
+		self._stopper.set()
+		self._thread.join()
+		self._thread=None
+		self.flush()
+
+	def _run(self,period):
+		while not self._stopper.wait(period):
+			self.flush()
@@ -12,15 +12,11 @@
 # Released under the MIT license (http://choosealicense.com/licenses/mit/).
 # For more information see https://github.com/DexterInd/GrovePi/blob/master/LICENSE
 
-import smbus
-import RPi.GPIO as GPIO
+import grove_i2c_bus
 import time
 
-rev = GPIO.RPI_REVISION
-if rev == 2 or rev == 3:
-    bus = smbus.SMBus(1)
-else:
-    bus = smbus.SMBus(0)
+# use the bus that matches your raspi version
+bus = grove_i2c_bus.get_bus()
 
 class HDC1000:
     I2C_ADDR = 0
@@ -22,7 +22,7 @@
 import logging
 import subprocess
 
-import smbus
+import grove_i2c_bus
 
 import Platform 
 
@@ -92,7 +92,7 @@ class Device(object):
         """Create an instance of the I2C device at the specified address on the
         specified I2C bus number."""
         self._address = address
-        self._bus = smbus.SMBus(busnum)
+        self._bus = grove_i2c_bus.get_bus(busnum)
         self._logger = logging.getLogger('Adafruit_I2C.Device.Bus.{0}.Address.{1:#0X}' \
                                 .format(busnum, address))
 
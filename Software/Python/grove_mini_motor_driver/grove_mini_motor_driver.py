@@ -1,32 +1,21 @@
 # Released under the MIT license (http://choosealicense.com/licenses/mit/).
 # For more information see https://github.com/DexterInd/GrovePi/blob/master/LICENSE
 
-from sys import platform
 import datetime
+import grove_i2c_bus
 
 # Library written for Python 3!
 
 left_channel = 0x60
 right_channel = 0x62
 
-# function for returning a SMBus object
-# checks the Rpi version before it selects the bus
-def getNewSMBus():
-    bus = None
-
-    if platform == 'uwp':
-        import winrt_smbus as smbus
-        bus = smbus.SMBus(1)
-    else:
-        import smbus
-        import RPi.GPIO as GPIO
-        revision = GPIO.RPI_REVISION
-
-        if revision == 2 or revision == 3:
-            bus = smbus.SMBus(1)
-        else:
-            bus = smbus.SMBus(0)
-    return bus
+# function for returning the SMBus object shared by every driver on the I2C bus
+# the bus isn't owned by the caller and mustn't be closed
+def getSMBus():
+    return grove_i2c_bus.get_bus()
+
+# kept for the scripts using the old name, it doesn't open a new bus anymore
+getNewSMBus = getSMBus
 
 # function for returning a formatted time date
 def getTime():
@@ -56,7 +45,7 @@ class DRV8830:
         self.address = channel_address
 
         if _bus is None:
-            self.bus = getNewSMBus()
+            self.bus = getSMBus()
         else:
             self.bus = _bus
 
@@ -134,7 +123,7 @@ class MiniMotorDriver:
     # the 2 addresses are: 0x60 & 0x62
     def __init__(self, ch1, ch2, _bus = None):
         if _bus is None:
-            self.bus = getNewSMBus()
+            self.bus = getSMBus()
         else:
             self.bus = _bus
 
@@ -38,17 +38,12 @@ THE SOFTWARE.
 #	read the datasheet though
 
 import time,sys
-import RPi.GPIO as GPIO
-import smbus
+import grove_i2c_bus
 
 NFC_ADDR = 0x53
 
 # use the bus that matches your raspi version
-rev = GPIO.RPI_REVISION
-if rev == 2 or rev == 3:
-    bus = smbus.SMBus(1)
-else:
-    bus = smbus.SMBus(0)
+bus = grove_i2c_bus.get_bus()
     
 # read data from the NFC tag EEPROM (length bytes)
 def readNFCData(addr,length):
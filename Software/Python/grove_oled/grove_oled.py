@@ -22,18 +22,10 @@ import sys
 import time
 import math
 import struct
+import grove_i2c_bus
 
-if sys.platform == 'uwp':
-    import winrt_smbus as smbus
-    bus = smbus.SMBus(1)
-else:
-    import smbus
-    import RPi.GPIO as GPIO
-    rev = GPIO.RPI_REVISION
-    if rev == 2 or rev == 3:
-        bus = smbus.SMBus(1)
-    else:
-        bus = smbus.SMBus(0)
+# use the bus that matches your raspi version
+bus = grove_i2c_bus.get_bus()
 
 grayH= 0xF0
 grayL= 0x0F
@@ -44,6 +36,13 @@ Data_mode=0x40
 
 Normal_Display_Cmd=0xA4
 
+# 12 lines of 12 characters
+line_length=12
+blank_screen=bytearray(48*96)
+
+# rendered characters, see get_glyph
+glyph_cache={}
+
 BasicFont = [[0 for x in range(8)] for x in range(10)]
 BasicFont=[[0x00,0x00,0x00,0x00,0x00,0x00,0x00,0x00],
 [0x00,0x00,0x5F,0x00,0x00,0x00,0x00,0x00],
@@ -160,6 +159,14 @@ def sendData(byte):
         print("IOError")
         return -1
 
+# Sends data bytes in as few transfers as possible, up to 32 bytes each
+def sendDataBlock(data):
+    try:
+        return bus.write_stream(address,Data_mode,data)
+    except IOError:
+        print("IOError")
+        return -1
+
 def multi_comm(commands):
     for c in commands:
         sendCommand(c)
@@ -211,9 +218,8 @@ def oled_init():
     multi_comm(blk)
 
 def oled_clearDisplay():
-    for j in range (0,48):
-        for i in range (0,96):
-            sendData(0x00)
+    # 96 rows of 48 bytes, each byte holds 2 pixels
+    sendDataBlock(blank_screen)
 
 def oled_setNormalDisplay():
     sendCommand(Normal_Display_Cmd)
@@ -231,12 +237,14 @@ def oled_setTextXY(Row,Column):
     sendCommand(0x00+(Row*8))     # Start Row
     sendCommand(0x07+(Row*8))     # End Row
 
-def oled_putChar(C):
+# Returns the 32 bytes a character is sent as, 4 bits of gray per pixel
+# in the order the display fills them in vertical mode: 2 columns at a time, top to bottom
+def render_glyph(C):
     C_add=ord(C)
     if C_add<32 or C_add>127:     # Ignore non-printable ASCII characters
-        C=' '
-        C_add=ord(C)
+        C_add=ord(' ')
 
+    glyph=bytearray()
     for i in range(0,8,2):
         for j in range(0,8):
             c=0x00
@@ -244,14 +252,36 @@ def oled_putChar(C):
             bit2=((BasicFont[C_add-32][i+1])>>j)&0x01
             if bit1:
                 c=c|grayH
-            else:
-                c=c|0x00
             if bit2:
                 c=c|grayL
-            else:
-                c=c|0x00
-            sendData(c)
+            glyph.append(c)
+    return glyph
+
+# Returns the rendered glyph of a character, rendering it only the first time
+def get_glyph(C):
+    glyph=glyph_cache.get(C)
+    if glyph is None:
+        glyph=render_glyph(C)
+        glyph_cache[C]=glyph
+    return glyph
+
+# Returns the bytes of a string, the glyphs of its characters one after the other
+def render_text(String):
+    text=bytearray()
+    for C in String:
+        text+=get_glyph(C)
+    return text
 
+def oled_putChar(C):
+    sendDataBlock(get_glyph(C))
+
+# The display moves to the next character by itself, so a string is sent in one burst
 def oled_putString(String):
-    for i in range(len(String)):
-        oled_putChar(String[i])
+    sendDataBlock(render_text(String))
+
+# Writes a whole line of text starting at Column, in a single burst
+# The rest of the line is blanked, so it replaces what was there
+def oled_putLine(Row,String,Column=0):
+    String=String[:line_length-Column]
+    oled_setTextXY(Row,Column)
+    sendDataBlock(render_text(String.ljust(line_length-Column)))
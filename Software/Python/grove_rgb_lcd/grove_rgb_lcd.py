@@ -21,18 +21,11 @@
 # 	Doesn't support anything clever, cursors or anything
 
 import time,sys
+import collections
+import grove_i2c_bus
 
-if sys.platform == 'uwp':
-    import winrt_smbus as smbus
-    bus = smbus.SMBus(1)
-else:
-    import smbus
-    import RPi.GPIO as GPIO
-    rev = GPIO.RPI_REVISION
-    if rev == 2 or rev == 3:
-        bus = smbus.SMBus(1)
-    else:
-        bus = smbus.SMBus(0)
+# use the bus that matches your raspi version
+bus = grove_i2c_bus.get_bus()
 
 # this device has two I2C addresses
 DISPLAY_RGB_ADDR = 0x62
@@ -109,6 +102,192 @@ def create_char(location, pattern):
     textCommand(0x40 | (location << 3))
     bus.write_i2c_block_data(DISPLAY_TEXT_ADDR, 0x40, pattern)
 
+# The 8 custom characters of the display (CGRAM), shared by any number of patterns
+# char(pattern) returns the character showing pattern, and only uploads it when it isn't
+# in one of the slots already. The least recently used pattern makes room for a new one,
+# except for the patterns asked for since the last end_frame(), which are on the next screen.
+class CustomCharacters(object):
+    slots = 8
+
+    def __init__(self):
+        # pattern -> slot, least recently used first
+        self.resident = collections.OrderedDict()
+        # slots used by the frame being built
+        self.pinned = set()
+        self.hits = 0
+        self.uploads = 0
+
+    # returns the character (chr(0) to chr(7)) showing pattern, the 8 rows of 5 bits of a character
+    def char(self, pattern):
+        pattern = tuple(row & 0x1F for row in pattern)
+        slot = self.resident.pop(pattern, None)
+        if slot is None:
+            slot = self._free_slot()
+            with bus.lock:
+                create_char(slot, list(pattern))
+            self.uploads += 1
+        else:
+            self.hits += 1
+        self.resident[pattern] = slot
+        self.pinned.add(slot)
+        return chr(slot)
+
+    def _free_slot(self):
+        if len(self.resident) < self.slots:
+            return len(self.resident)
+        for pattern, slot in self.resident.items():
+            if slot not in self.pinned:
+                del self.resident[pattern]
+                return slot
+        raise ValueError("a screen can't show more than {} custom characters".format(self.slots))
+
+    # the screen has been shown, its patterns can be evicted again
+    def end_frame(self):
+        self.pinned.clear()
+
+    # forgets the slots' contents, for when something else wrote them
+    def invalidate(self):
+        self.resident.clear()
+        self.pinned.clear()
+
+# character of the display's ROM that is a full block
+full_block = chr(0xFF)
+
+# returns a horizontal bar of width characters filled up to value/maximum
+# Each character is 5 pixels wide: the bar is made of full blocks, one partial block and spaces,
+# the partial blocks being the 4 patterns with 1 to 4 columns lit, so an animated bar
+# takes 4 slots of characters at most and stops uploading once they're all resident.
+def bar_graph(characters, value, maximum, width = 16):
+    if maximum <= 0:
+        raise ValueError("maximum must be positive")
+    columns = int(round(5 * width * min(max(value, 0), maximum) / float(maximum)))
+    full, partial = divmod(columns, 5)
+    bar = full_block * full
+    if partial:
+        bar += characters.char([(0x1F << (5 - partial)) & 0x1F] * 8)
+    return bar.ljust(width)
+
+# returns the 32 characters the display shows for text, first line then second line
+# text wraps like setText does, on \n or after 16 characters, and is padded with spaces
+def layout(text):
+    lines = [[], []]
+    count = 0
+    row = 0
+    for c in text:
+        if c == '\n' or count == 16:
+            count = 0
+            row += 1
+            if row == 2:
+                break
+            if c == '\n':
+                continue
+        count += 1
+        lines[row].append(c)
+    return ''.join(lines[0]).ljust(16) + ''.join(lines[1]).ljust(16)
+
+# The LCD as an object that remembers what it shows
+# setText only rewrites the characters that changed, and setRGB only the colours that changed,
+# so updating a status screen takes a few bus writes:
+#
+#    lcd = grove_rgb_lcd.LCD()
+#    lcd.setRGB(0,128,64)
+#    while True:
+#        lcd.setText("Temp: {:.1f}C".format(temp))    # usually 2 transfers
+#        time.sleep(1)
+#
+# Custom characters come from lcd.characters, they are uploaded as needed:
+#
+#    lcd.setText("CPU " + grove_rgb_lcd.bar_graph(lcd.characters, cpu, 100, 12))
+#
+# The shadow copy is only right as long as nothing else writes to the display,
+# call invalidate() otherwise.
+class LCD(object):
+    rows = 2
+    columns = 16
+
+    # unchanged characters between two changes are rewritten rather than moving the cursor,
+    # when there are at most this many of them
+    max_gap = 3
+
+    def __init__(self):
+        # the 32 characters on the display, None until the display has been cleared
+        self.shadow = None
+        # the backlight colour, None until it has been set
+        self.rgb = None
+        self.characters = CustomCharacters()
+
+    # clears the display, the next setText writes all of its characters
+    def clear(self):
+        with bus.lock:
+            textCommand(0x01) # clear display
+            time.sleep(.05)
+            textCommand(0x08 | 0x04) # display on, no cursor
+            textCommand(0x28) # 2 lines
+            time.sleep(.05)
+        self.shadow = ' ' * 32
+
+    # forgets what the display shows, for when something else wrote to it
+    def invalidate(self):
+        self.shadow = None
+        self.rgb = None
+        self.characters.invalidate()
+
+    # returns the runs of characters of cells that differ from the display, as (position, characters)
+    def changes(self, cells):
+        runs = []
+        for row in range(self.rows):
+            start = row * self.columns
+            end = start + self.columns
+            position = start
+            while position < end:
+                if cells[position] == self.shadow[position]:
+                    position += 1
+                    continue
+                last = position
+                scan = position + 1
+                while scan < end and scan - last <= self.max_gap + 1:
+                    if cells[scan] != self.shadow[scan]:
+                        last = scan
+                    scan += 1
+                runs.append((position, cells[position:last + 1]))
+                position = last + 1
+        return runs
+
+    # shows text, \n for second line (or auto wrap), and returns the number of characters written
+    def setText(self, text):
+        if self.shadow is None:
+            self.clear()
+        cells = layout(text)
+        written = 0
+        with bus.lock:
+            for position, run in self.changes(cells):
+                row, column = divmod(position, self.columns)
+                textCommand(0x80 | (row * 0x40 + column)) # set the cursor
+                bus.write_stream(DISPLAY_TEXT_ADDR, 0x40, [ord(c) for c in run])
+                written += len(run)
+        self.shadow = cells
+        self.characters.end_frame()
+        return written
+
+    # set backlight to (R,G,B) (values from 0..255 for each)
+    def setRGB(self, r, g, b):
+        rgb = (r, g, b)
+        if rgb == self.rgb:
+            return
+        with bus.lock:
+            if self.rgb is None:
+                bus.write_byte_data(DISPLAY_RGB_ADDR,0,0)
+                bus.write_byte_data(DISPLAY_RGB_ADDR,1,0)
+                bus.write_byte_data(DISPLAY_RGB_ADDR,0x08,0xaa)
+                previous = (None, None, None)
+            else:
+                previous = self.rgb
+            # red, green and blue are in registers 4, 3 and 2
+            for register, value, shown in zip((4, 3, 2), rgb, previous):
+                if value != shown:
+                    bus.write_byte_data(DISPLAY_RGB_ADDR,register,value)
+        self.rgb = rgb
+
 # example code
 if __name__=="__main__":
     setText("Hello world\nThis is an LCD test")
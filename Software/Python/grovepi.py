@@ -47,17 +47,15 @@ import sys
 import time
 import math
 import struct
-import numpy
+import collections
+import threading
 
-import di_i2c
-
-def set_bus(bus):
-	global i2c
-	i2c = di_i2c.DI_I2C(bus = bus, address = address)
+# numpy and di_i2c are imported when they're first needed, importing grovepi
+# neither loads them nor touches the bus
+import grovepi_metrics
 
 address = 0x04
 max_recv_size = 10
-set_bus("RPI_1SW")
 
 if sys.version_info<(3,0):
 	p_version = 2
@@ -171,471 +169,924 @@ flow_read_cmd=[12]
 flow_disable_cmd=[13]
 flow_en_cmd=[18]
 
+# Names of the commands, used to label the bus metrics
+command_names = {
+	1 : "digitalRead", 2 : "digitalWrite", 3 : "analogRead", 4 : "analogWrite",
+	5 : "pinMode", 6 : "get_dust_sensor_interval", 7 : "ultrasonicRead", 8 : "version",
+	9 : "set_dust_sensor_interval", 10 : "dust_sensor_read", 11 : "encoderRead", 12 : "flowRead",
+	13 : "flowDisable", 14 : "dust_sensor_en", 15 : "dust_sensor_dis", 16 : "encoder_en",
+	17 : "encoder_dis", 18 : "flowEnable", 20 : "acc_xyz", 21 : "ir_read_signal",
+	22 : "ir_recv_pin", 24 : "ir_is_data", 30 : "rtc_getTime", 40 : "dht",
+	50 : "ledBar_init", 51 : "ledBar_orientation", 52 : "ledBar_setLevel", 53 : "ledBar_setLed",
+	54 : "ledBar_toggleLed", 55 : "ledBar_setBits", 56 : "ledBar_getBits",
+	70 : "fourDigit_init", 71 : "fourDigit_brightness", 72 : "fourDigit_number", 73 : "fourDigit_number",
+	74 : "fourDigit_digit", 75 : "fourDigit_segment", 76 : "fourDigit_score", 77 : "fourDigit_monitor",
+	78 : "fourDigit_on", 79 : "fourDigit_off",
+	90 : "storeColor", 91 : "chainableRgbLed_init", 92 : "chainableRgbLed_test", 93 : "chainableRgbLed_pattern",
+	94 : "chainableRgbLed_modulo", 95 : "chainableRgbLed_setLevel"
+}
+
+# Adaptive-wait transaction engine
+# Instead of sleeping a fixed amount of time after every transfer, a command is
+# written once and then the GrovePi is polled until it answers or until the
+# deadline of the command's timing profile passes. A timing profile holds:
+#   first_poll    - seconds between the write and the first read
+#   poll_interval - seconds between two consecutive reads
+#   deadline      - seconds after the write after which we give up
+TimingProfile = collections.namedtuple('TimingProfile', ['first_poll', 'poll_interval', 'deadline'])
+
+# set it to False to go back to the fixed-sleep path of write_i2c_block/read_i2c_block
+adaptive_timing = True
+
+# digital and analog commands are answered within a few hundred microseconds
+fast_profile = TimingProfile(first_poll = 0.0002, poll_interval = 0.0002, deadline = 0.05)
+# used for every command that isn't in timing_profiles
+default_profile = TimingProfile(first_poll = 0.0005, poll_interval = 0.0005, deadline = 0.1)
+
+timing_profiles = {
+	dRead_cmd[0] : fast_profile,
+	dWrite_cmd[0] : fast_profile,
+	aRead_cmd[0] : fast_profile,
+	aWrite_cmd[0] : fast_profile,
+	pMode_cmd[0] : fast_profile,
+	version_cmd[0] : fast_profile,
+	# pulseIn on the GrovePi times out after 75 ms
+	uRead_cmd[0] : TimingProfile(first_poll = 0.001, poll_interval = 0.001, deadline = 0.15),
+	# a DHT conversion takes at least 270 ms on the GrovePi
+	dht_temp_cmd[0] : TimingProfile(first_poll = 0.25, poll_interval = 0.005, deadline = 1.0),
+}
+
+_clock = getattr(time, "monotonic", time.time)
+
+# returns the timing profile used for a given command id
+def get_timing_profile(command_id):
+	return timing_profiles.get(command_id, default_profile)
+
+# overrides the timing profile of a given command id
+def set_timing_profile(command_id, first_poll, poll_interval, deadline):
+	timing_profiles[command_id] = TimingProfile(first_poll, poll_interval, deadline)
+
+# returns the timing profile of a 4 digit display monitoring for duration seconds
+# the firmware only answers once it has shown 4 readings per second of duration, so the deadline grows with it
+def monitor_profile(duration):
+	return TimingProfile(first_poll = 0.001, poll_interval = 0.02, deadline = duration + 1.0)
+
+# Result cache
+# Some sensors can't start a new conversion right away: a DHT11 can be read once a second,
+# a DHT22 every two seconds and the ultrasonic ranger every 60 ms.  Reading them more often only
+# keeps the GrovePi busy and gets NaNs back, so a command repeated with the same pin and arguments
+# within its TTL is answered with the previous result, without any bus traffic.
+# TTLs are in seconds, commands with no TTL (or a TTL of 0) are never cached
+
+# TTLs by command id
+cache_ttls = {
+	uRead_cmd[0] : 0.06,
+}
+# default TTLs of the DHT command by module type (0 = DHT11, 1 = DHT22, 2 = DHT21, 3 = AM2301)
+dht_cache_ttls = {0 : 1.0, 1 : 2.0, 2 : 2.0, 3 : 2.0}
+# TTLs by (command id, pin), they take precedence over the ones above
+pin_cache_ttls = {}
+
+# returns the TTL of a command block ([command id, pin, arg2, arg3])
+def get_cache_ttl(block):
+	ttl = pin_cache_ttls.get((block[0], block[1]))
+	if ttl is None:
+		ttl = cache_ttls.get(block[0])
+	if ttl is None and block[0] == dht_temp_cmd[0]:
+		ttl = dht_cache_ttls.get(block[2], 2.0)
+	return ttl or 0
+
+# sets the TTL of a command id, or of a command id on a single pin
+# use a TTL of 0 to disable the cache
+def set_cache_ttl(command_id, ttl, pin = None):
+	if pin is None:
+		cache_ttls[command_id] = ttl
+	else:
+		pin_cache_ttls[(command_id, pin)] = ttl
+
 
 # Function declarations of the various functions used for encoding and sending
 # data from RPi to Arduino
 
-# Write I2C block to the GrovePi
-def write_i2c_block(block, custom_timing = None):
-	counter = 0
-	reg = block[0]
-	data = block[1:]
-	while counter < 3:
-		try:
-			i2c.write_reg_list(reg, data)
-			time.sleep(0.002 + additional_waiting)
-			return
-		except:
-			counter += 1
-			time.sleep(0.003)
-			continue
-
-# Read I2C block from the GrovePi
-def read_i2c_block(no_bytes = max_recv_size):
-	data = data_not_available_cmd
-	counter = 0
-	while data[0] in [data_not_available_cmd[0], 255] and counter < 3:
-		try:
-			data = i2c.read_list(reg = None, len = no_bytes)
-			time.sleep(0.002 + additional_waiting)
-			if counter > 0:
+# A GrovePi session owns the bus, the address of the GrovePi and a lock
+# Every command runs as one atomic transaction (write + read) while holding the lock,
+# so threads sharing the same session never interleave their transfers
+class GrovePi(object):
+	def __init__(self, bus = "RPI_1SW", address = 0x04):
+		self.address = address
+		self.lock = threading.RLock()
+		# wall time spent in transactions and wall time saved compared with the fixed-sleep path
+		# cache_hits counts the commands answered from the result cache
+		self.timing_stats = {
+			"transactions" : 0,
+			"wall_time" : 0.0,
+			"saved_time" : 0.0,
+			"cache_hits" : 0
+		}
+		# (no_bytes, time, data) of the last answer to each cacheable command block
+		self._cache = {}
+		# per-command counters and latency histograms, see grovepi_metrics
+		self.metrics = grovepi_metrics.BusMetrics(command_names)
+		# the command the GrovePi is answering to
+		self._command = None
+		# (red, green, blue) of the last storeColor, None until there has been one
+		self.stored_color = None
+		self.set_bus(bus)
+
+	# bus: one of the buses supported by di_i2c, like "RPI_1SW" or "RPI_1",
+	# or an object with the same write_reg_list/read_list methods as di_i2c.DI_I2C,
+	# like grovepi_emulator.VirtualGrovePi
+	def set_bus(self, bus):
+		with self.lock:
+			self.bus = bus
+			if hasattr(bus, "write_reg_list") and hasattr(bus, "read_list"):
+				self.i2c = bus
+			else:
+				import di_i2c
+				self.i2c = di_i2c.DI_I2C(bus = bus, address = self.address)
+
+	# returns a copy of the timing statistics
+	# saved_time is an estimate of how much wall time the fixed-sleep path would have spent on top
+	def get_timing_stats(self):
+		with self.lock:
+			return dict(self.timing_stats)
+
+	def reset_timing_stats(self):
+		with self.lock:
+			self.timing_stats["transactions"] = 0
+			self.timing_stats["wall_time"] = 0.0
+			self.timing_stats["saved_time"] = 0.0
+			self.timing_stats["cache_hits"] = 0
+
+	# forgets the cached results, the next reads go to the GrovePi
+	def clear_cache(self):
+		with self.lock:
+			self._cache.clear()
+
+	# Write I2C block to the GrovePi
+	def write_i2c_block(self, block):
+		counter = 0
+		reg = block[0]
+		data = block[1:]
+		with self.lock:
+			self._command = reg
+			while counter < 3:
+				try:
+					self.i2c.write_reg_list(reg, data)
+					time.sleep(0.002 + additional_waiting)
+					return
+				except Exception:
+					self.metrics.count_retry(reg)
+					counter += 1
+					time.sleep(0.003)
+					continue
+
+	# Read I2C block from the GrovePi
+	def read_i2c_block(self, no_bytes = max_recv_size):
+		data = data_not_available_cmd
+		counter = 0
+		with self.lock:
+			while data[0] in [data_not_available_cmd[0], 255] and counter < 3:
+				try:
+					data = self.i2c.read_list(reg = None, len = no_bytes)
+					time.sleep(0.002 + additional_waiting)
+					if counter > 0:
+						counter = 0
+					if data[0] in [data_not_available_cmd[0], 255]:
+						self.metrics.count_not_available(self._command)
+				except Exception:
+					self.metrics.count_retry(self._command)
+					counter += 1
+					time.sleep(0.003)
+
+		return data
+
+	# gives up with an IOError once the deadline of the command's timing profile has passed
+	def read_identified_i2c_block(self, read_command_id, no_bytes):
+		deadline = _clock() + get_timing_profile(read_command_id[0]).deadline
+		data = self.read_i2c_block(no_bytes + 1)
+		while data[0] != read_command_id[0]:
+			self.metrics.count_not_available(read_command_id[0])
+			if _clock() > deadline:
+				raise IOError("[grovepi] no answer to command {}".format(read_command_id[0]))
+			data = self.read_i2c_block(no_bytes + 1)
+
+		return data[1:]
+
+	# Send a command to the GrovePi and wait for its answer
+	# block: [command id, arg1, arg2, arg3]
+	# no_bytes: number of data bytes expected back
+	# identified: when True, the answer starts with the command id which is checked and stripped
+	# profile: timing profile of this call, the one of the command given by get_timing_profile when None
+	# Answers to identified commands are cached for the TTL given by get_cache_ttl
+	def transaction(self, block, no_bytes = 1, identified = True, profile = None):
+		with self.lock:
+			start = _clock()
+			ttl = get_cache_ttl(block) if identified else 0
+			if ttl > 0:
+				key = tuple(block)
+				cached = self._cache.get(key)
+				if cached is not None and cached[0] == no_bytes and start - cached[1] < ttl:
+					self.timing_stats["cache_hits"] += 1
+					return list(cached[2])
+
+			try:
+				data = self._transaction(block, no_bytes, identified, profile)
+			except IOError:
+				self.metrics.observe(block[0], _clock() - start, error = True)
+				raise
+			self.metrics.observe(block[0], _clock() - start)
+
+			if ttl > 0:
+				# the conversion started when the command was written
+				self._cache[key] = (no_bytes, start, list(data))
+			return data
+
+	def _transaction(self, block, no_bytes, identified, profile = None):
+		if not adaptive_timing:
+			self.write_i2c_block(block)
+			if identified:
+				return self.read_identified_i2c_block(block[:1], no_bytes)
+			return self.read_i2c_block(no_bytes)
+
+		if profile is None:
+			profile = get_timing_profile(block[0])
+		read_size = no_bytes + 1 if identified else no_bytes
+		self._command = block[0]
+		start = _clock()
+		slept = 0.0
+
+		counter = 0
+		while True:
+			try:
+				self.i2c.write_reg_list(block[0], block[1:])
+				break
+			except Exception:
+				self.metrics.count_retry(block[0])
+				counter += 1
+				if counter >= 3:
+					raise IOError("[grovepi] couldn't send command {}".format(block[0]))
+				time.sleep(0.003)
+				slept += 0.003
+
+		time.sleep(profile.first_poll)
+		slept += profile.first_poll
+		counter = 0
+		while True:
+			data = None
+			try:
+				data = self.i2c.read_list(reg = None, len = read_size)
 				counter = 0
-		except:
-			counter += 1
-			time.sleep(0.003)
-			
-	return data
+			except Exception:
+				self.metrics.count_retry(block[0])
+				counter += 1
+				if counter >= 3:
+					raise IOError("[grovepi] couldn't read the answer to command {}".format(block[0]))
+
+			if data is not None and data[0] not in [data_not_available_cmd[0], 255]:
+				if not identified or data[0] == block[0]:
+					break
+			if data is not None:
+				self.metrics.count_not_available(block[0])
+
+			if _clock() - start > profile.deadline:
+				raise IOError("[grovepi] no answer to command {} after {} s".format(block[0], profile.deadline))
+			time.sleep(profile.poll_interval)
+			slept += profile.poll_interval
+
+		elapsed = _clock() - start
+
+		# the fixed-sleep path sleeps once after the write and once after every read
+		# and needs as many reads as it takes for the answer to become available
+		fixed_step = 0.002 + additional_waiting
+		fixed_reads = max(1, int(math.ceil(elapsed / fixed_step)))
+		self.timing_stats["transactions"] += 1
+		self.timing_stats["wall_time"] += elapsed
+		self.timing_stats["saved_time"] += fixed_step * (1 + fixed_reads) - slept
+
+		if identified:
+			return data[1:]
+		return data
+
+	# Arduino Digital Read
+	def digitalRead(self, pin):
+		data = self.transaction(dRead_cmd + [pin, unused, unused], no_bytes = 1)[0]
+		return data
+
+	# Arduino Digital Write
+	def digitalWrite(self, pin, value):
+		self.transaction(dWrite_cmd + [pin, value, unused], no_bytes = 1, identified = False)
+		return 1
+
+	# Read analog value from Pin
+	def analogRead(self, pin):
+		number = self.transaction(aRead_cmd + [pin, unused, unused], no_bytes = 2)
+		return number[0] * 256 + number[1]
+
+	# Scan several analog pins in one go
+	# pins: list of analog pins, like [0, 1, 2]
+	# samples: number of rows to acquire
+	# oversample: number of reads averaged into each value
+	# out: optional (samples, len(pins)) array to fill instead of allocating a new one
+	# returns (values, timestamps), two numpy arrays of shape (samples, len(pins))
+	# timestamps are taken with the monotonic clock when each value is complete
+	# The bus is held for the whole scan and each request is written as soon as the
+	# previous answer arrives, so the per-read cost is only the transfer itself
+	def analogReadMany(self, pins, samples = 1, oversample = 1, out = None):
+		import numpy
+		pins = list(pins)
+		shape = (samples, len(pins))
+		if out is None:
+			out = numpy.empty(shape, dtype = numpy.uint16 if oversample == 1 else numpy.float64)
+		elif out.shape != shape:
+			raise ValueError("out must have the shape {}".format(shape))
+		timestamps = numpy.empty(shape, dtype = numpy.float64)
+		blocks = [aRead_cmd + [pin, unused, unused] for pin in pins]
+
+		with self.lock:
+			for row in range(samples):
+				for column, block in enumerate(blocks):
+					total = 0
+					for _ in range(oversample):
+						number = self.transaction(block, 2)
+						total += number[0] * 256 + number[1]
+					out[row, column] = total if oversample == 1 else float(total) / oversample
+					timestamps[row, column] = _clock()
+
+		return out, timestamps
+
+
+	# Write PWM
+	def analogWrite(self, pin, value):
+		self.transaction(aWrite_cmd + [pin, value, unused], no_bytes = 1, identified = False)
+		return 1
+
+	# Setting Up Pin mode on Arduino
+	def pinMode(self, pin, mode):
+		if mode == "OUTPUT":
+			self.transaction(pMode_cmd + [pin, 1, unused], no_bytes = 1, identified = False)
+		elif mode == "INPUT":
+			self.transaction(pMode_cmd + [pin, 0, unused], no_bytes = 1, identified = False)
+		return 1
+
+
+	# Read temp in Celsius from Grove Temperature Sensor
+	def temp(self, pin, model = '1.0'):
+		# each of the sensor revisions use different thermistors, each with their own B value constant
+		if model == '1.2':
+			bValue = 4250  # sensor v1.2 uses thermistor ??? (assuming NCP18WF104F03RC until SeeedStudio clarifies)
+		elif model == '1.1':
+			bValue = 4250  # sensor v1.1 uses thermistor NCP18WF104F03RC
+		else:
+			bValue = 3975  # sensor v1.0 uses thermistor TTC3A103*39H
+		a = self.analogRead(pin)
+		resistance = (float)(1023 - a) * 10000 / a
+		t = (float)(1 / (math.log(resistance / 10000) / bValue + 1 / 298.15) - 273.15)
+		return t
+
+
+	# Read value from Grove Ultrasonic
+	def ultrasonicRead(self, pin):
+		number = self.transaction(uRead_cmd + [pin, unused, unused], no_bytes = 2)
+		return (number[0] * 256 + number[1])
+
+
+	# Read the firmware version
+	def version(self):
+		number = self.transaction(version_cmd + [unused, unused, unused], no_bytes = 3)
+		return "%s.%s.%s" % (number[0], number[1], number[2])
+
+
+	# Read Grove Accelerometer (+/- 1.5g) XYZ value
+	# Need to investigate why this reports what was read with the previous command
+	# Doesn't look to be implemented on the GrovePi
+	def acc_xyz(self):
+		number = self.transaction(acc_xyz_cmd + [unused, unused, unused], no_bytes = 3)
+		if number[1] > 32:
+			number[1] = - (number[1] - 224)
+		if number[2] > 32:
+			number[2] = - (number[2] - 224)
+		if number[3] > 32:
+			number[3] = - (number[3] - 224)
+		return (number[0], number[1], number[2])
+
+
+	# Read from Grove RTC
+	# Doesn't look to be implemented on the GrovePi
+	def rtc_getTime(self):
+		number = self.transaction(rtc_getTime_cmd + [unused, unused, unused], no_bytes = max_recv_size, identified = False)
+		return number
+
+	# Read and return temperature and humidity from Grove DHT Pro
+	def dht(self, pin, module_type):
+		number = self.transaction(dht_temp_cmd + [pin, module_type, unused], no_bytes = 8)
+
+		if p_version==2:
+			h=''
+			for element in (number[0:4]):
+				h+=chr(element)
+
+			t_val=struct.unpack('f', h)
+			t = round(t_val[0], 2)
+
+			h = ''
+			for element in (number[4:8]):
+				h+=chr(element)
+
+			hum_val=struct.unpack('f',h)
+			hum = round(hum_val[0], 2)
+		else:
+			t_val=bytearray(number[0:4])
+			h_val=bytearray(number[4:8])
+			t=round(struct.unpack('f',t_val)[0],2)
+			hum=round(struct.unpack('f',h_val)[0],2)
+		if t > -100.0 and t <150.0 and hum >= 0.0 and hum<=100.0:
+			return [t, hum]
+		else:
+			return [float('nan'),float('nan')]
+
+	# Grove - Infrared Receiver - get the commands received from the Grove IR sensor
+	def ir_read_signal(self):
+		data_back = self.transaction(ir_read_cmd + [unused, unused, unused], no_bytes = 7)
+
+		return (data_back[0],
+				data_back[1] + data_back[2] * 256,
+				data_back[3] + data_back[4] * 256 + data_back[5] * (256 ** 2) + data_back[6] * (256 ** 3))
+
+	# Grove - Infrared Receiver - set the pin on which the Grove IR sensor is connected
+	def ir_recv_pin(self, pin):
+		self.transaction(ir_recv_pin_cmd + [pin, unused, unused], no_bytes = 1, identified = False)
+
+	# Grove - Infrared Receiver - check if there's any data that hasn't been read so far
+	def ir_is_data(self):
+		number = self.transaction(ir_read_isdata + 3 * [unused], no_bytes = 1)
+
+		return number[0] != 0
+
+	# Grove LED Bar - initialise
+	# orientation: (0 = red to green, 1 = green to red)
+	def ledBar_init(self, pin, orientation):
+		self.transaction(ledBarInit_cmd + [pin, orientation, unused], no_bytes = 1, identified = False)
+		return 1
+
+	# Grove LED Bar - set orientation
+	# orientation: (0 = red to green,  1 = green to red)
+	def ledBar_orientation(self, pin, orientation):
+		self.transaction(ledBarOrient_cmd + [pin, orientation, unused], no_bytes = 1, identified = False)
+		return 1
+
+	# Grove LED Bar - set level
+	# level: (0-10)
+	def ledBar_setLevel(self, pin, level):
+		self.transaction(ledBarLevel_cmd + [pin, level, unused], no_bytes = 1, identified = False)
+		return 1
+
+	# Grove LED Bar - set single led
+	# led: which led (1-10)
+	# state: off or on (0-1)
+	def ledBar_setLed(self, pin, led, state):
+		self.transaction(ledBarSetOne_cmd + [pin, led, state], no_bytes = 1, identified = False)
+		return 1
+
+	# Grove LED Bar - toggle single led
+	# led: which led (1-10)
+	def ledBar_toggleLed(self, pin, led):
+		self.transaction(ledBarToggleOne_cmd + [pin, led, unused], no_bytes = 1, identified = False)
+		return 1
+
+	# Grove LED Bar - set all leds
+	# state: (0-1023) or (0x00-0x3FF) or (0b0000000000-0b1111111111) or (int('0000000000',2)-int('1111111111',2))
+	def ledBar_setBits(self, pin, state):
+		byte1 = state & 255
+		byte2 = state >> 8
+		self.transaction(ledBarSet_cmd + [pin, byte1, byte2], no_bytes = 1, identified = False)
+		return 1
+
+	# Grove LED Bar - get current state
+	# state: (0-1023) a bit for each of the 10 LEDs
+	def ledBar_getBits(self, pin):
+		block = self.transaction(ledBarGet_cmd + [pin, unused, unused], no_bytes = 2)
+		return block[0] ^ (block[1] << 8)
+
+
+	# Grove 4 Digit Display - initialise
+	def fourDigit_init(self, pin):
+		self.transaction(fourDigitInit_cmd + [pin, unused, unused], no_bytes = 1, identified = False)
+		return 1
+
+	# Grove 4 Digit Display - set numeric value with or without leading zeros
+	# value: (0-65535) or (0000-FFFF)
+	def fourDigit_number(self, pin, value, leading_zero):
+		# split the value into two bytes so we can render 0000-FFFF on the display
+		byte1 = value & 255
+		byte2 = value >> 8
+		# separate commands to overcome current 4 bytes per command limitation
+		if (leading_zero):
+			self.transaction(fourDigitValue_cmd + [pin, byte1, byte2], no_bytes = 1, identified = False)
+		else:
+			self.transaction(fourDigitValueZeros_cmd + [pin, byte1, byte2], no_bytes = 1, identified = False)
+		return 1
+
+	# Grove 4 Digit Display - set brightness
+	# brightness: (0-7)
+	def fourDigit_brightness(self, pin, brightness):
+		# not actually visible until next command is executed
+		self.transaction(fourDigitBrightness_cmd + [pin, brightness, unused], no_bytes = 1, identified = False)
+		return 1
+
+	# Grove 4 Digit Display - set individual segment (0-9,A-F)
+	# segment: (0-3)
+	# value: (0-15) or (0-F)
+	def fourDigit_digit(self, pin, segment, value):
+		self.transaction(fourDigitIndividualDigit_cmd + [pin, segment, value], no_bytes = 1, identified = False)
+		return 1
+
+	# Grove 4 Digit Display - set 7 individual leds of a segment
+	# segment: (0-3)
+	# leds: (0-255) or (0-0xFF) one bit per led, segment 2 is special, 8th bit is the colon
+	def fourDigit_segment(self, pin, segment, leds):
+		self.transaction(fourDigitIndividualLeds_cmd + [pin, segment, leds], no_bytes = 1, identified = False)
+		return 1
+
+	# Grove 4 Digit Display - set left and right values (0-99), with leading zeros and a colon
+	# left: (0-255) or (0-FF)
+	# right: (0-255) or (0-FF)
+	# colon will be lit
+	def fourDigit_score(self, pin, left, right):
+		self.transaction(fourDigitScore_cmd + [pin, left, right], no_bytes = 1, identified = False)
+		return 1
+
+	# Grove 4 Digit Display - display analogRead value for n seconds, 4 samples per second
+	# analog: analog pin to read
+	# duration: analog read for this many seconds
+	def fourDigit_monitor(self, pin, analog, duration):
+		start = _clock()
+		self.transaction(fourDigitAnalogRead_cmd + [pin, analog, duration], no_bytes = 1, identified = False,
+			profile = monitor_profile(duration))
+		# with a firmware that answers right away, the display keeps monitoring on its own
+		remaining = duration - (_clock() - start)
+		if remaining > 0:
+			time.sleep(remaining)
+		return 1
+
+	# Grove 4 Digit Display - turn entire display on (88:88)
+	def fourDigit_on(self, pin):
+		self.transaction(fourDigitAllOn_cmd + [pin, unused, unused], no_bytes = 1, identified = False)
+		return 1
+
+	# Grove 4 Digit Display - turn entire display off
+	def fourDigit_off(self, pin):
+		self.transaction(fourDigitAllOff_cmd + [pin, unused, unused], no_bytes = 1, identified = False)
+		return 1
+
+	# Grove Chainable RGB LED - store a color for later use
+	# red: 0-255
+	# green: 0-255
+	# blue: 0-255
+	def storeColor(self, red, green, blue):
+		self.transaction(storeColor_cmd + [red, green, blue], no_bytes = 1, identified = False)
+		self.stored_color = (red, green, blue)
+		return 1
+
+	# Grove Chainable RGB LED - initialise
+	# numLeds: how many leds do you have in the chain
+	def chainableRgbLed_init(self, pin, numLeds):
+		self.transaction(chainableRgbLedInit_cmd + [pin, numLeds, unused], no_bytes = 1, identified = False)
+		return 1
+
+	# Grove Chainable RGB LED - initialise and test with a simple color
+	# numLeds: how many leds do you have in the chain
+	# testColor: (0-7) 3 bits in total - a bit for red, green and blue, eg. 0x04 == 0b100 (0bRGB) == rgb(255, 0, 0) == #FF0000 == red
+	#            ie. 0 black, 1 blue, 2 green, 3 cyan, 4 red, 5 magenta, 6 yellow, 7 white
+	def chainableRgbLed_test(self, pin, numLeds, testColor):
+		self.transaction(chainableRgbLedTest_cmd + [pin, numLeds, testColor], no_bytes = 1, identified = False)
+		return 1
+
+	# Grove Chainable RGB LED - set one or more leds to the stored color by pattern
+	# pattern: (0-3) 0 = this led only, 1 all leds except this led, 2 this led and all leds inwards, 3 this led and all leds outwards
+	# whichLed: index of led you wish to set counting outwards from the GrovePi, 0 = led closest to the GrovePi
+	def chainableRgbLed_pattern(self, pin, pattern, whichLed):
+		self.transaction(chainableRgbLedSetPattern_cmd + [pin, pattern, whichLed], no_bytes = 1, identified = False)
+		return 1
+
+	# Grove Chainable RGB LED - set one or more leds to the stored color by modulo
+	# offset: index of led you wish to start at, 0 = led closest to the GrovePi, counting outwards
+	# divisor: when 1 (default) sets stored color on all leds >= offset, when 2 sets every 2nd led >= offset and so on
+	def chainableRgbLed_modulo(self, pin, offset, divisor):
+		self.transaction(chainableRgbLedSetModulo_cmd + [pin, offset, divisor], no_bytes = 1, identified = False)
+		return 1
+
+	# Grove Chainable RGB LED - sets leds similar to a bar graph, reversible
+	# level: (0-10) the number of leds you wish to set to the stored color
+	# reversible (0-1) when 0 counting outwards from GrovePi, 0 = led closest to the GrovePi, otherwise counting inwards
+	def chainableRgbLed_setLevel(self, pin, level, reverse):
+		self.transaction(chainableRgbLedSetLevel_cmd + [pin, level, reverse], no_bytes = 1, identified = False)
+		return 1
+
+	def dust_sensor_en(self, pin = 2):
+		self.transaction(dust_sensor_en_cmd + [pin, unused, unused], no_bytes = 1, identified = False)
+
+	def dust_sensor_dis(self):
+		self.transaction(dust_sensor_dis_cmd + [unused, unused, unused], no_bytes = 1, identified = False)
+
+	def dust_sensor_read(self):
+		"""
+		By default, the sample rate is set to 1 at every 30 seconds and this
+		function was written only for that interval.
+
+		If you wish to use a different
+		interval, then use dust_sensor_read_more function. To set a
+		different interval, use set_dust_sensor_interval function.
+		"""
+		data_back = self.transaction(dust_sensor_read_cmd + [unused, unused, unused], no_bytes = 4)[0:4]
+		if data_back[0] != 255:
+			lowpulseoccupancy=(data_back[3] * 65536 + data_back[2] * 256 + data_back[1])
+			return [data_back[0], lowpulseoccupancy]
+		else:
+			return [-1,-1]
+
+	def dust_sensor_read_more(self, blocking = True):
+		sampletime_ms = self.get_dust_sensor_interval()
+		found, lpo = self.dust_sensor_read()
+		delay_to_reduce_traffic = 0.05
+		while found in [0, -1] and blocking is True:
+			if delay_to_reduce_traffic * 1000 < sampletime_ms:
+				time.sleep(delay_to_reduce_traffic)
+			found, lpo = self.dust_sensor_read()
+
+		if found in [0, -1] and blocking is False:
+			return (-1, -1, -1)
+
+		percentage = lpo * 100.0 / sampletime_ms
+		concetration = 1.1 * percentage ** 3 - 3.8 * percentage ** 2 + 520 * percentage + 0.62
+
+		return (lpo, percentage, concetration)
+
+	def set_dust_sensor_interval(self, interval_ms):
+		byte1 = interval_ms & 0xFF
+		byte2 = interval_ms >> 8
+		self.transaction(dust_sensor_int_cmd + [byte1, byte2] + [unused], no_bytes = 1, identified = False)
+
+	def get_dust_sensor_interval(self):
+		data_back = self.transaction(dust_sensor_read_int_cmd + 3 * [unused], no_bytes = 2)[0:2]
+
+		if -1 in data_back: return -1
+
+		interval = data_back[0] + data_back[1] * 256
+		return interval
+
+	def encoder_en(self):
+		self.transaction(encoder_en_cmd + [unused, unused, unused], no_bytes = 1, identified = False)
+
+	def encoder_dis(self):
+		self.transaction(encoder_dis_cmd + [unused, unused, unused], no_bytes = 1, identified = False)
+
+	def encoderRead(self):
+		data_back = self.transaction(encoder_read_cmd + [unused, unused, unused], no_bytes = 2)[0:2]
+		if data_back[0]!=255:
+			return [data_back[0],data_back[1]]
+		else:
+			return [-1,-1]
+
+	def flowEnable(self, pin = 2):
+		self.transaction(flow_en_cmd + [pin, unused, unused], no_bytes = 1, identified = False)
+
+	def flowDisable(self):
+		self.transaction(flow_disable_cmd + [unused, unused, unused], no_bytes = 1, identified = False)
+
+	def flowRead(self):
+		data_back = self.transaction(flow_read_cmd + [unused, unused, unused], no_bytes = 3, identified = False)[0:3]
+		#print data_back
+		if data_back[0]!=255:
+			return [data_back[0],data_back[2] * 256 + data_back[1]]
+		else:
+			return [-1,-1]
+
+
+# The module-level functions below are thin wrappers over a default session
+# It's only created, and the bus opened, by the first call that needs it
+_default_bus = "RPI_1SW"
+_default_session = None
+_default_lock = threading.Lock()
+
+# kept for scripts that talk to grovepi.i2c directly, set once the default session exists
+i2c = None
+
+# returns the session used by the module-level functions
+def get_default_session():
+	global i2c, _default_session
+	if _default_session is None:
+		with _default_lock:
+			if _default_session is None:
+				session = GrovePi(bus = _default_bus, address = address)
+				i2c = session.i2c
+				_default_session = session
+	return _default_session
+
+# replaces the default session with one running on the given bus
+def set_bus(bus):
+	global i2c, _default_bus, _default_session
+	with _default_lock:
+		_default_bus = bus
+		_default_session = GrovePi(bus = bus, address = address)
+		i2c = _default_session.i2c
+
+def get_timing_stats():
+	return get_default_session().get_timing_stats()
+
+# returns the grovepi_metrics.BusMetrics of the default session
+def get_metrics():
+	return get_default_session().metrics
+
+def reset_timing_stats():
+	return get_default_session().reset_timing_stats()
+
+def clear_cache():
+	return get_default_session().clear_cache()
+
+# Sample a sensor at rate_hz on an absolute-deadline clock
+# reader: function reading the sensor, like analogRead, called with args
+# samples: number of samples after which the stream ends, never ends when None
+# chunk_size: when given, samples are grouped in numpy arrays of chunk_size samples
+# returns a grovepi_scheduler.Stream, iterate over it with "for" or "async for"
+def stream(reader, rate_hz, args = (), samples = None, chunk_size = None):
+	import grovepi_scheduler
+	return grovepi_scheduler.Stream(reader, rate_hz, args, samples, chunk_size)
+
+def write_i2c_block(block):
+	return get_default_session().write_i2c_block(block)
+
+def read_i2c_block(no_bytes = max_recv_size):
+	return get_default_session().read_i2c_block(no_bytes)
 
 def read_identified_i2c_block(read_command_id, no_bytes):
-	data = [-1]
-	while data[0] != read_command_id[0]:
-		data = read_i2c_block(no_bytes + 1)
+	return get_default_session().read_identified_i2c_block(read_command_id, no_bytes)
 
-	return data[1:]
+def transaction(block, no_bytes = 1, identified = True, profile = None):
+	return get_default_session().transaction(block, no_bytes, identified, profile)
 
-# Arduino Digital Read
 def digitalRead(pin):
-	write_i2c_block(dRead_cmd + [pin, unused, unused])
-	data = read_identified_i2c_block( dRead_cmd, no_bytes = 1)[0]
-	return data
+	return get_default_session().digitalRead(pin)
 
-# Arduino Digital Write
 def digitalWrite(pin, value):
-	write_i2c_block(dWrite_cmd + [pin, value, unused])
-	read_i2c_block(no_bytes = 1)
-	return 1
+	return get_default_session().digitalWrite(pin, value)
 
-# Read analog value from Pin
 def analogRead(pin):
-	write_i2c_block(aRead_cmd + [pin, unused, unused])
-	number = read_identified_i2c_block(aRead_cmd, no_bytes = 2)
-	return number[0] * 256 + number[1]
+	return get_default_session().analogRead(pin)
 
+def analogReadMany(pins, samples = 1, oversample = 1, out = None):
+	return get_default_session().analogReadMany(pins, samples, oversample, out)
 
-# Write PWM
 def analogWrite(pin, value):
-	write_i2c_block(aWrite_cmd + [pin, value, unused])
-	read_i2c_block(no_bytes = 1)
-	return 1
+	return get_default_session().analogWrite(pin, value)
 
-# Setting Up Pin mode on Arduino
 def pinMode(pin, mode):
-	if mode == "OUTPUT":
-		write_i2c_block(pMode_cmd + [pin, 1, unused])
-	elif mode == "INPUT":
-		write_i2c_block(pMode_cmd + [pin, 0, unused])
-	read_i2c_block(no_bytes = 1)
-	return 1
+	return get_default_session().pinMode(pin, mode)
 
-
-# Read temp in Celsius from Grove Temperature Sensor
 def temp(pin, model = '1.0'):
-	# each of the sensor revisions use different thermistors, each with their own B value constant
-	if model == '1.2':
-		bValue = 4250  # sensor v1.2 uses thermistor ??? (assuming NCP18WF104F03RC until SeeedStudio clarifies)
-	elif model == '1.1':
-		bValue = 4250  # sensor v1.1 uses thermistor NCP18WF104F03RC
-	else:
-		bValue = 3975  # sensor v1.0 uses thermistor TTC3A103*39H
-	a = analogRead(pin)
-	resistance = (float)(1023 - a) * 10000 / a
-	t = (float)(1 / (math.log(resistance / 10000) / bValue + 1 / 298.15) - 273.15)
-	return t
+	return get_default_session().temp(pin, model)
 
-
-# Read value from Grove Ultrasonic
 def ultrasonicRead(pin):
-	write_i2c_block(uRead_cmd + [pin, unused, unused])
-	number = read_identified_i2c_block(uRead_cmd, no_bytes = 2)
-	return (number[0] * 256 + number[1])
-
+	return get_default_session().ultrasonicRead(pin)
 
-# Read the firmware version
 def version():
-	write_i2c_block(version_cmd + [unused, unused, unused])
-	number = read_identified_i2c_block(version_cmd, no_bytes = 3)
-	return "%s.%s.%s" % (number[0], number[1], number[2])
+	return get_default_session().version()
 
-
-# Read Grove Accelerometer (+/- 1.5g) XYZ value
-# Need to investigate why this reports what was read with the previous command
-# Doesn't look to be implemented on the GrovePi
 def acc_xyz():
-	write_i2c_block(acc_xyz_cmd + [unused, unused, unused])
-	number = read_identified_i2c_block(acc_xyz_cmd, no_bytes = 3)
-	if number[1] > 32:
-		number[1] = - (number[1] - 224)
-	if number[2] > 32:
-		number[2] = - (number[2] - 224)
-	if number[3] > 32:
-		number[3] = - (number[3] - 224)
-	return (number[0], number[1], number[2])
-
-
-# Read from Grove RTC
-# Doesn't look to be implemented on the GrovePi
+	return get_default_session().acc_xyz()
+
 def rtc_getTime():
-	write_i2c_block(rtc_getTime_cmd + [unused, unused, unused])
-	number = read_i2c_block()
-	return number
+	return get_default_session().rtc_getTime()
 
-# Read and return temperature and humidity from Grove DHT Pro
 def dht(pin, module_type):
-	write_i2c_block(dht_temp_cmd + [pin, module_type, unused])
-	number = read_identified_i2c_block(dht_temp_cmd, no_bytes = 8)
-
-	print(number)
-
-	if p_version==2:
-		h=''
-		for element in (number[0:4]):
-			h+=chr(element)
-
-		t_val=struct.unpack('f', h)
-		t = round(t_val[0], 2)
-
-		h = ''
-		for element in (number[4:8]):
-			h+=chr(element)
-
-		hum_val=struct.unpack('f',h)
-		hum = round(hum_val[0], 2)
-	else:
-		t_val=bytearray(number[0:4])
-		h_val=bytearray(number[4:8])
-		t=round(struct.unpack('f',t_val)[0],2)
-		hum=round(struct.unpack('f',h_val)[0],2)
-	if t > -100.0 and t <150.0 and hum >= 0.0 and hum<=100.0:
-		return [t, hum]
-	else:
-		return [float('nan'),float('nan')]
+	return get_default_session().dht(pin, module_type)
 
-# Grove - Infrared Receiver - get the commands received from the Grove IR sensor
 def ir_read_signal():
-	write_i2c_block(ir_read_cmd + [unused, unused, unused])
-	data_back = read_identified_i2c_block(ir_read_cmd, no_bytes = 7)
+	return get_default_session().ir_read_signal()
 
-	return (data_back[0],
-			data_back[1] + data_back[2] * 256,
-			data_back[3] + data_back[4] * 256 + data_back[5] * (256 ** 2) + data_back[6] * (256 ** 3))
-
-# Grove - Infrared Receiver - set the pin on which the Grove IR sensor is connected
 def ir_recv_pin(pin):
-	write_i2c_block(ir_recv_pin_cmd + [pin, unused, unused])
-	read_i2c_block(no_bytes = 1)
+	return get_default_session().ir_recv_pin(pin)
 
-# Grove - Infrared Receiver - check if there's any data that hasn't been read so far
 def ir_is_data():
-	write_i2c_block(ir_read_isdata + 3 * [unused])
-	number = read_identified_i2c_block(ir_read_isdata, no_bytes = 1)
-
-	return number[0] != 0
+	return get_default_session().ir_is_data()
 
-# after a list of numerical values is provided
-# the function returns a list with the outlier(or extreme) values removed
-# make the std_factor_threshold bigger so that filtering becomes less strict
-# and make the std_factor_threshold smaller to get the opposite
-def statisticalNoiseReduction(values, std_factor_threshold = 2):
-	if len(values) == 0:
-		return []
-
-	mean = numpy.mean(values)
-	standard_deviation = numpy.std(values)
-
-	if standard_deviation == 0:
-		return values
-
-	filtered_values = [element for element in values if element > mean - std_factor_threshold * standard_deviation]
-	filtered_values = [element for element in filtered_values if element < mean + std_factor_threshold * standard_deviation]
-
-	return filtered_values
-
-
-# Grove LED Bar - initialise
-# orientation: (0 = red to green, 1 = green to red)
 def ledBar_init(pin, orientation):
-	write_i2c_block(ledBarInit_cmd + [pin, orientation, unused])
-	read_i2c_block(no_bytes = 1)
-	return 1
+	return get_default_session().ledBar_init(pin, orientation)
 
-# Grove LED Bar - set orientation
-# orientation: (0 = red to green,  1 = green to red)
 def ledBar_orientation(pin, orientation):
-	write_i2c_block(ledBarOrient_cmd + [pin, orientation, unused])
-	read_i2c_block(no_bytes = 1)
-	return 1
+	return get_default_session().ledBar_orientation(pin, orientation)
 
-# Grove LED Bar - set level
-# level: (0-10)
 def ledBar_setLevel(pin, level):
-	write_i2c_block(ledBarLevel_cmd + [pin, level, unused])
-	read_i2c_block(no_bytes = 1)
-	return 1
+	return get_default_session().ledBar_setLevel(pin, level)
 
-# Grove LED Bar - set single led
-# led: which led (1-10)
-# state: off or on (0-1)
 def ledBar_setLed(pin, led, state):
-	write_i2c_block(ledBarSetOne_cmd + [pin, led, state])
-	read_i2c_block(no_bytes = 1)
-	return 1
+	return get_default_session().ledBar_setLed(pin, led, state)
 
-# Grove LED Bar - toggle single led
-# led: which led (1-10)
 def ledBar_toggleLed(pin, led):
-	write_i2c_block(ledBarToggleOne_cmd + [pin, led, unused])
-	read_i2c_block(no_bytes = 1)
-	return 1
+	return get_default_session().ledBar_toggleLed(pin, led)
 
-# Grove LED Bar - set all leds
-# state: (0-1023) or (0x00-0x3FF) or (0b0000000000-0b1111111111) or (int('0000000000',2)-int('1111111111',2))
 def ledBar_setBits(pin, state):
-	byte1 = state & 255
-	byte2 = state >> 8
-	write_i2c_block(ledBarSet_cmd + [pin, byte1, byte2])
-	read_i2c_block(no_bytes = 1)
-	return 1
-
-# Grove LED Bar - get current state
-# state: (0-1023) a bit for each of the 10 LEDs
-def ledBar_getBits(pin):
-	write_i2c_block(ledBarGet_cmd + [pin, unused, unused])
-	block = read_identified_i2c_block(ledBarGet_cmd, no_bytes = 2)
-	return block[0] ^ (block[1] << 8)
+	return get_default_session().ledBar_setBits(pin, state)
 
+def ledBar_getBits(pin):
+	return get_default_session().ledBar_getBits(pin)
 
-# Grove 4 Digit Display - initialise
 def fourDigit_init(pin):
-	write_i2c_block(fourDigitInit_cmd + [pin, unused, unused])
-	read_i2c_block(no_bytes = 1)
-	return 1
+	return get_default_session().fourDigit_init(pin)
 
-# Grove 4 Digit Display - set numeric value with or without leading zeros
-# value: (0-65535) or (0000-FFFF)
 def fourDigit_number(pin, value, leading_zero):
-	# split the value into two bytes so we can render 0000-FFFF on the display
-	byte1 = value & 255
-	byte2 = value >> 8
-	# separate commands to overcome current 4 bytes per command limitation
-	if (leading_zero):
-		write_i2c_block(fourDigitValue_cmd + [pin, byte1, byte2])
-	else:
-		write_i2c_block(fourDigitValueZeros_cmd + [pin, byte1, byte2])
-	read_i2c_block(no_bytes = 1)
-	return 1
+	return get_default_session().fourDigit_number(pin, value, leading_zero)
 
-# Grove 4 Digit Display - set brightness
-# brightness: (0-7)
 def fourDigit_brightness(pin, brightness):
-	# not actually visible until next command is executed
-	write_i2c_block(fourDigitBrightness_cmd + [pin, brightness, unused])
-	read_i2c_block(no_bytes = 1)
-	return 1
-
-# Grove 4 Digit Display - set individual segment (0-9,A-F)
-# segment: (0-3)
-# value: (0-15) or (0-F)
+	return get_default_session().fourDigit_brightness(pin, brightness)
+
 def fourDigit_digit(pin, segment, value):
-	write_i2c_block(fourDigitIndividualDigit_cmd + [pin, segment, value])
-	read_i2c_block(no_bytes = 1)
-	return 1
+	return get_default_session().fourDigit_digit(pin, segment, value)
 
-# Grove 4 Digit Display - set 7 individual leds of a segment
-# segment: (0-3)
-# leds: (0-255) or (0-0xFF) one bit per led, segment 2 is special, 8th bit is the colon
 def fourDigit_segment(pin, segment, leds):
-	write_i2c_block(fourDigitIndividualLeds_cmd + [pin, segment, leds])
-	read_i2c_block(no_bytes = 1)
-	return 1
-
-# Grove 4 Digit Display - set left and right values (0-99), with leading zeros and a colon
-# left: (0-255) or (0-FF)
-# right: (0-255) or (0-FF)
-# colon will be lit
+	return get_default_session().fourDigit_segment(pin, segment, leds)
+
 def fourDigit_score(pin, left, right):
-	write_i2c_block(fourDigitScore_cmd + [pin, left, right])
-	read_i2c_block(no_bytes = 1)
-	return 1
+	return get_default_session().fourDigit_score(pin, left, right)
 
-# Grove 4 Digit Display - display analogRead value for n seconds, 4 samples per second
-# analog: analog pin to read
-# duration: analog read for this many seconds
 def fourDigit_monitor(pin, analog, duration):
-	write_i2c_block(fourDigitAnalogRead_cmd + [pin, analog, duration])
-	read_i2c_block(no_bytes = 1)
-	time.sleep(duration)
-	return 1
+	return get_default_session().fourDigit_monitor(pin, analog, duration)
 
-# Grove 4 Digit Display - turn entire display on (88:88)
 def fourDigit_on(pin):
-	write_i2c_block(fourDigitAllOn_cmd + [pin, unused, unused])
-	read_i2c_block(no_bytes = 1)
-	return 1
+	return get_default_session().fourDigit_on(pin)
 
-# Grove 4 Digit Display - turn entire display off
 def fourDigit_off(pin):
-	write_i2c_block(fourDigitAllOff_cmd + [pin, unused, unused])
-	read_i2c_block(no_bytes = 1)
-	return 1
-
-# Grove Chainable RGB LED - store a color for later use
-# red: 0-255
-# green: 0-255
-# blue: 0-255
+	return get_default_session().fourDigit_off(pin)
+
 def storeColor(red, green, blue):
-	write_i2c_block(storeColor_cmd + [red, green, blue])
-	read_i2c_block(no_bytes = 1)
-	return 1
+	return get_default_session().storeColor(red, green, blue)
 
-# Grove Chainable RGB LED - initialise
-# numLeds: how many leds do you have in the chain
 def chainableRgbLed_init(pin, numLeds):
-	write_i2c_block(chainableRgbLedInit_cmd + [pin, numLeds, unused])
-	read_i2c_block(no_bytes = 1)
-	return 1
-
-# Grove Chainable RGB LED - initialise and test with a simple color
-# numLeds: how many leds do you have in the chain
-# testColor: (0-7) 3 bits in total - a bit for red, green and blue, eg. 0x04 == 0b100 (0bRGB) == rgb(255, 0, 0) == #FF0000 == red
-#            ie. 0 black, 1 blue, 2 green, 3 cyan, 4 red, 5 magenta, 6 yellow, 7 white
+	return get_default_session().chainableRgbLed_init(pin, numLeds)
+
 def chainableRgbLed_test(pin, numLeds, testColor):
-	write_i2c_block(chainableRgbLedTest_cmd + [pin, numLeds, testColor])
-	read_i2c_block(no_bytes = 1)
-	return 1
+	return get_default_session().chainableRgbLed_test(pin, numLeds, testColor)
 
-# Grove Chainable RGB LED - set one or more leds to the stored color by pattern
-# pattern: (0-3) 0 = this led only, 1 all leds except this led, 2 this led and all leds inwards, 3 this led and all leds outwards
-# whichLed: index of led you wish to set counting outwards from the GrovePi, 0 = led closest to the GrovePi
 def chainableRgbLed_pattern(pin, pattern, whichLed):
-	write_i2c_block(chainableRgbLedSetPattern_cmd + [pin, pattern, whichLed])
-	read_i2c_block(no_bytes = 1)
-	return 1
+	return get_default_session().chainableRgbLed_pattern(pin, pattern, whichLed)
 
-# Grove Chainable RGB LED - set one or more leds to the stored color by modulo
-# offset: index of led you wish to start at, 0 = led closest to the GrovePi, counting outwards
-# divisor: when 1 (default) sets stored color on all leds >= offset, when 2 sets every 2nd led >= offset and so on
 def chainableRgbLed_modulo(pin, offset, divisor):
-	write_i2c_block(chainableRgbLedSetModulo_cmd + [pin, offset, divisor])
-	read_i2c_block(no_bytes = 1)
-	return 1
+	return get_default_session().chainableRgbLed_modulo(pin, offset, divisor)
 
-# Grove Chainable RGB LED - sets leds similar to a bar graph, reversible
-# level: (0-10) the number of leds you wish to set to the stored color
-# reversible (0-1) when 0 counting outwards from GrovePi, 0 = led closest to the GrovePi, otherwise counting inwards
 def chainableRgbLed_setLevel(pin, level, reverse):
-	write_i2c_block(chainableRgbLedSetLevel_cmd + [pin, level, reverse])
-	read_i2c_block(no_bytes = 1)
-	return 1
+	return get_default_session().chainableRgbLed_setLevel(pin, level, reverse)
 
 def dust_sensor_en(pin = 2):
-	write_i2c_block(dust_sensor_en_cmd + [pin, unused, unused])
-	read_i2c_block(no_bytes = 1)
+	return get_default_session().dust_sensor_en(pin)
 
 def dust_sensor_dis():
-	write_i2c_block(dust_sensor_dis_cmd + [unused, unused, unused])
-	read_i2c_block(no_bytes = 1)
+	return get_default_session().dust_sensor_dis()
 
 def dust_sensor_read():
-	"""
-	By default, the sample rate is set to 1 at every 30 seconds and this
-	function was written only for that interval.
-
-	If you wish to use a different
-	interval, then use dust_sensor_read_more function. To set a
-	different interval, use set_dust_sensor_interval function.
-	"""
-	write_i2c_block(dust_sensor_read_cmd + [unused, unused, unused])
-	data_back = read_identified_i2c_block(dust_sensor_read_cmd, no_bytes = 4)[0:4]
-	if data_back[0] != 255:
-		lowpulseoccupancy=(data_back[3] * 65536 + data_back[2] * 256 + data_back[1])
-		return [data_back[0], lowpulseoccupancy]
-	else:
-		return [-1,-1]
+	return get_default_session().dust_sensor_read()
 
 def dust_sensor_read_more(blocking = True):
-	sampletime_ms = get_dust_sensor_interval()
-	found, lpo = dust_sensor_read()
-	delay_to_reduce_traffic = 0.05
-	while found in [0, -1] and blocking is True:
-		if delay_to_reduce_traffic * 1000 < sampletime_ms:
-			time.sleep(delay_to_reduce_traffic)
-		found, lpo = dust_sensor_read()
-
-	if found in [0, -1] and blocking is False:
-		return (-1, -1, -1)
-
-	percentage = lpo * 100.0 / sampletime_ms
-	concetration = 1.1 * percentage ** 3 - 3.8 * percentage ** 2 + 520 * percentage + 0.62
-
-	return (lpo, percentage, concetration)
+	return get_default_session().dust_sensor_read_more(blocking)
 
 def set_dust_sensor_interval(interval_ms):
-	byte1 = interval_ms & 0xFF
-	byte2 = interval_ms >> 8
-	write_i2c_block(dust_sensor_int_cmd + [byte1, byte2] + [unused])
-	read_i2c_block(no_bytes = 1)
+	return get_default_session().set_dust_sensor_interval(interval_ms)
 
 def get_dust_sensor_interval():
-	write_i2c_block(dust_sensor_read_int_cmd + 3 * [unused])
-	data_back = read_identified_i2c_block(dust_sensor_read_int_cmd, no_bytes = 2)[0:2]
-
-	if -1 in data_back: return -1
-
-	interval = data_back[0] + data_back[1] * 256
-	return interval
+	return get_default_session().get_dust_sensor_interval()
 
 def encoder_en():
-	write_i2c_block(encoder_en_cmd + [unused, unused, unused])
-	read_i2c_block(no_bytes = 1)
+	return get_default_session().encoder_en()
 
 def encoder_dis():
-	write_i2c_block(encoder_dis_cmd + [unused, unused, unused])
-	read_i2c_block(no_bytes = 1)
+	return get_default_session().encoder_dis()
 
 def encoderRead():
-	write_i2c_block(encoder_read_cmd + [unused, unused, unused])
-	read_identified_i2c_block(encoder_read_cmd, no_bytes = 2)[0:2]
-	if data_back[0]!=255:
-		return [data_back[0],data_back[1]]
-	else:
-		return [-1,-1]
+	return get_default_session().encoderRead()
 
 def flowEnable(pin = 2):
-	write_i2c_block(flow_en_cmd + [pin, unused, unused])
-	read_i2c_block(no_bytes = 1)
+	return get_default_session().flowEnable(pin)
 
 def flowDisable():
-	write_i2c_block(flow_disable_cmd + [unused, unused, unused])
-	read_i2c_block(no_bytes = 1)
+	return get_default_session().flowDisable()
 
 def flowRead():
-	write_i2c_block(flow_read_cmd + [unused, unused, unused])
-	data_back = read_i2c_block(no_bytes = 3)[0:3]
-	#print data_back
-	if data_back[0]!=255:
-		return [data_back[0],data_back[2] * 256 + data_back[1]]
-	else:
-		return [-1,-1]
+	return get_default_session().flowRead()
+
+# after a list of numerical values is provided
+# the function returns a list with the outlier(or extreme) values removed
+# make the std_factor_threshold bigger so that filtering becomes less strict
+# and make the std_factor_threshold smaller to get the opposite
+# see grovepi_filters for filtering samples as they arrive, or whole numpy arrays
+def statisticalNoiseReduction(values, std_factor_threshold = 2):
+	if len(values) == 0:
+		return []
+
+	import grovepi_filters
+	mask = grovepi_filters.outlier_mask(values, std_factor_threshold)
+	if mask.all():
+		return values
+
+	return [element for element, keep in zip(values, mask) if keep]
 
 def main():
 	print("library supports this fw versions: " +
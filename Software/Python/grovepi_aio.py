@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+#
+# GrovePi asyncio library
+#
+# Awaitable versions of the grovepi functions, so sensors can be sampled from the
+# same event loop that serves network I/O:
+#
+#	import asyncio, grovepi, grovepi_aio
+#
+#	async def main():
+#		value = await grovepi_aio.analogRead(0)
+#		[temp, humidity] = await grovepi_aio.dht(4, 0)
+#		async for sample in grovepi_aio.stream(grovepi.analogRead, 50, args = (0,), samples = 500):
+#			print(sample.timestamp, sample.value)
+#
+#	asyncio.run(main())
+#
+# Every command runs on a single worker thread that owns the bus, so commands never
+# overlap on the wire and the event loop keeps running while the worker waits for the GrovePi.
+#
+# The GrovePi connects the Raspberry Pi and Grove sensors.  You can learn more about GrovePi here:  http://www.dexterindustries.com/GrovePi
+#
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/DexterInd/GrovePi/blob/master/LICENSE
+
+import asyncio
+import functools
+import concurrent.futures
+
+import grovepi
+import grovepi_scheduler
+
+# Wraps a grovepi.GrovePi session
+# session: the session to use, the default session of the grovepi module when None
+class AsyncGrovePi(object):
+	def __init__(self, session = None):
+		self._session = session
+		self.executor = concurrent.futures.ThreadPoolExecutor(max_workers = 1)
+
+	@property
+	def session(self):
+		if self._session is None:
+			return grovepi.get_default_session()
+		return self._session
+
+	# runs a method of the session on the bus worker
+	async def run(self, name, *args):
+		loop = asyncio.get_running_loop()
+		method = getattr(self.session, name)
+		return await loop.run_in_executor(self.executor, functools.partial(method, *args))
+
+	# stops the bus worker once the pending commands are done
+	def close(self):
+		self.executor.shutdown(wait = True)
+
+	async def digitalRead(self, pin):
+		return await self.run("digitalRead", pin)
+
+	async def digitalWrite(self, pin, value):
+		return await self.run("digitalWrite", pin, value)
+
+	async def analogRead(self, pin):
+		return await self.run("analogRead", pin)
+
+	async def analogReadMany(self, pins, samples = 1, oversample = 1, out = None):
+		return await self.run("analogReadMany", pins, samples, oversample, out)
+
+	async def analogWrite(self, pin, value):
+		return await self.run("analogWrite", pin, value)
+
+	async def pinMode(self, pin, mode):
+		return await self.run("pinMode", pin, mode)
+
+	async def ultrasonicRead(self, pin):
+		return await self.run("ultrasonicRead", pin)
+
+	async def dht(self, pin, module_type):
+		return await self.run("dht", pin, module_type)
+
+	async def ledBar_init(self, pin, orientation):
+		return await self.run("ledBar_init", pin, orientation)
+
+	async def ledBar_orientation(self, pin, orientation):
+		return await self.run("ledBar_orientation", pin, orientation)
+
+	async def ledBar_setLevel(self, pin, level):
+		return await self.run("ledBar_setLevel", pin, level)
+
+	async def ledBar_setLed(self, pin, led, state):
+		return await self.run("ledBar_setLed", pin, led, state)
+
+	async def ledBar_toggleLed(self, pin, led):
+		return await self.run("ledBar_toggleLed", pin, led)
+
+	async def ledBar_setBits(self, pin, state):
+		return await self.run("ledBar_setBits", pin, state)
+
+	async def ledBar_getBits(self, pin):
+		return await self.run("ledBar_getBits", pin)
+
+	async def fourDigit_init(self, pin):
+		return await self.run("fourDigit_init", pin)
+
+	async def fourDigit_number(self, pin, value, leading_zero):
+		return await self.run("fourDigit_number", pin, value, leading_zero)
+
+	async def fourDigit_brightness(self, pin, brightness):
+		return await self.run("fourDigit_brightness", pin, brightness)
+
+	async def fourDigit_digit(self, pin, segment, value):
+		return await self.run("fourDigit_digit", pin, segment, value)
+
+	async def fourDigit_segment(self, pin, segment, leds):
+		return await self.run("fourDigit_segment", pin, segment, leds)
+
+	async def fourDigit_score(self, pin, left, right):
+		return await self.run("fourDigit_score", pin, left, right)
+
+	# the event loop keeps running while the GrovePi monitors for duration
+	async def fourDigit_monitor(self, pin, analog, duration):
+		start = grovepi._clock()
+		await self.run("transaction", grovepi.fourDigitAnalogRead_cmd + [pin, analog, duration], 1, False,
+			grovepi.monitor_profile(duration))
+		# with a firmware that answers right away, the display keeps monitoring on its own
+		remaining = duration - (grovepi._clock() - start)
+		if remaining > 0:
+			await asyncio.sleep(remaining)
+		return 1
+
+	async def fourDigit_on(self, pin):
+		return await self.run("fourDigit_on", pin)
+
+	async def fourDigit_off(self, pin):
+		return await self.run("fourDigit_off", pin)
+
+
+# Iterates over a grovepi_scheduler.Stream from the event loop, this is what "async for" on a stream calls
+# The deadlines are waited for with asyncio.sleep and the reads run on the bus worker of the default AsyncGrovePi,
+# or on executor when one is given
+async def iterate_stream(stream, executor = None):
+	loop = asyncio.get_running_loop()
+	if executor is None:
+		executor = get_default().executor
+	chunk = []
+	while not stream.finished():
+		delay, missed = stream.next_delay(grovepi_scheduler._clock())
+		if delay > 0:
+			await asyncio.sleep(delay)
+		timestamp = grovepi_scheduler._clock()
+		value = await loop.run_in_executor(executor, functools.partial(stream.reader, *stream.args))
+		sample = stream.record(timestamp, value, missed)
+
+		if stream.chunk_size is None:
+			yield sample
+		else:
+			chunk.append(sample)
+			if len(chunk) == stream.chunk_size:
+				yield grovepi_scheduler.make_chunk(chunk)
+				chunk = []
+	if len(chunk) > 0:
+		yield grovepi_scheduler.make_chunk(chunk)
+
+# returns a grovepi_scheduler.Stream to iterate over with "async for", see grovepi.stream
+def stream(reader, rate_hz, args = (), samples = None, chunk_size = None):
+	return grovepi_scheduler.Stream(reader, rate_hz, args, samples, chunk_size)
+
+# The module-level coroutines below run on a default AsyncGrovePi
+# which follows the default session of the grovepi module
+_default = None
+
+def get_default():
+	global _default
+	if _default is None:
+		_default = AsyncGrovePi()
+	return _default
+
+async def digitalRead(pin):
+	return await get_default().digitalRead(pin)
+
+async def digitalWrite(pin, value):
+	return await get_default().digitalWrite(pin, value)
+
+async def analogRead(pin):
+	return await get_default().analogRead(pin)
+
+async def analogReadMany(pins, samples = 1, oversample = 1, out = None):
+	return await get_default().analogReadMany(pins, samples, oversample, out)
+
+async def analogWrite(pin, value):
+	return await get_default().analogWrite(pin, value)
+
+async def pinMode(pin, mode):
+	return await get_default().pinMode(pin, mode)
+
+async def ultrasonicRead(pin):
+	return await get_default().ultrasonicRead(pin)
+
+async def dht(pin, module_type):
+	return await get_default().dht(pin, module_type)
+
+async def ledBar_init(pin, orientation):
+	return await get_default().ledBar_init(pin, orientation)
+
+async def ledBar_orientation(pin, orientation):
+	return await get_default().ledBar_orientation(pin, orientation)
+
+async def ledBar_setLevel(pin, level):
+	return await get_default().ledBar_setLevel(pin, level)
+
+async def ledBar_setLed(pin, led, state):
+	return await get_default().ledBar_setLed(pin, led, state)
+
+async def ledBar_toggleLed(pin, led):
+	return await get_default().ledBar_toggleLed(pin, led)
+
+async def ledBar_setBits(pin, state):
+	return await get_default().ledBar_setBits(pin, state)
+
+async def ledBar_getBits(pin):
+	return await get_default().ledBar_getBits(pin)
+
+async def fourDigit_init(pin):
+	return await get_default().fourDigit_init(pin)
+
+async def fourDigit_number(pin, value, leading_zero):
+	return await get_default().fourDigit_number(pin, value, leading_zero)
+
+async def fourDigit_brightness(pin, brightness):
+	return await get_default().fourDigit_brightness(pin, brightness)
+
+async def fourDigit_digit(pin, segment, value):
+	return await get_default().fourDigit_digit(pin, segment, value)
+
+async def fourDigit_segment(pin, segment, leds):
+	return await get_default().fourDigit_segment(pin, segment, leds)
+
+async def fourDigit_score(pin, left, right):
+	return await get_default().fourDigit_score(pin, left, right)
+
+async def fourDigit_monitor(pin, analog, duration):
+	return await get_default().fourDigit_monitor(pin, analog, duration)
+
+async def fourDigit_on(pin):
+	return await get_default().fourDigit_on(pin)
+
+async def fourDigit_off(pin):
+	return await get_default().fourDigit_off(pin)
@@ -0,0 +1,472 @@
+#!/usr/bin/env python
+#
+# GrovePi output devices that remember their state
+#
+# The firmware can't be asked what a device shows, so every update used to resend everything.
+# These objects keep a copy of the state and only send the commands that change it:
+#
+#	import grovepi_devices
+#
+#	chain = grovepi_devices.ChainableRgbLed(pin = 7, num_leds = 10)
+#	chain.init()
+#	chain.show([(255, 0, 0)] * 10)		# storeColor + a single pattern command
+#	chain.show([(255, 0, 0)] * 9 + [(0, 0, 255)])	# storeColor + a single pattern command
+#	print(chain.last_command_count)
+#
+#	bar = grovepi_devices.LedBar(pin = 5)
+#	bar.init()
+#	meter = grovepi_devices.Animation(lambda t: bar.setLevel(read_level()), fps = 30)
+#	meter.start()				# redraws 30 times per second, a frame that didn't change costs nothing
+#
+#	display = grovepi_devices.FourDigitDisplay(pin = 6)
+#	display.init()
+#	display.setNumber(21.5)			# "21:50", the colon stands for the decimal point
+#	display.scroll("HELLO 2024", 4)		# returns right away, 4 steps per second
+#
+# The copy is only right as long as nothing else drives the device, call invalidate() otherwise.
+#
+# The GrovePi connects the Raspberry Pi and Grove sensors.  You can learn more about GrovePi here:  http://www.dexterindustries.com/GrovePi
+#
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/DexterInd/GrovePi/blob/master/LICENSE
+
+import time
+import threading
+
+import grovepi
+import grovepi_scheduler
+
+_clock = getattr(time, "monotonic", time.time)
+
+black = (0, 0, 0)
+
+def _count(mask):
+	return bin(mask).count("1")
+
+# Grove Chainable RGB LEDs driven by the firmware
+# session: the grovepi.GrovePi session to use, the default session of the grovepi module when None
+#
+# Each firmware command sets a group of LEDs to the stored colour, so a frame is planned as
+# groups of commands sharing a storeColor. The planner works backwards from the frame: the last
+# group fixes the LEDs it sets, the groups before it may set those to anything since they get
+# overwritten. It picks the group that fixes the most LEDs per command each time.
+class ChainableRgbLed(object):
+	def __init__(self, pin, num_leds, session = None):
+		if not 0 < num_leds < 256:
+			raise ValueError("a chain has 1 to 255 LEDs")
+		self.pin = pin
+		self.num_leds = num_leds
+		self._session = session
+		# the colour of each LED, None when unknown
+		self.colors = None
+		# commands sent by the last show, and by all of them
+		self.last_command_count = 0
+		self.command_count = 0
+		self._candidates = self._build_candidates()
+
+	@property
+	def session(self):
+		if self._session is None:
+			return grovepi.get_default_session()
+		return self._session
+
+	# initialises the chain, which turns every LED off
+	def init(self):
+		self.session.chainableRgbLed_init(self.pin, self.num_leds)
+		self.colors = [black] * self.num_leds
+
+	# forgets the colours of the LEDs, the next show sets all of them
+	def invalidate(self):
+		self.colors = None
+
+	# returns every command setting LEDs to the stored colour, as (LEDs set, LEDs turned off, method, arguments)
+	def _build_candidates(self):
+		n = self.num_leds
+		everything = (1 << n) - 1
+		candidates = []
+		for led in range(n):
+			candidates.append((1 << led, 0, "chainableRgbLed_pattern", (self.pin, 0, led)))
+		for led in range(n):
+			candidates.append((everything & ~(1 << led), 0, "chainableRgbLed_pattern", (self.pin, 1, led)))
+			candidates.append(((1 << (led + 1)) - 1, 0, "chainableRgbLed_pattern", (self.pin, 2, led)))
+			if led > 0:
+				candidates.append((everything & ~((1 << led) - 1), 0, "chainableRgbLed_pattern", (self.pin, 3, led)))
+		# a divisor of 1 is pattern 3, and a single LED is pattern 0
+		for divisor in range(2, n):
+			for offset in range(0, n - divisor):
+				mask = 0
+				for led in range(offset, n, divisor):
+					mask |= 1 << led
+				candidates.append((mask, 0, "chainableRgbLed_modulo", (self.pin, offset, divisor)))
+		# setLevel turns the LEDs after the level off, only counting outwards
+		# since the firmware gets the indexes wrong when counting inwards
+		for level in range(1, n):
+			lit = (1 << level) - 1
+			candidates.append((lit, everything & ~lit, "chainableRgbLed_setLevel", (self.pin, level, 0)))
+		return candidates
+
+	# returns the commands to go from the current colours to colors, as (method, arguments)
+	def plan(self, colors):
+		colors = [tuple(color) for color in colors]
+		if len(colors) != self.num_leds:
+			raise ValueError("expected {} colours, got {}".format(self.num_leds, len(colors)))
+
+		targets = {}
+		for led, color in enumerate(colors):
+			targets[color] = targets.get(color, 0) | (1 << led)
+		needed = 0
+		for led, color in enumerate(colors):
+			if self.colors is None or self.colors[led] != color:
+				needed |= 1 << led
+
+		# groups of (colour, commands), last one first
+		groups = []
+		fixed = 0
+		while needed & ~fixed:
+			best = None
+			for color in targets:
+				if not targets[color] & needed & ~fixed:
+					continue
+				group = self._plan_group(color, targets, needed, fixed)
+				# LEDs fixed per command, storeColor included
+				score = float(_count((group[1] & needed) & ~fixed)) / (len(group[0]) + 1)
+				if best is None or score > best[0]:
+					best = (score, color, group)
+			_, color, (commands, group_fixed) = best
+			groups.append((color, commands))
+			fixed |= group_fixed
+
+		stored = self.session.stored_color
+		commands = []
+		for color, group in reversed(groups):
+			if color != stored:
+				commands.append(("storeColor", color))
+				stored = color
+			commands += group
+		return commands
+
+	# greedily picks the commands of a colour, returns (commands, LEDs fixed once they're done)
+	def _plan_group(self, color, targets, needed, fixed):
+		same = targets[color]
+		dark = targets.get(black, 0)
+		commands = []
+		while True:
+			allowed = fixed | same
+			dark_allowed = fixed | dark
+			best_gain = 0
+			best = None
+			for lit, off, name, args in self._candidates:
+				if lit & ~allowed or off & ~dark_allowed:
+					continue
+				gain = _count((lit | off) & needed & ~fixed)
+				if gain > best_gain:
+					best_gain = gain
+					best = (lit, off, name, args)
+			if best is None:
+				return commands, fixed
+			lit, off, name, args = best
+			# picked backwards too, so it runs before the commands picked so far
+			commands.insert(0, (name, args))
+			fixed |= lit | off
+
+	# sets the colour of every LED, colors being a (red, green, blue) for each of them
+	# returns the number of commands it took
+	def show(self, colors):
+		colors = [tuple(color) for color in colors]
+		session = self.session
+		with session.lock:
+			commands = self.plan(colors)
+			for name, args in commands:
+				getattr(session, name)(*args)
+		self.colors = colors
+		self.last_command_count = len(commands)
+		self.command_count += len(commands)
+		return len(commands)
+
+# Grove LED Bar driven by the firmware
+# session: the grovepi.GrovePi session to use, the default session of the grovepi module when None
+#
+# Each firmware command (setLevel, setLed, toggleLed, setBits) is a single write that ends
+# with the firmware shifting the whole bar out, so they all cost the same. The bar always
+# sends setBits, the only one that doesn't depend on the state of the board, and doesn't
+# send anything when the state doesn't change.
+class LedBar(object):
+	def __init__(self, pin, orientation = 0, session = None):
+		self.pin = pin
+		self.orientation = orientation
+		self._session = session
+		# a bit for each of the 10 LEDs, None when unknown
+		self.bits = None
+		# commands sent, and changes that didn't need any
+		self.command_count = 0
+		self.skipped = 0
+
+	@property
+	def session(self):
+		if self._session is None:
+			return grovepi.get_default_session()
+		return self._session
+
+	# initialises the bar, with every LED off
+	# orientation: (0 = red to green, 1 = green to red)
+	def init(self):
+		self.session.ledBar_init(self.pin, self.orientation)
+		self.command_count += 1
+		self.bits = 0
+
+	# forgets the state, the next change is sent whatever it is
+	def invalidate(self):
+		self.bits = None
+
+	def setOrientation(self, orientation):
+		if orientation != self.orientation:
+			self.session.ledBar_orientation(self.pin, orientation)
+			self.command_count += 1
+			self.orientation = orientation
+
+	# state: (0-1023) a bit for each of the 10 LEDs
+	# returns the number of commands sent, 0 or 1
+	def setBits(self, state):
+		state &= 0x3ff
+		if state == self.bits:
+			self.skipped += 1
+			return 0
+		self.session.ledBar_setBits(self.pin, state)
+		self.command_count += 1
+		self.bits = state
+		return 1
+
+	# level: (0-10) the number of LEDs on
+	def setLevel(self, level):
+		return self.setBits((1 << max(0, min(10, int(level)))) - 1)
+
+	# led: which led (1-10)
+	# state: off or on (0-1)
+	def setLed(self, led, state):
+		led = max(1, min(10, led)) - 1
+		bits = self.getBits()
+		return self.setBits(bits | (1 << led) if state else bits & ~(1 << led))
+
+	# led: which led (1-10)
+	def toggleLed(self, led):
+		return self.setBits(self.getBits() ^ (1 << (max(1, min(10, led)) - 1)))
+
+	# returns the state, only asking the board when it isn't known
+	def getBits(self):
+		if self.bits is None:
+			self.bits = self.session.ledBar_getBits(self.pin)
+		return self.bits
+
+# Calls draw(t) fps times per second, t being the seconds since the animation started
+# The frames are timed like a grovepi_scheduler.Stream: when drawing takes too long,
+# the frames that are late are dropped instead of piling up, and counted in dropped.
+# frames: number of frames after which the animation ends, never ends when None
+class Animation(object):
+	def __init__(self, draw, fps = 30, frames = None):
+		self.draw = draw
+		self.fps = fps
+		self.stream = grovepi_scheduler.Stream(self._frame, fps, samples = frames)
+		self.start_time = None
+		self._thread = None
+
+	def _frame(self):
+		return self.draw(_clock() - self.start_time)
+
+	# number of frames drawn and dropped
+	@property
+	def count(self):
+		return self.stream.count
+
+	@property
+	def dropped(self):
+		return self.stream.overruns
+
+	# runs the animation in the calling thread, until it ends or stop() is called
+	def run(self):
+		if self.start_time is None:
+			self.start_time = _clock()
+		for _ in self.stream:
+			pass
+
+	# runs the animation in a background thread
+	def start(self):
+		if self._thread is not None:
+			return
+		self._thread = threading.Thread(target = self.run)
+		self._thread.daemon = True
+		self._thread.start()
+
+	# ends the animation after the current frame
+	def stop(self):
+		self.stream.stop()
+		if self._thread is not None and self._thread is not threading.current_thread():
+			self._thread.join()
+		self._thread = None
+
+# Segments of a digit of the 4 digit display, and the colon lit by the 2nd digit
+#     -A-
+#  F |   | B
+#     -G-
+#  E |   | C
+#     -D-
+segment_a = 0x01
+segment_b = 0x02
+segment_c = 0x04
+segment_d = 0x08
+segment_e = 0x10
+segment_f = 0x20
+segment_g = 0x40
+colon = 0x80
+
+# the characters a digit can show, as close as 7 segments get
+# letters that only exist in one case are used for both
+segment_font = {
+	" " : 0x00, "-" : 0x40, "_" : 0x08, "=" : 0x48, "'" : 0x20, '"' : 0x22, "?" : 0x53,
+	"[" : 0x39, "]" : 0x0f, "(" : 0x39, ")" : 0x0f, "\xb0" : 0x63,
+	"0" : 0x3f, "1" : 0x06, "2" : 0x5b, "3" : 0x4f, "4" : 0x66, "5" : 0x6d, "6" : 0x7d, "7" : 0x07,
+	"8" : 0x7f, "9" : 0x6f,
+	"A" : 0x77, "b" : 0x7c, "C" : 0x39, "c" : 0x58, "d" : 0x5e, "E" : 0x79, "F" : 0x71, "G" : 0x3d,
+	"H" : 0x76, "h" : 0x74, "I" : 0x06, "i" : 0x04, "J" : 0x1e, "K" : 0x75, "L" : 0x38, "M" : 0x37,
+	"n" : 0x54, "O" : 0x3f, "o" : 0x5c, "P" : 0x73, "q" : 0x67, "r" : 0x50, "S" : 0x6d, "t" : 0x78,
+	"U" : 0x3e, "u" : 0x1c, "V" : 0x3e, "W" : 0x7e, "X" : 0x76, "y" : 0x6e, "Z" : 0x5b,
+}
+
+# returns the segments of a character, 0 (blank) for the ones the display can't show
+def encode_character(character):
+	segments = segment_font.get(character)
+	if segments is None:
+		segments = segment_font.get(character.swapcase(), 0)
+	return segments
+
+# returns the segments of each character of text
+# a "." or ":" lights the colon bit of the character before it instead of taking a digit,
+# the display only shows it on the 2nd digit, where it stands for a decimal point too
+def render(text):
+	segments = []
+	for character in text:
+		if character in ".:" and segments:
+			segments[-1] |= colon
+		else:
+			segments.append(encode_character(character))
+	return segments
+
+# returns the text showing a number on the 4 digits, right aligned
+# numbers between -10 and 100 get 2 decimals, with the colon as decimal point, others are rounded
+# raises ValueError when it doesn't fit
+def format_number(value):
+	if isinstance(value, float) and -10 < value < 100:
+		text = "{:5.2f}".format(value)
+		if len(text) == 5 and text[2] == ".":
+			return text
+	text = "{:4d}".format(int(round(value)))
+	if len(text) > 4:
+		raise ValueError("{} doesn't fit on 4 digits".format(value))
+	return text
+
+# Grove 4 Digit Display driven by the firmware
+# session: the grovepi.GrovePi session to use, the default session of the grovepi module when None
+# Text and numbers are turned into segments here, and only the digits that change are sent,
+# with a fourDigit_segment each. Scrolling and monitoring run on an Animation in the background.
+class FourDigitDisplay(object):
+	digits = 4
+
+	def __init__(self, pin, session = None):
+		self.pin = pin
+		self._session = session
+		# the segments of each digit, None when unknown
+		self.segments = None
+		self.command_count = 0
+		self.animation = None
+
+	@property
+	def session(self):
+		if self._session is None:
+			return grovepi.get_default_session()
+		return self._session
+
+	def init(self):
+		self.session.fourDigit_init(self.pin)
+		self.command_count += 1
+		self.segments = None
+
+	# forgets what the display shows, the next change sends every digit
+	def invalidate(self):
+		self.segments = None
+
+	# brightness: (0-7), applied with the next change
+	def setBrightness(self, brightness):
+		self.session.fourDigit_brightness(self.pin, brightness)
+		self.command_count += 1
+
+	# shows the segments of each digit, returns the number of commands sent
+	def _show(self, segments):
+		segments = (list(segments) + [0] * self.digits)[:self.digits]
+		sent = 0
+		session = self.session
+		with session.lock:
+			for index, leds in enumerate(segments):
+				if self.segments is None or self.segments[index] != leds:
+					session.fourDigit_segment(self.pin, index, leds)
+					sent += 1
+		self.segments = segments
+		self.command_count += sent
+		return sent
+
+	# shows the segments of each digit, stops scrolling or monitoring
+	def setSegments(self, segments):
+		self.stop()
+		return self._show(segments)
+
+	# shows the first 4 characters of text, see render
+	def setText(self, text, right_aligned = False):
+		segments = render(text)[:self.digits]
+		if right_aligned:
+			segments = [0] * (self.digits - len(segments)) + segments
+		return self.setSegments(segments)
+
+	# shows an int or a float, see format_number
+	def setNumber(self, value):
+		return self.setText(format_number(value), right_aligned = True)
+
+	def clear(self):
+		return self.setSegments([0] * self.digits)
+
+	# scrolls text from right to left, moving rate_hz times per second, and returns right away
+	# repeat: start over once the text is gone, forever
+	def scroll(self, text, rate_hz = 4, repeat = False):
+		self.stop()
+		segments = [0] * self.digits + render(text) + [0] * self.digits
+		steps = len(segments) - self.digits + 1
+
+		def draw(t):
+			step = int(t * rate_hz)
+			if repeat:
+				step %= steps
+			elif step >= steps - 1:
+				step = steps - 1
+				self.animation.stream.stop()
+			self._show(segments[step:step + self.digits])
+
+		self._start(draw, rate_hz)
+
+	# shows what reader returns (a number), rate_hz times per second, and returns right away
+	# like fourDigit_monitor without blocking the caller or the GrovePi
+	def monitor(self, reader, rate_hz = 4, args = ()):
+		self.stop()
+		self._start(lambda t: self._show(render(format_number(reader(*args)))), rate_hz)
+
+	def _start(self, draw, rate_hz):
+		self.animation = Animation(draw, rate_hz)
+		self.animation.start()
+
+	# stops scrolling or monitoring
+	def stop(self):
+		if self.animation is not None:
+			self.animation.stop()
+			self.animation = None
+
+	# waits until a scroll that doesn't repeat is over
+	def wait(self):
+		animation = self.animation
+		if animation is not None and animation._thread is not None:
+			animation._thread.join()
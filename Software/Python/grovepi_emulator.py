@@ -0,0 +1,552 @@
+#!/usr/bin/env python
+#
+# GrovePi firmware emulator
+#
+# A virtual GrovePi that runs the command dispatch of Firmware/Source/grovepi/src/grove_pi_v1_3_0.ino
+# in pure Python. It exposes the same write_reg_list/read_list surface as di_i2c.DI_I2C so it can
+# be handed to the GrovePi library in place of a real bus:
+#
+#	import grovepi, grovepi_emulator
+#	board = grovepi_emulator.VirtualGrovePi()
+#	board.set_analog(0, 512)
+#	grovepi.set_bus(board)
+#	print(grovepi.analogRead(0))
+#
+# The GrovePi connects the Raspberry Pi and Grove sensors.  You can learn more about GrovePi here:  http://www.dexterindustries.com/GrovePi
+#
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/DexterInd/GrovePi/blob/master/LICENSE
+
+import time
+import random
+import struct
+import threading
+
+# what the firmware answers while it's still processing a command
+data_not_available = 23
+
+firmware_version = (1, 3, 0)
+
+# how many bytes the firmware sends back for each command (see sendData in the firmware)
+# commands that aren't in here don't write anything and the master reads a single 0x00
+reply_sizes = {
+	1 : 2, 3 : 3, 7 : 3, 56 : 3,
+	8 : 4, 20 : 4,
+	30 : 9, 40 : 9,
+	21 : 8, 24 : 2,
+	10 : 5, 6 : 3,
+	11 : 3, 12 : 3,
+}
+
+# time in seconds the firmware needs to process a command
+# commands that aren't in here take default_latency
+default_latency = 0.0002
+default_latencies = {
+	# a DHT conversion waits 250 ms + 20 ms before reading the sensor
+	40 : 0.275,
+	# the LED bar shifts out 11 words of 16 bits
+	50 : 0.0005, 51 : 0.0005, 52 : 0.0005, 53 : 0.0005, 54 : 0.0005, 55 : 0.0005, 56 : 0.0002,
+	# the TM1637 is bit-banged with 50 us delays
+	70 : 0.001, 71 : 0.001, 72 : 0.003, 73 : 0.003, 74 : 0.002, 75 : 0.002,
+	76 : 0.003, 78 : 0.003, 79 : 0.003,
+	# chainable RGB LEDs, per command; the per-LED cost is added on top
+	90 : 0.0001, 91 : 0.0005, 92 : 0.0005, 93 : 0.0005, 94 : 0.0005, 95 : 0.0005,
+}
+# time it takes to push the colour of a single chainable RGB LED
+rgb_led_latency = 0.0003
+# time it takes for the ultrasonic echo to travel 1 cm and back
+ultrasonic_latency_per_cm = 58e-6
+# pulseIn's timeout in the firmware
+ultrasonic_timeout = 0.075
+
+# TM1637 segments for the digits 0-F
+digit_to_segment = [
+	0x3f, 0x06, 0x5b, 0x4f, 0x66, 0x6d, 0x7d, 0x07,
+	0x7f, 0x6f, 0x77, 0x7c, 0x39, 0x5e, 0x79, 0x71
+]
+
+_clock = getattr(time, "monotonic", time.time)
+
+def encode_digit(digit):
+	return digit_to_segment[digit & 0x0f]
+
+# C-style division for the int arithmetic done on the Arduino
+def _c_div(a, b):
+	q = abs(a) // abs(b)
+	return q if (a >= 0) == (b >= 0) else -q
+
+def _int16(value):
+	value &= 0xffff
+	return value - 0x10000 if value & 0x8000 else value
+
+# TM1637::showNumberDec with length = 4 and pos = 0
+def show_number_dec(num, leading_zero):
+	digits = [0] * 4
+	divisors = [1, 10, 100, 1000]
+	leading = True
+	for k in range(4):
+		divisor = divisors[3 - k]
+		d = _c_div(num, divisor)
+		if d == 0:
+			if leading_zero or not leading or k == 3:
+				digits[k] = encode_digit(d)
+			else:
+				digits[k] = 0
+		else:
+			digits[k] = encode_digit(d)
+			num -= d * divisor
+			leading = False
+	return digits
+
+class LedBar(object):
+	def __init__(self, orientation):
+		self.orientation = orientation
+		self.state = 0
+
+	def set_level(self, level):
+		level = max(0, min(10, level))
+		self.state = (1 << level) - 1
+
+	def set_led(self, led, state):
+		led = max(1, min(10, led)) - 1
+		if state:
+			self.state |= 1 << led
+		else:
+			self.state &= ~(1 << led)
+
+	def toggle_led(self, led):
+		led = max(1, min(10, led)) - 1
+		self.state ^= 1 << led
+
+	def set_bits(self, bits):
+		self.state = bits & 0x3ff
+
+class FourDigitDisplay(object):
+	def __init__(self):
+		self.brightness = 2
+		self.segments = [0, 0, 0, 0]
+
+	def set_segments(self, data, position):
+		for index, segment in enumerate(data):
+			if 0 <= position + index < 4:
+				self.segments[position + index] = segment & 0xff
+
+class RgbLedChain(object):
+	def __init__(self, num_leds):
+		self.colors = [(0, 0, 0)] * num_leds
+
+	def set_color(self, led, color):
+		# the firmware doesn't check the index, but we don't want to corrupt the emulator
+		if 0 <= led < len(self.colors):
+			self.colors[led] = tuple(color)
+
+# A virtual GrovePi running firmware v1.3.0
+#
+# latencies: {command id : seconds} overriding the processing time of commands
+# latency_scale: factor applied to every processing time, 0 for an infinitely fast board
+# failure_rate: probability of a transfer raising an IOError
+# not_available_rate: probability of a read answering "data not available" even if the data is ready
+# seed: seed for the random generator used by the failure injection
+# clock: function returning the current time in seconds, time.monotonic by default
+class VirtualGrovePi(object):
+	def __init__(self, latencies = None, latency_scale = 1.0, failure_rate = 0.0, not_available_rate = 0.0, seed = None, clock = None):
+		self.latencies = dict(default_latencies)
+		if latencies is not None:
+			self.latencies.update(latencies)
+		self.latency_scale = latency_scale
+		self.failure_rate = failure_rate
+		self.not_available_rate = not_available_rate
+		self.random = random.Random(seed)
+		self.clock = _clock if clock is None else clock
+		self.lock = threading.Lock()
+
+		# inputs, set them with the set_* methods
+		self.digital_inputs = {}
+		self.analog_inputs = {}
+		self.ultrasonic_distances = {}
+		self.dht_values = {}
+		self.ir_codes = []
+
+		# outputs and internal state of the firmware
+		self.digital_outputs = {}
+		self.pwm_outputs = {}
+		self.pin_modes = {}
+		self.ledbars = {}
+		self.fourdigits = {}
+		self.rgbleds = {}
+		self.stored_color = (0, 0, 0)
+
+		self.dust_enabled = False
+		self.dust_pin = 2
+		self.dust_sampletime_ms = 30000
+		self.dust_latest = 0
+		self.dust_value = 0
+
+		self.encoder_enabled = False
+		self.encoder_index = 0
+		self.enc_val = [0, 0, 0]
+
+		self.flow_enabled = False
+		self.flow_pin = 2
+		self.flow_val = [0, 0, 0]
+
+		self.ir_pin = None
+		self.ir_decode_type = 0
+
+		self.cmd = [0, 0, 0, 0]
+		self.b = [0] * 21
+		self.dht_b = [0] * 21
+		self.busy_until = 0.0
+		self._forced_failures = 0
+
+		# transfer counters
+		self.stats = {
+			"writes" : 0,
+			"reads" : 0,
+			"not_available" : 0,
+			"failures" : 0,
+			"dropped_writes" : 0
+		}
+
+	# pin: digital port number
+	# value: 0/1 or a function returning 0/1
+	def set_digital(self, pin, value):
+		self.digital_inputs[pin] = value
+
+	# pin: analog port number
+	# value: 0-1023 or a function returning a value in that range
+	def set_analog(self, pin, value):
+		self.analog_inputs[pin] = value
+
+	# distance in cm seen by the ultrasonic ranger on the given pin, or a function returning it
+	def set_ultrasonic(self, pin, distance):
+		self.ultrasonic_distances[pin] = distance
+
+	# temperature and humidity seen by the DHT on the given pin
+	# pass a function returning a (temperature, humidity) tuple to have them change over time
+	def set_dht(self, pin, temperature, humidity = None):
+		if callable(temperature):
+			self.dht_values[pin] = temperature
+		else:
+			self.dht_values[pin] = (temperature, humidity)
+
+	# queues a code for the IR receiver
+	def push_ir_code(self, decode_type, address, value):
+		with self.lock:
+			self.ir_codes.append((decode_type, address, value))
+
+	# rotates the encoder by the given number of steps (negative for the other direction)
+	def rotate_encoder(self, steps = 1):
+		with self.lock:
+			if not self.encoder_enabled:
+				return
+			for _ in range(abs(steps)):
+				self.encoder_index += 1 if steps > 0 else -1
+				if self.encoder_index > 24:
+					self.encoder_index = 0
+				elif self.encoder_index < 0:
+					self.encoder_index = 24
+			self.enc_val = [self.cmd[0], 1, self.encoder_index]
+
+	# sets the low pulse occupancy reported at the end of the current dust sampling period
+	def set_dust(self, lowpulseoccupancy):
+		with self.lock:
+			if self.dust_enabled:
+				self.dust_value = lowpulseoccupancy
+				self.dust_latest = 1
+
+	# sets the flow rate reported by the flow sensor
+	def set_flow(self, rate):
+		with self.lock:
+			if self.flow_enabled:
+				self.flow_val = [1, rate % 256, rate // 256]
+
+	# sets the processing time of a command
+	def set_latency(self, command_id, seconds):
+		self.latencies[command_id] = seconds
+
+	# makes the next count transfers raise an IOError
+	def fail_next(self, count = 1):
+		with self.lock:
+			self._forced_failures += count
+
+	def get_stats(self):
+		with self.lock:
+			return dict(self.stats)
+
+	def _value(self, value):
+		return value() if callable(value) else value
+
+	def _check_failure(self):
+		if self._forced_failures > 0:
+			self._forced_failures -= 1
+			self.stats["failures"] += 1
+			raise IOError("[virtual grovepi] injected failure")
+		if self.failure_rate > 0 and self.random.random() < self.failure_rate:
+			self.stats["failures"] += 1
+			raise IOError("[virtual grovepi] injected failure")
+
+	# same as di_i2c.DI_I2C.write_reg_list
+	def write_reg_list(self, reg, data):
+		with self.lock:
+			self._check_failure()
+			self.stats["writes"] += 1
+			now = self.clock()
+			# receiveData flushes everything while the previous command is still being processed
+			if now < self.busy_until:
+				self.stats["dropped_writes"] += 1
+				return
+			block = ([reg] + list(data) + [0, 0, 0])[:4]
+			self.cmd = [value & 0xff for value in block]
+			self.busy_until = now + self._process() * self.latency_scale
+
+	# same as di_i2c.DI_I2C.read_list
+	def read_list(self, reg, len):
+		with self.lock:
+			self._check_failure()
+			self.stats["reads"] += 1
+			if self.clock() < self.busy_until or (self.not_available_rate > 0 and self.random.random() < self.not_available_rate):
+				self.stats["not_available"] += 1
+				reply = [data_not_available]
+			else:
+				reply = self._send_data()
+			return (reply + [0] * len)[:len]
+
+	# the firmware's sendData
+	def _send_data(self):
+		command = self.cmd[0]
+		size = reply_sizes.get(command)
+		if size is None:
+			return [0]
+		if command == 40:
+			return list(self.dht_b[:size])
+		if command == 11:
+			reply = list(self.enc_val)
+			self.enc_val[0] = self.enc_val[1] = 0
+			self.cmd[0] = 0
+			return reply
+		if command == 12:
+			reply = list(self.flow_val)
+			self.flow_val[0] = 0
+			self.cmd[0] = 0
+			return reply
+
+		reply = list(self.b[:size])
+		if command == 21:
+			self.b[0] = 0
+		elif command == 10:
+			self.dust_latest = 0
+			self.cmd[0] = 0
+		elif command == 6:
+			self.cmd[0] = 0
+		return reply
+
+	def _latency(self, command):
+		return self.latencies.get(command, default_latency)
+
+	# the firmware's processIO, returns the time it took to process the command
+	def _process(self):
+		cmd = self.cmd
+		command = cmd[0]
+		b = self.b
+		latency = self._latency(command)
+
+		if command == 1:
+			pin = cmd[1]
+			b[0] = command
+			if self.pin_modes.get(pin) == 1:
+				b[1] = self.digital_outputs.get(pin, 0)
+			else:
+				b[1] = int(self._value(self.digital_inputs.get(pin, 0))) & 1
+		elif command == 2:
+			self.digital_outputs[cmd[1]] = cmd[2]
+		elif command == 3:
+			value = int(self._value(self.analog_inputs.get(cmd[1], 0)))
+			value = max(0, min(1023, value))
+			b[0] = command
+			b[1] = value // 256
+			b[2] = value % 256
+		elif command == 4:
+			self.pwm_outputs[cmd[1]] = cmd[2]
+		elif command == 5:
+			self.pin_modes[cmd[1]] = cmd[2]
+		elif command == 7:
+			distance = self.ultrasonic_distances.get(cmd[1])
+			echo = ultrasonic_timeout
+			range_cm = 0
+			if distance is not None:
+				distance = int(self._value(distance))
+				echo = distance * ultrasonic_latency_per_cm
+				if echo > ultrasonic_timeout:
+					echo = ultrasonic_timeout
+				else:
+					range_cm = distance
+			b[0] = command
+			b[1] = range_cm // 256
+			b[2] = range_cm % 256
+			latency = self.latencies.get(command, echo)
+		elif command == 8:
+			b[0] = command
+			b[1], b[2], b[3] = firmware_version
+		elif command == 40:
+			values = self.dht_values.get(cmd[1])
+			if callable(values):
+				values = values()
+			if values is None:
+				values = (float('nan'), float('nan'))
+			packed = bytearray(struct.pack('<ff', values[0], values[1]))
+			self.dht_b[0] = command
+			for index in range(8):
+				self.dht_b[index + 1] = packed[index]
+
+		# Grove LED Bar
+		elif command == 50:
+			self.ledbars[cmd[1]] = LedBar(cmd[2])
+		elif 51 <= command <= 56 and cmd[1] in self.ledbars:
+			bar = self.ledbars[cmd[1]]
+			if command == 51:
+				bar.orientation = cmd[2]
+			elif command == 52:
+				bar.set_level(cmd[2])
+			elif command == 53:
+				bar.set_led(cmd[2], cmd[3])
+			elif command == 54:
+				bar.toggle_led(cmd[2])
+			elif command == 55:
+				bar.set_bits(cmd[2] ^ (cmd[3] << 8))
+			elif command == 56:
+				b[0] = command
+				b[1] = bar.state & 0xff
+				b[2] = bar.state >> 8
+
+		# Grove 4 Digit Display
+		elif command == 70:
+			self.fourdigits[cmd[1]] = FourDigitDisplay()
+		elif 71 <= command <= 79 and cmd[1] in self.fourdigits:
+			display = self.fourdigits[cmd[1]]
+			if command == 71:
+				display.brightness = cmd[2]
+			elif command in (72, 73):
+				number = _int16(cmd[2] ^ (cmd[3] << 8))
+				display.set_segments(show_number_dec(number, command == 73), 0)
+			elif command == 74:
+				display.set_segments([encode_digit(cmd[3])], cmd[2])
+			elif command == 75:
+				display.set_segments([cmd[3]], cmd[2])
+			elif command == 76:
+				data = [encode_digit(cmd[2] // 10), encode_digit(cmd[2] % 10) | 0x80,
+						encode_digit(cmd[3] // 10), encode_digit(cmd[3] % 10)]
+				display.set_segments(data, 0)
+			elif command == 77:
+				reads = 4 * cmd[3]
+				value = int(self._value(self.analog_inputs.get(cmd[2], 0)))
+				if reads > 0:
+					display.set_segments(show_number_dec(value, False), 0)
+				latency = self.latencies.get(command, reads * 0.003)
+			elif command == 78:
+				display.set_segments([0xff] * 4, 0)
+			elif command == 79:
+				display.set_segments([0x00] * 4, 0)
+
+		# Grove Chainable RGB LED
+		elif command == 90:
+			self.stored_color = (cmd[1], cmd[2], cmd[3])
+		elif command == 91:
+			self.rgbleds[cmd[1]] = RgbLedChain(cmd[2])
+		elif command == 92:
+			chain = RgbLedChain(cmd[2])
+			self.rgbleds[cmd[1]] = chain
+			color = (((cmd[3] & 4) >> 2) * 255, ((cmd[3] & 2) >> 1) * 255, (cmd[3] & 1) * 255)
+			for led in range(cmd[2]):
+				chain.set_color(led, color)
+			latency += rgb_led_latency * cmd[2]
+		elif 93 <= command <= 95 and cmd[1] in self.rgbleds:
+			chain = self.rgbleds[cmd[1]]
+			num_leds = len(chain.colors)
+			updated = 0
+			if command == 93:
+				if cmd[2] == 0:
+					chain.set_color(cmd[3], self.stored_color)
+					updated = 1
+				else:
+					for led in range(num_leds):
+						if (cmd[2] == 1 and led != cmd[3]) or (cmd[2] == 2 and led <= cmd[3]) or (cmd[2] == 3 and led >= cmd[3]):
+							chain.set_color(led, self.stored_color)
+							updated += 1
+			elif command == 94:
+				divisor = max(1, cmd[3])
+				for led in range(cmd[2], num_leds):
+					if (led - cmd[2]) % divisor == 0:
+						chain.set_color(led, self.stored_color)
+						updated += 1
+			elif command == 95:
+				if cmd[3] == 0:
+					for led in range(num_leds):
+						chain.set_color(led, self.stored_color if cmd[2] > led else (0, 0, 0))
+				else:
+					# counts from num_leds down to 1, same as the firmware
+					for led in range(num_leds, 0, -1):
+						chain.set_color(led, self.stored_color if num_leds - cmd[2] <= led else (0, 0, 0))
+				updated = num_leds
+			latency += rgb_led_latency * updated
+
+		# Dust sensor
+		elif command == 14:
+			self.dust_pin = cmd[1]
+			self.dust_enabled = True
+			self.dust_latest = 0
+			cmd[0] = 0
+		elif command == 15:
+			self.dust_enabled = False
+			cmd[0] = 0
+		elif command == 9:
+			self.dust_sampletime_ms = cmd[1] + (cmd[2] << 8)
+			self.dust_latest = 0
+		elif command == 6:
+			b[0] = command
+			b[1] = self.dust_sampletime_ms & 0xff
+			b[2] = (self.dust_sampletime_ms >> 8) & 0xff
+		elif command == 10:
+			b[0] = command
+			b[1] = self.dust_latest
+			b[2] = self.dust_value & 0xff
+			b[3] = (self.dust_value >> 8) & 0xff
+			b[4] = (self.dust_value >> 16) & 0xff
+
+		# Encoder
+		elif command == 16:
+			self.encoder_enabled = True
+			cmd[0] = 0
+		elif command == 17:
+			self.encoder_enabled = False
+
+		# Flow sensor
+		elif command == 18:
+			self.flow_pin = cmd[1]
+			self.flow_enabled = True
+			cmd[0] = 0
+		elif command == 13:
+			self.flow_enabled = False
+			cmd[0] = 0
+
+		# IR receiver
+		elif command == 22:
+			self.ir_pin = cmd[1]
+			cmd[0] = 0
+		elif command == 21:
+			b[0] = command
+			if self.ir_codes:
+				decode_type, address, value = self.ir_codes.pop(0)
+				self.ir_decode_type = decode_type
+				b[1] = decode_type
+				b[2] = address & 0xff
+				b[3] = (address >> 8) & 0xff
+				for index in range(4):
+					b[4 + index] = (value >> (8 * index)) & 0xff
+			else:
+				b[1] = self.ir_decode_type
+		elif command == 24:
+			b[0] = command
+			b[1] = 1 if self.ir_codes else 0
+
+		return latency
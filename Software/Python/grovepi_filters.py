@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+#
+# GrovePi outlier filters
+#
+# A sample is an outlier when it's further than std_factor_threshold standard deviations
+# away from the mean of the window it belongs to, like statisticalNoiseReduction does for a list.
+# OutlierFilter decides as the samples arrive, keeping a running mean and variance:
+#
+#	import grovepi, grovepi_filters
+#
+#	light = grovepi_filters.OutlierFilter(std_factor_threshold = 2, window = 100)
+#	while True:
+#		value = grovepi.analogRead(0)
+#		if light.add(value):
+#			print(value)
+#
+# and filter_batch takes the same decisions for a whole numpy array at once.
+# The window is made of the last window samples, or of all the samples seen so far when it's None.
+# Each sample is judged against the window it completes, outliers included, as statisticalNoiseReduction does.
+#
+# The GrovePi connects the Raspberry Pi and Grove sensors.  You can learn more about GrovePi here:  http://www.dexterindustries.com/GrovePi
+#
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/DexterInd/GrovePi/blob/master/LICENSE
+
+import math
+import collections
+
+# a window whose variance is below constant_variance * mean^2 (or constant_variance when the mean is below 1) holds
+# constant values, the variance left is rounding, and all its samples are kept
+constant_variance = 1e-12
+# a sample that's right at the limit is an outlier, the limit is lowered by this fraction so that
+# the rounding of OutlierFilter and filter_batch, which compute it differently, can't tip it either way
+tie_tolerance = 1e-9
+
+# Running mean and variance of a window of samples (Welford's algorithm)
+# Adding or removing a sample costs the same whatever the size of the window
+class RunningStats(object):
+	def __init__(self):
+		self.count = 0
+		self.mean = 0.0
+		self._m2 = 0.0
+
+	def add(self, value):
+		self.count += 1
+		delta = value - self.mean
+		self.mean += delta / self.count
+		self._m2 += delta * (value - self.mean)
+
+	def remove(self, value):
+		if self.count <= 1:
+			self.reset()
+			return
+		self.count -= 1
+		delta = value - self.mean
+		self.mean -= delta / self.count
+		self._m2 = max(0.0, self._m2 - delta * (value - self.mean))
+
+	def reset(self):
+		self.count = 0
+		self.mean = 0.0
+		self._m2 = 0.0
+
+	# computes the mean and variance of values again, dropping the rounding that adding and removing samples piles up
+	def recompute(self, values):
+		self.count = len(values)
+		if self.count == 0:
+			self.reset()
+			return
+		self.mean = math.fsum(values) / self.count
+		self._m2 = math.fsum((value - self.mean) ** 2 for value in values)
+
+	# population variance, like numpy.var
+	def variance(self):
+		if self.count == 0:
+			return 0.0
+		return self._m2 / self.count
+
+	def std(self):
+		return math.sqrt(self.variance())
+
+# Rejects outliers as the samples arrive
+# std_factor_threshold: make it bigger so that filtering becomes less strict, and smaller to get the opposite
+# window: number of samples the mean and variance are computed over, all of them when None
+# Memory is constant without a window, and holds the samples of the window otherwise
+class OutlierFilter(object):
+	def __init__(self, std_factor_threshold = 2, window = None):
+		if window is not None and window < 1:
+			raise ValueError("window must be positive")
+		self.std_factor_threshold = std_factor_threshold
+		self.window = window
+		self.stats = RunningStats()
+		self.samples = collections.deque() if window is not None else None
+		# samples removed from the window since its statistics were last recomputed
+		self._removed = 0
+
+		# number of samples accepted and rejected
+		self.accepted = 0
+		self.rejected = 0
+
+	# adds a sample to the window
+	# returns True when it's kept and False when it's an outlier
+	def add(self, value):
+		value = float(value)
+		if self.samples is not None:
+			if len(self.samples) == self.window:
+				self.stats.remove(self.samples.popleft())
+				self._removed += 1
+			self.samples.append(value)
+		self.stats.add(value)
+		# once the whole window has been replaced, which keeps the cost per sample the same
+		if self.samples is not None and self._removed >= self.window:
+			self.stats.recompute(self.samples)
+			self._removed = 0
+
+		mean = self.stats.mean
+		variance = self.stats.variance()
+		if variance <= constant_variance * max(1.0, mean * mean) or \
+				abs(value - mean) < self.std_factor_threshold * math.sqrt(variance) * (1 - tie_tolerance):
+			self.accepted += 1
+			return True
+		self.rejected += 1
+		return False
+
+	# returns the samples of values that aren't outliers, adding them one after the other
+	def filter(self, values):
+		return [value for value in values if self.add(value)]
+
+	def reset(self):
+		self.stats.reset()
+		if self.samples is not None:
+			self.samples.clear()
+		self._removed = 0
+		self.accepted = 0
+		self.rejected = 0
+
+# samples whose sums are computed from the same anchor by filter_batch, the longer the sums the more they cancel out
+batch_chunk = 1024
+
+# mean and variance of values[:1], values[:2], ... values[:n]
+# each chunk is summed around its own mean and merged with the samples before it (Chan's formula),
+# so the sums stay of the size of the chunk's spread even when the signal drifts
+def _expanding_stats(values):
+	import numpy
+	means = numpy.empty(values.size)
+	variances = numpy.empty(values.size)
+	count = 0
+	mean = 0.0
+	m2 = 0.0
+	for begin in range(0, values.size, batch_chunk):
+		block = values[begin:begin + batch_chunk]
+		anchor = block.mean()
+		centered = block - anchor
+		counts = numpy.arange(1, block.size + 1, dtype = numpy.float64)
+		sums = numpy.cumsum(centered)
+		block_means = sums / counts
+		block_m2 = numpy.maximum(numpy.cumsum(centered * centered) - sums * block_means, 0.0)
+		totals = count + counts
+		delta = block_means + (anchor - mean)
+		block_mean = mean + delta * counts / totals
+		block_m2 += m2 + delta * delta * count * counts / totals
+		means[begin:begin + block.size] = block_mean
+		variances[begin:begin + block.size] = block_m2 / totals
+		count += block.size
+		mean = block_mean[-1]
+		m2 = block_m2[-1]
+	return means, variances
+
+# mean and variance of every window of window samples, values[0:window], values[1:window + 1], ...
+# the windows are grouped by rows of `rows` windows, each row is summed around its own mean and the window
+# sums are differences of these sums, which only cancel as much as the row's samples spread
+def _sliding_stats(values, window):
+	import numpy
+	from numpy.lib.stride_tricks import as_strided
+	count = values.size - window + 1
+	rows = max(window, 32)
+	lines = -(-count // rows)
+	length = rows + window - 1
+	padded = numpy.concatenate((values, numpy.repeat(values[-1:], lines * rows - count)))
+	segments = as_strided(padded, shape = (lines, length), strides = (rows * padded.itemsize, padded.itemsize))
+	anchors = segments.mean(axis = 1)[:, None]
+	centered = segments - anchors
+	sums = numpy.zeros((lines, length + 1))
+	squares = numpy.zeros((lines, length + 1))
+	numpy.cumsum(centered, axis = 1, out = sums[:, 1:])
+	numpy.cumsum(centered * centered, axis = 1, out = squares[:, 1:])
+	means = (sums[:, window:] - sums[:, :-window]) / window
+	variances = numpy.maximum((squares[:, window:] - squares[:, :-window]) / window - means * means, 0.0)
+	return (means + anchors).ravel()[:count], variances.ravel()[:count]
+
+# Vectorized OutlierFilter
+# returns a boolean numpy array, True for the samples of values that OutlierFilter would keep
+# when they're added one after the other to a new filter
+# The window statistics come from sums re-anchored every few samples, so the cost per sample doesn't depend on the window
+def filter_batch(values, std_factor_threshold = 2, window = None):
+	import numpy
+	values = numpy.asarray(values, dtype = numpy.float64)
+	if values.size == 0:
+		return numpy.zeros(0, dtype = bool)
+
+	# until the window is full, it holds all the samples seen so far
+	filling = values.size if window is None else min(window - 1, values.size)
+	means = numpy.empty(values.size)
+	variances = numpy.empty(values.size)
+	means[:filling], variances[:filling] = _expanding_stats(values[:filling])
+	if filling < values.size:
+		means[filling:], variances[filling:] = _sliding_stats(values, window)
+
+	limits = std_factor_threshold * numpy.sqrt(variances) * (1 - tie_tolerance)
+	constant = variances <= constant_variance * numpy.maximum(1.0, means * means)
+	return constant | (numpy.abs(values - means) < limits)
+
+# Outliers of a list, judged against the mean and standard deviation of the whole list
+# returns the mask of the values that are kept, the same way statisticalNoiseReduction does
+def outlier_mask(values, std_factor_threshold = 2):
+	import numpy
+	values = numpy.asarray(values, dtype = numpy.float64)
+	standard_deviation = values.std() if values.size > 0 else 0.0
+	if standard_deviation == 0:
+		return numpy.ones(values.size, dtype = bool)
+	return numpy.abs(values - values.mean()) < std_factor_threshold * standard_deviation
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+#
+# GrovePi bus metrics
+#
+# Per-command counters and latency histograms for the transactions of a GrovePi session.
+# Every grovepi.GrovePi session records into one of these, the one of the default session
+# being returned by grovepi.get_metrics():
+#
+#	import grovepi
+#	metrics = grovepi.get_metrics()
+#	print(metrics.snapshot())
+#	metrics.write_prometheus("/var/lib/node_exporter/textfile_collector/grovepi.prom")
+#	metrics.serve_prometheus(port = 9110)
+#
+# The GrovePi connects the Raspberry Pi and Grove sensors.  You can learn more about GrovePi here:  http://www.dexterindustries.com/GrovePi
+#
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/DexterInd/GrovePi/blob/master/LICENSE
+
+import os
+import bisect
+import threading
+
+# upper bounds of the latency histogram buckets, in seconds
+latency_buckets = [0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25, 0.5, 1.0]
+
+# counters of a single command id
+class CommandMetrics(object):
+	def __init__(self):
+		self.calls = 0
+		self.retries = 0
+		self.not_available = 0
+		self.errors = 0
+		self.latency_sum = 0.0
+		# one count per bucket plus the +Inf one, not cumulative
+		self.latency_counts = [0] * (len(latency_buckets) + 1)
+
+	def as_dict(self):
+		cumulative = 0
+		buckets = []
+		for bound, count in zip(latency_buckets + [float('inf')], self.latency_counts):
+			cumulative += count
+			buckets.append((bound, cumulative))
+		return {
+			"calls" : self.calls,
+			"retries" : self.retries,
+			"not_available" : self.not_available,
+			"errors" : self.errors,
+			"latency_sum" : self.latency_sum,
+			"latency_buckets" : buckets
+		}
+
+# command_names: {command id : name} used to label the exported metrics
+class BusMetrics(object):
+	def __init__(self, command_names = None):
+		self.command_names = dict(command_names or {})
+		self.lock = threading.Lock()
+		self.commands = {}
+
+	def _get(self, command_id):
+		metrics = self.commands.get(command_id)
+		if metrics is None:
+			metrics = CommandMetrics()
+			self.commands[command_id] = metrics
+		return metrics
+
+	# a transfer failed and is being retried
+	def count_retry(self, command_id):
+		with self.lock:
+			self._get(command_id).retries += 1
+
+	# the GrovePi answered "data not available" or with the answer to another command
+	def count_not_available(self, command_id):
+		with self.lock:
+			self._get(command_id).not_available += 1
+
+	# a transaction is over, it took latency seconds
+	def observe(self, command_id, latency, error = False):
+		with self.lock:
+			metrics = self._get(command_id)
+			metrics.calls += 1
+			if error:
+				metrics.errors += 1
+			metrics.latency_sum += latency
+			metrics.latency_counts[bisect.bisect_left(latency_buckets, latency)] += 1
+
+	def reset(self):
+		with self.lock:
+			self.commands = {}
+
+	# returns {command id : counters}
+	# the latency buckets are (upper bound, cumulative count) tuples
+	def snapshot(self):
+		with self.lock:
+			return dict((command_id, metrics.as_dict()) for command_id, metrics in self.commands.items())
+
+	# returns the metrics in the Prometheus text exposition format
+	def prometheus_text(self):
+		snapshot = self.snapshot()
+		lines = []
+		counters = [
+			("grovepi_commands_total", "calls", "Commands sent to the GrovePi"),
+			("grovepi_retries_total", "retries", "Transfers retried after an I2C error"),
+			("grovepi_not_available_total", "not_available", "Polls answered with data not available"),
+			("grovepi_errors_total", "errors", "Commands that failed"),
+		]
+		for metric, key, description in counters:
+			lines.append("# HELP {} {}".format(metric, description))
+			lines.append("# TYPE {} counter".format(metric))
+			for command_id in sorted(snapshot):
+				lines.append("{}{{{}}} {}".format(metric, self._labels(command_id), snapshot[command_id][key]))
+
+		metric = "grovepi_command_latency_seconds"
+		lines.append("# HELP {} Time spent in a command, from the write to the answer".format(metric))
+		lines.append("# TYPE {} histogram".format(metric))
+		for command_id in sorted(snapshot):
+			labels = self._labels(command_id)
+			for bound, count in snapshot[command_id]["latency_buckets"]:
+				le = "+Inf" if bound == float('inf') else repr(bound)
+				lines.append("{}_bucket{{{},le=\"{}\"}} {}".format(metric, labels, le, count))
+			lines.append("{}_sum{{{}}} {}".format(metric, labels, repr(snapshot[command_id]["latency_sum"])))
+			lines.append("{}_count{{{}}} {}".format(metric, labels, snapshot[command_id]["calls"]))
+
+		return "\n".join(lines) + "\n"
+
+	def _labels(self, command_id):
+		name = self.command_names.get(command_id, str(command_id))
+		return "command=\"{}\",id=\"{}\"".format(name, command_id)
+
+	# writes the metrics to a file, for node_exporter's textfile collector for instance
+	# the file is replaced atomically so the collector never reads a partial file
+	def write_prometheus(self, path):
+		temporary = path + ".tmp"
+		with open(temporary, "w") as output:
+			output.write(self.prometheus_text())
+		os.rename(temporary, path)
+
+	# serves the metrics over HTTP from a background thread
+	# returns the server, call its shutdown() method to stop it
+	def serve_prometheus(self, port, address = "127.0.0.1"):
+		# http.server is slow to import, so only load it when it's used
+		try:
+			from http.server import BaseHTTPRequestHandler, HTTPServer
+		except ImportError:
+			from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+		metrics = self
+
+		class Handler(BaseHTTPRequestHandler):
+			def do_GET(self):
+				body = metrics.prometheus_text().encode("utf-8")
+				self.send_response(200)
+				self.send_header("Content-Type", "text/plain; version=0.0.4")
+				self.send_header("Content-Length", str(len(body)))
+				self.end_headers()
+				self.wfile.write(body)
+
+			def log_message(self, format, *args):
+				pass
+
+		server = HTTPServer((address, port), Handler)
+		thread = threading.Thread(target = server.serve_forever, name = "GrovePi metrics")
+		thread.daemon = True
+		thread.start()
+		return server
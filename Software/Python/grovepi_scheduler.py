@@ -0,0 +1,307 @@
+#!/usr/bin/env python
+#
+# GrovePi sampling scheduler
+#
+# Instead of a "while True: read; time.sleep(n)" loop per sensor, sensors are registered
+# with the rate they have to be sampled at and a single thread - the only one using the bus -
+# reads each of them when its deadline comes. Deadlines are absolute so the period doesn't drift
+# with the time it takes to read a sensor, and when the bus can't keep up the late samples are
+# dropped and counted as missed instead of piling up.
+#
+#	import grovepi, grovepi_scheduler
+#
+#	scheduler = grovepi_scheduler.Scheduler()
+#	dht = scheduler.add("dht", grovepi.dht, 0.5, args = (4, 0))
+#	light = scheduler.add("light", grovepi.analogRead, 10, args = (0,))
+#	ranger = scheduler.add("ranger", grovepi.ultrasonicRead, 20, args = (3,))
+#	scheduler.start()
+#	...
+#	print(light.latest(), light.achieved_rate(), light.missed)
+#	scheduler.stop()
+#
+# A single sensor can also be consumed as a stream of samples on the same kind of clock:
+#
+#	for sample in grovepi.stream(grovepi.analogRead, 100, args = (0,)):
+#		print(sample.timestamp, sample.value, sample.missed)
+#
+#	for chunk in grovepi.stream(grovepi.analogRead, 500, args = (0,), chunk_size = 250):
+#		process(chunk.timestamps, chunk.values)		# numpy arrays of 250 samples
+#
+# The GrovePi connects the Raspberry Pi and Grove sensors.  You can learn more about GrovePi here:  http://www.dexterindustries.com/GrovePi
+#
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/DexterInd/GrovePi/blob/master/LICENSE
+
+import time
+import heapq
+import threading
+import collections
+
+_clock = getattr(time, "monotonic", time.time)
+
+# A sensor registered with the scheduler
+# Samples are kept as (timestamp, value) tuples in a ring buffer of buffer_size entries,
+# the oldest samples being dropped when the consumer doesn't keep up
+class Sensor(object):
+	def __init__(self, name, reader, rate_hz, args = (), buffer_size = 100):
+		if rate_hz <= 0:
+			raise ValueError("rate_hz must be positive")
+		self.name = name
+		self.reader = reader
+		self.args = tuple(args)
+		self.period = 1.0 / rate_hz
+		self.rate_hz = rate_hz
+		self.buffer = collections.deque(maxlen = buffer_size)
+		self.lock = threading.Lock()
+		self.next_deadline = None
+
+		# number of samples taken, periods skipped because the bus was busy and failed reads
+		self.count = 0
+		self.missed = 0
+		self.errors = 0
+		self.first_timestamp = None
+		self.last_timestamp = None
+
+	# returns the last (timestamp, value) sample or None if there's none yet
+	def latest(self):
+		with self.lock:
+			if len(self.buffer) == 0:
+				return None
+			return self.buffer[-1]
+
+	# returns the buffered samples and empties the buffer
+	def drain(self):
+		with self.lock:
+			samples = list(self.buffer)
+			self.buffer.clear()
+		return samples
+
+	# samples per second achieved since the scheduler started
+	def achieved_rate(self):
+		with self.lock:
+			if self.count < 2 or self.last_timestamp == self.first_timestamp:
+				return 0.0
+			return (self.count - 1) / (self.last_timestamp - self.first_timestamp)
+
+	def stats(self):
+		with self.lock:
+			count, missed, errors = self.count, self.missed, self.errors
+		return {
+			"target_rate" : self.rate_hz,
+			"achieved_rate" : self.achieved_rate(),
+			"count" : count,
+			"missed" : missed,
+			"errors" : errors
+		}
+
+	def _push(self, timestamp, value):
+		with self.lock:
+			self.buffer.append((timestamp, value))
+			self.count += 1
+			if self.first_timestamp is None:
+				self.first_timestamp = timestamp
+			self.last_timestamp = timestamp
+
+# The bus worker
+# it's a thread, call start() to begin sampling and stop() to end it
+class Scheduler(threading.Thread):
+	def __init__(self, debugging = False):
+		super(Scheduler, self).__init__(name = "GrovePi scheduler")
+		self.daemon = True
+		self.debugging = debugging
+		self.event_stopper = threading.Event()
+		# set whenever a sensor is added so the worker re-evaluates its next deadline
+		self.event_wakeup = threading.Event()
+		self.lock = threading.Lock()
+		self.sensors = []
+		self.queue = []
+		self._sequence = 0
+
+	# registers a sensor
+	# reader: function reading the sensor, like grovepi.analogRead
+	# rate_hz: how many times per second the sensor has to be read
+	# args: arguments for reader
+	# buffer_size: how many samples are kept for the sensor
+	# returns the Sensor object holding the samples
+	def add(self, name, reader, rate_hz, args = (), buffer_size = 100):
+		sensor = Sensor(name, reader, rate_hz, args, buffer_size)
+		with self.lock:
+			sensor.next_deadline = _clock()
+			self.sensors.append(sensor)
+			self._schedule(sensor)
+		self.event_wakeup.set()
+		return sensor
+
+	# stops sampling a sensor
+	def remove(self, sensor):
+		with self.lock:
+			self.sensors.remove(sensor)
+			self.queue = [entry for entry in self.queue if entry[2] is not sensor]
+			heapq.heapify(self.queue)
+
+	# returns {name : stats} for every sensor
+	def stats(self):
+		with self.lock:
+			sensors = list(self.sensors)
+		return dict((sensor.name, sensor.stats()) for sensor in sensors)
+
+	# stops the thread and waits for it to finish
+	def stop(self):
+		self.event_stopper.set()
+		self.event_wakeup.set()
+		if self.is_alive():
+			self.join()
+
+	def _schedule(self, sensor):
+		# the sequence number keeps sensors with the same deadline in registration order
+		self._sequence += 1
+		heapq.heappush(self.queue, (sensor.next_deadline, self._sequence, sensor))
+
+	# you musn't call this function from the user-program
+	# this one is called by threading.Thread's start function
+	def run(self):
+		while not self.event_stopper.is_set():
+			with self.lock:
+				entry = self.queue[0] if len(self.queue) > 0 else None
+
+			if entry is None:
+				self.event_wakeup.wait()
+				self.event_wakeup.clear()
+				continue
+
+			deadline, _, sensor = entry
+			delay = deadline - _clock()
+			if delay > 0:
+				# woken up early when a sensor is added or when we're stopped
+				if self.event_wakeup.wait(delay):
+					self.event_wakeup.clear()
+					continue
+
+			with self.lock:
+				if len(self.queue) == 0 or self.queue[0] is not entry:
+					continue
+				heapq.heappop(self.queue)
+
+			try:
+				value = sensor.reader(*sensor.args)
+				sensor._push(_clock(), value)
+			except Exception as error:
+				with sensor.lock:
+					sensor.errors += 1
+				if self.debugging is True:
+					print("[scheduler][{}][{}]".format(sensor.name, error))
+
+			# the next deadline is one period after the previous one, not after the read
+			# if we're late by one or more periods, skip them and count them as missed
+			now = _clock()
+			next_deadline = deadline + sensor.period
+			if next_deadline <= now:
+				skipped = int((now - next_deadline) / sensor.period) + 1
+				with sensor.lock:
+					sensor.missed += skipped
+				next_deadline += skipped * sensor.period
+
+			with self.lock:
+				if sensor in self.sensors:
+					sensor.next_deadline = next_deadline
+					self._schedule(sensor)
+
+		if self.debugging is True:
+			print("[scheduler][called for joining thread]")
+
+# A sample of a Stream
+# timestamp: monotonic time at which the read started
+# missed: number of deadlines skipped right before this sample
+Sample = collections.namedtuple("Sample", ["timestamp", "value", "missed"])
+# chunk_size samples of a Stream, as numpy arrays
+# values has one row per sample, and one column per value when the reader returns a list (like grovepi.dht)
+Chunk = collections.namedtuple("Chunk", ["timestamps", "values", "missed"])
+
+# returns the Chunk made of a list of samples
+def make_chunk(samples):
+	import numpy
+	timestamps = numpy.array([sample.timestamp for sample in samples], dtype = numpy.float64)
+	values = numpy.asarray([sample.value for sample in samples])
+	return Chunk(timestamps, values, sum(sample.missed for sample in samples))
+
+# A sensor sampled at a fixed rate, iterated over as Sample tuples, or as Chunk tuples with chunk_size
+# Deadlines are absolute, so the period doesn't drift with the time a read or the consumer takes.
+# The sensor is only read when the consumer asks for the next sample, so a consumer that can't keep up
+# doesn't make samples pile up: the deadlines it made us miss are skipped, counted in overruns
+# and reported in the missed field of the next sample.
+# It can be iterated with "async for" too, the reads then run on the bus worker of grovepi_aio.
+# reader: function reading the sensor, like grovepi.analogRead
+# args: arguments for reader
+# samples: number of samples after which the stream ends, never ends when None
+# chunk_size: number of samples in each chunk, samples are yielded one by one when None
+class Stream(object):
+	def __init__(self, reader, rate_hz, args = (), samples = None, chunk_size = None):
+		if rate_hz <= 0:
+			raise ValueError("rate_hz must be positive")
+		if chunk_size is not None and chunk_size <= 0:
+			raise ValueError("chunk_size must be positive")
+		self.reader = reader
+		self.args = tuple(args)
+		self.rate_hz = rate_hz
+		self.period = 1.0 / rate_hz
+		self.samples = samples
+		self.chunk_size = chunk_size
+		self.next_deadline = None
+		self.stopped = False
+
+		# number of samples taken and of deadlines skipped
+		self.count = 0
+		self.overruns = 0
+
+	def __iter__(self):
+		samples = self._samples()
+		if self.chunk_size is None:
+			return samples
+		return self._chunks(samples)
+
+	def __aiter__(self):
+		import grovepi_aio
+		return grovepi_aio.iterate_stream(self)
+
+	# ends the iteration after the current sample
+	def stop(self):
+		self.stopped = True
+
+	def finished(self):
+		return self.stopped or (self.samples is not None and self.count >= self.samples)
+
+	# returns (delay, missed), the time left until the next deadline and the number of deadlines skipped to get there
+	def next_delay(self, now):
+		if self.next_deadline is None:
+			self.next_deadline = now
+		missed = 0
+		if now - self.next_deadline >= self.period:
+			missed = int((now - self.next_deadline) / self.period)
+			self.next_deadline += missed * self.period
+			self.overruns += missed
+		return self.next_deadline - now, missed
+
+	# returns the Sample of a read and moves on to the next deadline
+	def record(self, timestamp, value, missed):
+		self.next_deadline += self.period
+		self.count += 1
+		return Sample(timestamp, value, missed)
+
+	def _samples(self):
+		while not self.finished():
+			delay, missed = self.next_delay(_clock())
+			if delay > 0:
+				time.sleep(delay)
+			timestamp = _clock()
+			yield self.record(timestamp, self.reader(*self.args), missed)
+
+	def _chunks(self, samples):
+		chunk = []
+		for sample in samples:
+			chunk.append(sample)
+			if len(chunk) == self.chunk_size:
+				yield make_chunk(chunk)
+				chunk = []
+		# the last one is shorter when the stream ends in the middle of a chunk
+		if len(chunk) > 0:
+			yield make_chunk(chunk)
@@ -9,6 +9,56 @@ def get_file_with_parents(filepath, levels=1):
         common = os.path.dirname(common)
     return os.path.relpath(filepath, common)
 
+python_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# makes a library living in a sensor's directory importable, setup.py flattens them when installing
+def add_library_dir(*parts):
+    path = os.path.join(python_dir, *parts)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# makes the drivers' shared I2C bus run on a stand-in SMBus that records the writes
+# returns the stand-in, its writes attribute holds the (address, register, data) of each write
+def recording_i2c_bus():
+    add_library_dir("benchmarks")
+    import common
+    import grove_i2c_bus
+
+    class RecordingSMBus(common.StandInSMBus):
+        def __init__(self):
+            common.StandInSMBus.__init__(self)
+            self.writes = []
+
+        def write_byte_data(self, address, register, value):
+            common.StandInSMBus.write_byte_data(self, address, register, value)
+            self.writes.append((address, register, [value]))
+
+        def write_i2c_block_data(self, address, register, data):
+            common.StandInSMBus.write_i2c_block_data(self, address, register, data)
+            self.writes.append((address, register, list(data)))
+
+    grove_i2c_bus.set_default_bus(1)
+    bus = RecordingSMBus()
+    grove_i2c_bus.get_bus(1).attach(bus)
+    return bus
+
+# statisticalNoiseReduction as it was before grovepi_filters
+def reference_noise_reduction(values, std_factor_threshold = 2):
+    import numpy
+    if len(values) == 0:
+        return []
+
+    mean = numpy.mean(values)
+    standard_deviation = numpy.std(values)
+
+    if standard_deviation == 0:
+        return values
+
+    filtered_values = [element for element in values if element > mean - std_factor_threshold * standard_deviation]
+    filtered_values = [element for element in filtered_values if element < mean + std_factor_threshold * standard_deviation]
+
+    return filtered_values
+
 class TestMethods(unittest.TestCase):
 
     def test_imports(self):
@@ -20,3 +70,671 @@ class TestMethods(unittest.TestCase):
                 importlib.import_module(module)
             except ImportError:
                 self.fail('import ' + module + ' failed')
+
+    def test_virtual_grovepi(self):
+        import grovepi
+        import grovepi_emulator
+
+        board = grovepi_emulator.VirtualGrovePi(seed = 0)
+        board.set_analog(0, 700)
+        board.set_dht(4, 23.5, 40.0)
+        session = grovepi.GrovePi(bus = board)
+
+        self.assertEqual(session.version(), '1.3.0')
+        self.assertEqual(session.analogRead(0), 700)
+        self.assertEqual(session.dht(4, 0), [23.5, 40.0])
+
+        # read again within a second, it's answered from the cache
+        writes = board.get_stats()["writes"]
+        self.assertEqual(session.dht(4, 0), [23.5, 40.0])
+        self.assertEqual(board.get_stats()["writes"], writes)
+
+        session.ledBar_init(5, 0)
+        session.ledBar_setLevel(5, 3)
+        self.assertEqual(session.ledBar_getBits(5), 0b111)
+
+        import grovepi_devices
+        chain = grovepi_devices.ChainableRgbLed(7, 4, session)
+        chain.init()
+        frame = [(255, 0, 0), (0, 0, 255), (255, 0, 0), (0, 0, 255)]
+        chain.show(frame)
+        self.assertEqual(board.rgbleds[7].colors, frame)
+        # a single LED changes, storeColor + pattern
+        frame[3] = (0, 255, 0)
+        self.assertEqual(chain.show(frame), 2)
+        self.assertEqual(board.rgbleds[7].colors, frame)
+
+        bar = grovepi_devices.LedBar(5, session = session)
+        bar.init()
+        bar.setLevel(3)
+        bar.toggleLed(1)
+        # nothing changes, nothing is sent
+        self.assertEqual(bar.setBits(0b110), 0)
+        self.assertEqual(board.ledbars[5].state, 0b110)
+
+        display = grovepi_devices.FourDigitDisplay(6, session = session)
+        session.fourDigit_init(6)
+        display.setNumber(21.5)
+        self.assertEqual(board.fourdigits[6].segments, grovepi_devices.render("21:50"))
+        # only the last digit changes
+        self.assertEqual(display.setNumber(21.6), 1)
+
+    def test_virtual_grovepi_monitor(self):
+        import grovepi
+        import grovepi_emulator
+
+        # the firmware answers once it's done monitoring, later than the usual deadlines
+        board = grovepi_emulator.VirtualGrovePi(seed = 0, latencies = {77 : 1.2})
+        session = grovepi.GrovePi(bus = board)
+        session.fourDigit_init(6)
+        self.assertEqual(session.fourDigit_monitor(6, 0, 1), 1)
+
+    def test_scheduler(self):
+        import time
+        import grovepi
+        import grovepi_emulator
+        import grovepi_scheduler
+
+        board = grovepi_emulator.VirtualGrovePi(seed = 0)
+        board.set_analog(0, 700)
+        board.set_analog(1, 300)
+        session = grovepi.GrovePi(bus = board)
+
+        scheduler = grovepi_scheduler.Scheduler()
+        fast = scheduler.add("fast", session.analogRead, 50, args = (0,))
+        slow = scheduler.add("slow", session.analogRead, 10, args = (1,))
+        scheduler.start()
+        time.sleep(1.0)
+        self.assertAlmostEqual(fast.achieved_rate(), 50, delta = 5)
+        self.assertAlmostEqual(slow.achieved_rate(), 10, delta = 1.5)
+        self.assertEqual(fast.latest()[1], 700)
+        self.assertEqual(slow.latest()[1], 300)
+        self.assertEqual(fast.missed + slow.missed + fast.errors + slow.errors, 0)
+
+        # a removed sensor isn't read anymore, the read in progress aside
+        scheduler.remove(fast)
+        count = fast.count
+        time.sleep(0.2)
+        self.assertLessEqual(fast.count, count + 1)
+        self.assertEqual(list(scheduler.stats()), ["slow"])
+        scheduler.remove(slow)
+        # nothing left to read, the worker waits until it's stopped
+        scheduler.stop()
+        self.assertFalse(scheduler.is_alive())
+
+        # a read taking 2.5 periods, the deadlines it makes us miss are skipped and counted
+        scheduler = grovepi_scheduler.Scheduler()
+        def overloaded(pin):
+            time.sleep(0.05)
+            return session.analogRead(pin)
+        busy = scheduler.add("busy", overloaded, 50, args = (0,))
+        scheduler.start()
+        time.sleep(0.5)
+        scheduler.stop()
+        self.assertFalse(scheduler.is_alive())
+        self.assertGreater(busy.count, 0)
+        self.assertGreaterEqual(busy.missed, busy.count)
+        self.assertAlmostEqual(busy.achieved_rate(), 1 / 0.06, delta = 5)
+
+    def test_stream(self):
+        import grovepi
+        import grovepi_scheduler
+
+        # a clock that only moves when the stream sleeps or the reader takes time
+        class FakeClock(object):
+            def __init__(self):
+                self.now = 0.0
+
+            def __call__(self):
+                return self.now
+
+            def sleep(self, delay):
+                self.now += delay
+
+        clock = FakeClock()
+        durations = {2 : 0.75}
+        reads = []
+        def reader(pin):
+            reads.append(clock.now)
+            clock.now += durations.get(len(reads), 0.0625)
+            return [pin, len(reads)]
+
+        module_clock, module_time = grovepi_scheduler._clock, grovepi_scheduler.time
+        grovepi_scheduler._clock = clock
+        grovepi_scheduler.time = clock
+        try:
+            # the second read takes 3 periods: the deadlines at 0.5 and 0.75 are skipped, the next ones stay on the grid
+            stream = grovepi.stream(reader, 4, args = (0,), samples = 6)
+            samples = list(stream)
+            self.assertEqual([sample.timestamp for sample in samples], [0.0, 0.25, 1.0, 1.25, 1.5, 1.75])
+            self.assertEqual([sample.missed for sample in samples], [0, 0, 2, 0, 0, 0])
+            self.assertEqual(stream.overruns, 2)
+            self.assertEqual(stream.count, 6)
+
+            # chunks of numpy arrays, the last one shorter
+            del reads[:]
+            clock.now = 10.0
+            stream = grovepi.stream(reader, 4, args = (3,), samples = 10, chunk_size = 4)
+            chunks = list(stream)
+            self.assertEqual([len(chunk.timestamps) for chunk in chunks], [4, 4, 2])
+            self.assertEqual([chunk.missed for chunk in chunks], [2, 0, 0])
+            self.assertEqual(chunks[0].values.shape, (4, 2))
+            self.assertEqual(list(chunks[1].values[:, 1]), [5, 6, 7, 8])
+            self.assertEqual(list(chunks[2].timestamps), [12.5, 12.75])
+            self.assertEqual(stream.overruns, 2)
+        finally:
+            grovepi_scheduler._clock, grovepi_scheduler.time = module_clock, module_time
+
+    def test_outlier_filters(self):
+        import numpy
+        import grovepi_filters
+
+        random = numpy.random.RandomState(0)
+        values = numpy.round(random.normal(500, 20, 1000))
+        values[random.randint(0, 1000, 20)] = 900
+        # a constant stretch, where the two constant-window rules have to agree
+        values[600:700] = 512
+
+        for window in [None, 5, 50]:
+            streaming = grovepi_filters.OutlierFilter(std_factor_threshold = 2, window = window)
+            kept = [streaming.add(value) for value in values]
+            self.assertEqual(list(grovepi_filters.filter_batch(values, 2, window)), kept)
+
+    def test_outlier_filters_long_inputs(self):
+        import numpy
+        import grovepi_filters
+
+        samples = 1000000
+        random = numpy.random.RandomState(3)
+        ramp = numpy.arange(samples, dtype = numpy.float64)
+        # ADC readings of a slowly drifting signal, full of ties at the limit
+        drifting = numpy.round(512 + 300 * numpy.sin(numpy.arange(samples) / 20000.0) + numpy.arange(samples) * 1e-4 +
+            random.normal(0, 1.5, samples)).clip(0, 1023)
+
+        for values, window in [(ramp, 5), (drifting, 5), (drifting, 50), (drifting, None)]:
+            streaming = grovepi_filters.OutlierFilter(std_factor_threshold = 2, window = window)
+            kept = numpy.array([streaming.add(value) for value in values.tolist()])
+            batch = grovepi_filters.filter_batch(values, 2, window)
+            mismatches = numpy.nonzero(batch != kept)[0]
+            self.assertEqual(mismatches.size, 0, "window {}: mismatches at {}".format(window, mismatches[:10]))
+        self.assertTrue(grovepi_filters.filter_batch(ramp, 2, 5).all())
+
+    def test_statistical_noise_reduction(self):
+        import numpy
+        import grovepi
+
+        random = numpy.random.RandomState(1)
+        for values in [[], [3, 3, 3], [20, 21, 22, 21, 20, 80, 21, 22, -40, 21],
+                list(random.normal(25, 2, 500)), list(random.randint(0, 1024, 200))]:
+            for threshold in [1, 2, 3]:
+                self.assertEqual(grovepi.statisticalNoiseReduction(values, threshold), reference_noise_reduction(values, threshold))
+
+    def test_dht_buffer(self):
+        import threading
+        import time
+        add_library_dir("grove_dht_pro_filter")
+        import grove_dht
+
+        # the oldest values make room for the new ones
+        sensor = grove_dht.Dht(capacity = 3)
+        for value in range(5):
+            sensor.put(20.0 + value, 40.0 + value)
+        self.assertEqual(sensor.stats(), {"dropped" : 2, "overruns" : 2, "buffered" : 3})
+        self.assertEqual(sensor.get(), (22.0, 42.0))
+        self.assertEqual(sensor.feedMe(), (24.0, 44.0))
+        self.assertEqual(sensor.get(0), (23.0, 43.0))
+        self.assertEqual(sensor.stats()["buffered"], 0)
+
+        # put waits for get to make room, nothing is dropped
+        sensor = grove_dht.Dht(capacity = 1, policy = grove_dht.BLOCK)
+        sensor.put(20.0, 40.0)
+        producer = threading.Thread(target = sensor.put, args = (21.0, 41.0))
+        producer.start()
+        producer.join(0.1)
+        self.assertTrue(producer.is_alive())
+        self.assertEqual(sensor.get(1.0), (20.0, 40.0))
+        producer.join(1.0)
+        self.assertFalse(producer.is_alive())
+        self.assertEqual(sensor.stats(), {"dropped" : 0, "overruns" : 1, "buffered" : 1})
+        self.assertEqual(sensor.get(1.0), (21.0, 41.0))
+
+        # the timeout runs on grove_dht's clock, which only moves forward
+        # when it reads an hour later than when get was called, the hour long timeout is over without waiting
+        readings = [0.0, 3601.0]
+        system_clock = grove_dht._clock
+        grove_dht._clock = lambda: readings.pop(0)
+        results = []
+        consumer = threading.Thread(target = lambda: results.append(sensor.get(3600)))
+        consumer.daemon = True
+        try:
+            consumer.start()
+            consumer.join(5.0)
+            self.assertFalse(consumer.is_alive())
+            self.assertEqual(results, [(None, None)])
+            self.assertEqual(readings, [])
+        finally:
+            grove_dht._clock = system_clock
+        start = time.time()
+        self.assertEqual(sensor.get(0.05), (None, None))
+        self.assertGreaterEqual(time.time() - start, 0.04)
+
+    def test_kalman_filter_batch(self):
+        import numpy
+        add_library_dir("grove_barometer_sensors", "high_accuracy_hp206c_barometer")
+        import KalmanFilter
+
+        random = numpy.random.RandomState(0)
+        pressures = 101325 + numpy.cumsum(random.normal(0, 0.5, 5000)) + random.normal(0, 3, 5000)
+        for process_noise, measurement_noise in [(KalmanFilter.default_noise, KalmanFilter.default_noise), (0.01, 1.0), (1e-6, 10.0)]:
+            one_by_one = KalmanFilter.KalmanFilter(process_noise, measurement_noise)
+            expected = [one_by_one.Filter(pressure) for pressure in pressures]
+            batch = KalmanFilter.KalmanFilter(process_noise, measurement_noise)
+            numpy.testing.assert_allclose(batch.filter_batch(pressures), expected, rtol = 1e-12)
+            # and it carries on from where the batch stopped
+            self.assertAlmostEqual(batch.Filter(101330.0), one_by_one.Filter(101330.0), delta = 1e-6)
+
+        dt = 0.1
+        positions = numpy.cumsum(numpy.full(2000, 2.0 * dt)) + random.normal(0, 0.5, 2000)
+        def position_filter():
+            return KalmanFilter.MultivariateKalmanFilter(transition = [[1, dt], [0, 1]], observation = [[1, 0]],
+                process_noise = [[0.01, 0], [0, 0.01]], measurement_noise = [[0.25]])
+        one_by_one = position_filter()
+        expected = numpy.array([one_by_one.filter([position]) for position in positions])
+        numpy.testing.assert_allclose(position_filter().filter_batch(positions), expected, rtol = 0, atol = 1e-9)
+
+    def test_oled_put_string(self):
+        import grove_i2c_bus
+        bus = recording_i2c_bus()
+        add_library_dir("grove_oled")
+        import grove_oled
+
+        # the bytes oled_putChar sent one sendData at a time before the glyph cache
+        def reference_glyph(character):
+            code = ord(character)
+            if code < 32 or code > 127:
+                code = ord(" ")
+            data = []
+            for i in range(0, 8, 2):
+                for j in range(0, 8):
+                    c = 0x00
+                    if (grove_oled.BasicFont[code - 32][i] >> j) & 0x01:
+                        c |= grove_oled.grayH
+                    if (grove_oled.BasicFont[code - 32][i + 1] >> j) & 0x01:
+                        c |= grove_oled.grayL
+                    data.append(c)
+            return data
+
+        shared = grove_i2c_bus.get_bus(1)
+        streams = []
+        write_stream = shared.write_stream
+        def recording_write_stream(address, register, data):
+            streams.append((address, register, list(data)))
+            write_stream(address, register, data)
+        shared.write_stream = recording_write_stream
+        try:
+            for text in ["Temp: 21.5C", "~{|}\x07\xe9", "x"]:
+                del streams[:]
+                del bus.writes[:]
+                grove_oled.oled_putString(text)
+                packed = sum([reference_glyph(character) for character in text], [])
+                self.assertEqual(streams, [(grove_oled.address, grove_oled.Data_mode, packed)])
+                # split in 32 byte transfers, a glyph each
+                self.assertEqual(bus.writes, [(grove_oled.address, grove_oled.Data_mode, packed[start:start + 32])
+                    for start in range(0, len(packed), 32)])
+            # the glyphs are rendered once and kept
+            self.assertEqual(grove_oled.glyph_cache["T"], bytearray(reference_glyph("T")))
+            self.assertIs(grove_oled.get_glyph("T"), grove_oled.glyph_cache["T"])
+        finally:
+            del shared.write_stream
+
+    def test_oled_128_64_dirty_windows(self):
+        bus = recording_i2c_bus()
+        add_library_dir("grove_i2c_oled_128_64")
+        import grove_128_64_oled as oled
+
+        frame = oled.Framebuffer()
+        self.assertEqual(frame.dirty_windows(), [(0, 7, 0, 127)])
+        self.assertEqual(frame.flush(), 128 * 8)
+        self.assertEqual(frame.dirty_windows(), [])
+
+        # a column of adjacent pages, sent as one window
+        frame.pixel(10, 3)
+        frame.pixel(10, 12)
+        self.assertEqual(frame.dirty_windows(), [(0, 1, 10, 10)])
+        # far apart on adjacent pages, or on pages that aren't adjacent, separate windows are cheaper
+        frame.pixel(127, 12)
+        frame.pixel(40, 40)
+        self.assertEqual(frame.dirty_windows(), [(0, 0, 10, 10), (1, 1, 10, 127), (5, 5, 40, 40)])
+
+        del bus.writes[:]
+        self.assertEqual(frame.flush(), 1 + 118 + 1)
+        commands = [data[0] for address, register, data in bus.writes if register == oled.SeeedOLED_Command_Mode]
+        self.assertEqual(commands, [0x21, 10, 10, 0x22, 0, 0, 0x21, 10, 127, 0x22, 1, 1, 0x21, 40, 40, 0x22, 5, 5])
+        data = sum([data for address, register, data in bus.writes if register == oled.SeeedOLED_Data_Mode], [])
+        self.assertEqual(data, [frame.buffer[10]] + list(frame.buffer[128 + 10:128 + 128]) + [frame.buffer[5 * 128 + 40]])
+
+        # nothing changed, nothing is sent
+        del bus.writes[:]
+        self.assertEqual(frame.flush(), 0)
+        self.assertEqual(bus.writes, [])
+
+    def test_oled_128_64_flush_transfers(self):
+        import threading
+        import grove_i2c_bus
+        bus = recording_i2c_bus()
+        add_library_dir("grove_i2c_oled_128_64")
+        import grove_128_64_oled as oled
+
+        # counts how deep the shared bus lock is held when each transfer is made
+        class CountingLock(object):
+            def __init__(self):
+                self.lock = threading.RLock()
+                self.depth = 0
+
+            def __enter__(self):
+                self.lock.acquire()
+                self.depth += 1
+
+            def __exit__(self, *exception):
+                self.depth -= 1
+                self.lock.release()
+
+        lock = CountingLock()
+        shared = grove_i2c_bus.get_bus(1)
+        shared_lock = shared.lock
+        shared.lock = lock
+        depths = []
+        record = bus.write_i2c_block_data
+        def write_i2c_block_data(address, register, data):
+            depths.append(lock.depth)
+            record(address, register, data)
+        bus.write_i2c_block_data = write_i2c_block_data
+
+        frame = oled.Framebuffer()
+        frame.flush()
+        frame.pixel(10, 3)
+        frame.pixel(40, 40)
+        del bus.writes[:]
+        del depths[:]
+        self.assertEqual(frame.flush(), 2)
+        # each window's commands and data under one hold of the lock, on top of the transfer's own
+        self.assertEqual(len(bus.writes), 2 * 7)
+        self.assertEqual(set(depths), set([2]))
+
+        # a data transfer that fails is sent again, with the rest of the screen
+        def failing_write(address, register, data):
+            if register == oled.SeeedOLED_Data_Mode:
+                bus.write_i2c_block_data = write_i2c_block_data
+                raise IOError("no acknowledge")
+            write_i2c_block_data(address, register, data)
+        frame.pixel(10, 3, 0)
+        bus.write_i2c_block_data = failing_write
+        self.assertEqual(frame.flush(), 0)
+        self.assertEqual(frame.dirty_windows(), [(0, 7, 0, 127)])
+        del bus.writes[:]
+        self.assertEqual(frame.flush(), 128 * 8)
+        self.assertEqual(frame.dirty_windows(), [])
+        shared.lock = shared_lock
+
+    def test_rgb_lcd_changes(self):
+        bus = recording_i2c_bus()
+        add_library_dir("grove_rgb_lcd")
+        import grove_rgb_lcd
+
+        lcd = grove_rgb_lcd.LCD()
+        self.assertEqual(lcd.setText("Temp: 21.5C\nHum: 45%"), len("Temp: 21.5C") + len("Hum: 45%"))
+
+        # runs of changed cells, merged over at most max_gap unchanged ones and never across rows
+        self.assertEqual(lcd.changes(grove_rgb_lcd.layout("Temp: 21.6C\nHum: 45%")), [(9, "6")])
+        self.assertEqual(lcd.changes(grove_rgb_lcd.layout("Temp: 32.6C\nHum: 45%")), [(6, "32.6")])
+        self.assertEqual(lcd.changes(grove_rgb_lcd.layout("temp: 21.5C\nHum: 45%")), [(0, "t")])
+        self.assertEqual(lcd.changes(grove_rgb_lcd.layout("Xemp: 21.5X\nHum: 45%")), [(0, "X"), (10, "X")])
+        self.assertEqual(lcd.changes(grove_rgb_lcd.layout("Temp: 21.5C    X\nXum: 45%")), [(15, "X"), (16, "X")])
+
+        del bus.writes[:]
+        self.assertEqual(lcd.setText("Temp: 21.6C\nHum: 46%"), 2)
+        self.assertEqual(bus.writes, [
+            (grove_rgb_lcd.DISPLAY_TEXT_ADDR, 0x80, [0x80 | 9]), (grove_rgb_lcd.DISPLAY_TEXT_ADDR, 0x40, [ord("6")]),
+            (grove_rgb_lcd.DISPLAY_TEXT_ADDR, 0x80, [0x80 | 0x40 + 6]), (grove_rgb_lcd.DISPLAY_TEXT_ADDR, 0x40, [ord("6")]),
+        ])
+
+        # the same text again, nothing is written
+        del bus.writes[:]
+        self.assertEqual(lcd.setText("Temp: 21.6C\nHum: 46%"), 0)
+        self.assertEqual(bus.writes, [])
+
+        # only the colours that changed
+        lcd.setRGB(0, 128, 64)
+        del bus.writes[:]
+        lcd.setRGB(0, 255, 64)
+        self.assertEqual(bus.writes, [(grove_rgb_lcd.DISPLAY_RGB_ADDR, 3, [255])])
+
+    def test_rgb_lcd_custom_characters(self):
+        bus = recording_i2c_bus()
+        add_library_dir("grove_rgb_lcd")
+        import grove_rgb_lcd
+
+        characters = grove_rgb_lcd.CustomCharacters()
+        patterns = [[row] * 8 for row in range(12)]
+        first = [characters.char(pattern) for pattern in patterns[:8]]
+        self.assertEqual(first, [chr(slot) for slot in range(8)])
+        # a pattern that's resident isn't uploaded again
+        del bus.writes[:]
+        self.assertEqual(characters.char(patterns[3]), chr(3))
+        self.assertEqual(bus.writes, [])
+        # all 8 slots are on the screen being built, there's no room for another one
+        self.assertRaises(ValueError, characters.char, patterns[8])
+        characters.end_frame()
+
+        # the next screen shows patterns 0 and 1 again, the new patterns take the least recently used
+        # slots that aren't pinned: 2, 4, 5 and 6 (3 was used after them)
+        self.assertEqual(characters.char(patterns[0]), chr(0))
+        self.assertEqual(characters.char(patterns[1]), chr(1))
+        new = [characters.char(pattern) for pattern in patterns[8:12]]
+        self.assertEqual(new, [chr(2), chr(4), chr(5), chr(6)])
+        self.assertEqual(characters.uploads, 12)
+        self.assertEqual(characters.hits, 3)
+        # the upload of a pattern writes its slot's CGRAM address, then its rows
+        self.assertEqual(bus.writes[-2:], [(grove_rgb_lcd.DISPLAY_TEXT_ADDR, 0x80, [0x40 | (6 << 3)]),
+            (grove_rgb_lcd.DISPLAY_TEXT_ADDR, 0x40, patterns[11])])
+
+        # 6 slots pinned, pattern 2 takes the least recently used of the other two, 7
+        self.assertEqual(characters.char(patterns[2]), chr(7))
+        # pattern 3 is still in slot 3, and now every slot is pinned
+        self.assertEqual(characters.char(patterns[3]), chr(3))
+        self.assertRaises(ValueError, characters.char, patterns[4])
+        self.assertEqual(sorted(characters.resident.values()), list(range(8)))
+
+    def test_chainable_rgb_direct(self):
+        add_library_dir("grove_chainable_rgb_led", "direct_serial_lib")
+        import chainable_rgb_direct
+
+        # the flag byte, the way sendColor used to build it bit by bit
+        def prefix(r, g, b):
+            prefix = 0b11000000
+            if (b & 0x80) == 0:
+                prefix |= 0b00100000
+            if (b & 0x40) == 0:
+                prefix |= 0b00010000
+            if (g & 0x80) == 0:
+                prefix |= 0b00001000
+            if (g & 0x40) == 0:
+                prefix |= 0b00000100
+            if (r & 0x80) == 0:
+                prefix |= 0b00000010
+            if (r & 0x40) == 0:
+                prefix |= 0b00000001
+            return prefix
+
+        levels = list(range(0, 256, 5)) + [0x3f, 0x40, 0x7f, 0x80, 0xbf, 0xc0, 0xff]
+        for r in levels:
+            for g in levels:
+                for b in levels:
+                    self.assertEqual(chainable_rgb_direct.encode_color(r, g, b), bytearray([prefix(r, g, b), b, g, r]))
+
+        fake = chainable_rgb_direct.FakeGPIO()
+        led = chainable_rgb_direct.rgb_led(5, chainable_rgb_direct.GPIOBackend(gpio = fake))
+        colors = [(255, 0, 0), (0, 255, 0), (0, 0, 255), (18, 52, 86), (255, 255, 255)]
+        led.show(colors)
+        received = fake.received()
+        self.assertEqual(received[:4], chainable_rgb_direct.frame_boundary)
+        self.assertEqual(received[-4:], chainable_rgb_direct.frame_boundary)
+        self.assertEqual(chainable_rgb_direct.decode_frame(received), colors)
+
+        fake.clear()
+        led.setOneLED(1, 2, 3, 4)
+        self.assertEqual(chainable_rgb_direct.decode_frame(fake.received()), colors[:4] + [(1, 2, 3)])
+
+        # a flag byte that doesn't match its colour
+        received[4] ^= 0x01
+        self.assertRaises(ValueError, chainable_rgb_direct.decode_frame, received)
+
+    def test_nmea_parser(self):
+        add_library_dir("grove_gps")
+        import grove_nmea
+
+        gga = b"$GPGGA,123519.00,4807.038,N,01131.000,E,1,08,0.9,545.4,M,46.9,M,,*69\r\n"
+        rmc = b"$GNRMC,123519.00,A,4807.038,S,01131.000,W,022.4,084.4,230394,003.1,W*55\r\n"
+        cache = grove_nmea.FixCache()
+        parser = grove_nmea.Parser(cache.update)
+
+        # a byte at a time, the sentences only come out with their line ends
+        sentences = []
+        stream = gga + rmc
+        for index in range(len(stream)):
+            sentences += parser.feed(stream[index:index + 1])
+        self.assertEqual(len(sentences), 2)
+        self.assertEqual(sentences[0]._replace(latitude = None, longitude = None),
+            grove_nmea.GGA("GP", "123519.00", None, None, 1, 8, 0.9, 545.4, 46.9))
+        self.assertEqual(sentences[1]._replace(latitude = None, longitude = None),
+            grove_nmea.RMC("GN", "123519.00", True, None, None, 22.4, 84.4, "230394"))
+        # degrees and minutes to decimal degrees, negative in the south and west
+        self.assertAlmostEqual(sentences[0].latitude, 48.1173)
+        self.assertAlmostEqual(sentences[0].longitude, 11 + 31.0 / 60)
+        self.assertAlmostEqual(sentences[1].latitude, -48.1173)
+        self.assertAlmostEqual(sentences[1].longitude, -(11 + 31.0 / 60))
+        fix = cache.fix()
+        self.assertTrue(fix.valid)
+        self.assertEqual((fix.date, fix.altitude, fix.satellites), ("230394", 545.4, 8))
+        self.assertAlmostEqual(fix.speed_kmh, 22.4 * grove_nmea.knots_to_kmh)
+        self.assertEqual(cache.lines["GGA"], gga.decode("ascii").strip())
+
+        # a wrong checksum is counted and the sentence dropped
+        self.assertEqual(parser.feed(gga.replace(b"*69", b"*68")), [])
+        self.assertEqual(parser.checksum_errors, 1)
+        self.assertEqual(parser.sentences, 2)
+
+        # over max_line_length bytes without a line end are dropped, the parser picks up at the next $
+        self.assertEqual(parser.feed(b"x" * (grove_nmea.max_line_length + 10)), [])
+        self.assertEqual(len(parser.buffer), 0)
+        self.assertEqual(parser.feed(b"y" * 200 + gga[:20]), [])
+        self.assertEqual(parser.buffer, bytearray(gga[:20]))
+        self.assertEqual(parser.feed(gga[20:]), [sentences[0]])
+        self.assertEqual(parser.sentences, 3)
+
+        # nothing arrives, wait gives up
+        self.assertFalse(cache.wait(timeout = 0.05))
+
+        # a Reader fills its cache from a serial port in the background
+        add_library_dir("benchmarks")
+        import common
+        port = common.StandInSerial()
+        port.feed(gga)
+        reader = grove_nmea.Reader(port, idle = 0.01)
+        reader.start()
+        try:
+            while reader.cache.latest("GGA") is None:
+                self.assertTrue(reader.cache.wait(timeout = 2))
+        finally:
+            reader.stop()
+        self.assertEqual(reader.cache.latest("GGA"), sentences[0])
+
+    def test_gps_track(self):
+        import io
+        import shutil
+        import tempfile
+        add_library_dir("grove_gps")
+        import grove_gps_track
+
+        start = 1600000000.0
+        records = []
+        for second in range(20):
+            records.append(dict(time = start + second, latitude = 48.1173 + second * 4e-5, longitude = -11.5166 - second * 3e-5,
+                altitude = 520.25, speed_kmh = None if second % 3 == 0 else 18.5, course = 84.4, satellites = 8, hdop = 0.9,
+                temperature = None if second == 5 else 21.5))
+
+        def check(track, expected):
+            self.assertEqual(len(track), len(expected))
+            for record, values in zip(track, expected):
+                for name, value in values.items():
+                    if value is None:
+                        self.assertIsNone(getattr(record, name))
+                    else:
+                        self.assertAlmostEqual(getattr(record, name), value, places = 7)
+
+        directory = tempfile.mkdtemp()
+        try:
+            # write, close and read back, missing values included
+            path = os.path.join(directory, "ride.gtrk")
+            writer = grove_gps_track.TrackWriter(path, extra = ["temperature"], block_size = 4)
+            for values in records:
+                writer.add(**values)
+            writer.close()
+            track = grove_gps_track.TrackReader(path)
+            check(track, records)
+            self.assertEqual((track.start_time, track.end_time), (start, start + 19))
+            self.assertIsNone(list(track)[0].speed_kmh)
+            self.assertIsNone(list(track)[5].temperature)
+
+            # seek and at, on a keyframe (every 4 records) and on either side of one
+            for second in [3, 4, 5, 7.5, 8, 19]:
+                found = list(track.seek(start + second))
+                self.assertEqual([record.time for record in found], [start + s for s in range(20) if s >= second])
+                self.assertEqual(track.at(start + second).time, start + int(second))
+            self.assertEqual(list(track.seek(start + 30)), [])
+            self.assertIsNone(track.at(start - 1))
+            self.assertEqual([record.time for record in track.records(start + 3, start + 9)], [start + s for s in range(3, 10)])
+
+            # reopened and closed without adding anything, the track is the same
+            grove_gps_track.TrackWriter(path, extra = ["temperature"], append = True).close()
+            check(grove_gps_track.TrackReader(path), records)
+
+            # append to a closed track
+            path = os.path.join(directory, "closed.gtrk")
+            writer = grove_gps_track.TrackWriter(path, extra = ["temperature"], block_size = 4)
+            for values in records[:10]:
+                writer.add(**values)
+            writer.close()
+            writer = grove_gps_track.TrackWriter(path, extra = ["temperature"], append = True)
+            for values in records[10:]:
+                writer.add(**values)
+            writer.close()
+            check(grove_gps_track.TrackReader(path), records)
+
+            # append to a track that was flushed but never closed, like after a power cut
+            path = os.path.join(directory, "unclosed.gtrk")
+            writer = grove_gps_track.TrackWriter(path, extra = ["temperature"], block_size = 4)
+            for values in records[:7]:
+                writer.add(**values)
+            writer.flush()
+            writer.file.close()
+            check(grove_gps_track.TrackReader(path), records[:7])
+            writer = grove_gps_track.TrackWriter(path, extra = ["temperature"], append = True)
+            for values in records[7:]:
+                writer.add(**values)
+            writer.close()
+            track = grove_gps_track.TrackReader(path)
+            check(track, records)
+            self.assertEqual(track.at(start + 9).time, start + 9)
+
+            # the columns have to match the track's
+            self.assertRaises(ValueError, grove_gps_track.TrackWriter, path, append = True)
+
+            output = io.StringIO()
+            track.to_csv(output, start, start + 1)
+            self.assertEqual(output.getvalue(),
+                "time,latitude,longitude,altitude,speed_kmh,course,satellites,hdop,temperature\n"
+                "2020-09-13T12:26:40.000Z,48.1173000,-11.5166000,520.25,,84.40,8,0.90,21.50\n"
+                "2020-09-13T12:26:41.000Z,48.1173400,-11.5166300,520.25,18.50,84.40,8,0.90,21.50\n")
+        finally:
+            shutil.rmtree(directory)